@@ -1,5 +1,5 @@
 from django.contrib import admin
-from chats.models import Chat
+from chats.models import Chat, Conversation
 
 # Register your models here.
 
@@ -15,3 +15,15 @@ class PostAdmin(admin.ModelAdmin):
         "created_at",
         "updated_at",
     )
+
+
+@admin.register(Conversation)
+class ConversationAdmin(admin.ModelAdmin):
+    list_display = (
+        "code",
+        "last_message_preview",
+        "last_message_at",
+        "unread_low",
+        "unread_high",
+    )
+    raw_id_fields = ("user_low", "user_high", "last_message")
@@ -0,0 +1,121 @@
+"""
+Write-behind persistence of chat messages. Messages get their id and timestamp
+when they are received and are inserted with bulk_create in batches of at most
+`CHAT_WRITE_BATCH_SIZE`, written at the latest `CHAT_WRITE_BATCH_DELAY` seconds
+after the first message of the batch arrived.
+"""
+
+import asyncio
+import logging
+import weakref
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from chats.conversations import save_messages
+
+logger = logging.getLogger(__name__)
+
+_buffers = weakref.WeakKeyDictionary()
+
+
+class MessageBuffer:
+    """
+    Buffer of one event loop. `add()` returns a future resolved once the message
+    is committed, callers that do not wait for it accept losing the messages of the
+    current batch if the process dies.
+    """
+
+    def __init__(self, batch_size, batch_delay):
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.pending = []
+        self.full = asyncio.Event()
+        self.flushing = False
+        self.writer = None
+
+    def add(self, message):
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((message, future))
+        if len(self.pending) >= self.batch_size:
+            self.full.set()
+        if self.writer is None or self.writer.done():
+            self.writer = asyncio.create_task(self.write_pending())
+        return future
+
+    async def write_pending(self):
+        while self.pending:
+            if not self.flushing:
+                try:
+                    await asyncio.wait_for(self.full.wait(), self.batch_delay)
+                except asyncio.TimeoutError:
+                    pass
+            batch = self.pending[: self.batch_size]
+            del self.pending[: self.batch_size]
+            if len(self.pending) < self.batch_size:
+                self.full.clear()
+            await self.write(batch)
+
+    async def write(self, batch):
+        try:
+            await write_messages([message for message, _ in batch])
+        except Exception as e:
+            if len(batch) > 1:
+                # one bad message fails the whole insert, write them one by one so
+                # only the bad ones are lost
+                logger.exception(
+                    "Failed to write %s chat messages, retrying one by one",
+                    len(batch),
+                )
+                for item in batch:
+                    await self.write([item])
+                return
+            logger.exception("Failed to write chat message %s", batch[0][0].pk)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+
+    async def flush(self):
+        """
+        Wait until everything added so far is written.
+        """
+        self.flushing = True
+        self.full.set()
+        try:
+            while self.writer is not None and not self.writer.done():
+                await asyncio.shield(self.writer)
+        finally:
+            self.flushing = False
+
+
+@database_sync_to_async
+def write_messages(messages):
+    with transaction.atomic():
+        save_messages(messages)
+
+
+def get_buffer():
+    loop = asyncio.get_running_loop()
+    if loop not in _buffers:
+        _buffers[loop] = MessageBuffer(
+            settings.CHAT_WRITE_BATCH_SIZE, settings.CHAT_WRITE_BATCH_DELAY
+        )
+    return _buffers[loop]
+
+
+async def persist_message(message):
+    """
+    Queue `message` (an unsaved Chat with its id and timestamp set) for writing.
+    With `CHAT_WRITE_DURABLE` this only returns once it is committed.
+    """
+    written = get_buffer().add(message)
+    if settings.CHAT_WRITE_DURABLE:
+        await written
+    else:
+        # failures are logged by the buffer, this only marks them as handled
+        written.add_done_callback(lambda future: future.exception())
@@ -1,100 +1,123 @@
 import json
-from asgiref.sync import async_to_sync
-from channels.generic.websocket import WebsocketConsumer
-from typing import Tuple, Dict
+from channels.generic.websocket import AsyncWebsocketConsumer
+from typing import Dict
 
 from users.models import CustomUser
+from chats.buffer import persist_message
+from chats.conversations import conversation_code
+from chats.delivery import deliver, message_event, user_group
 from chats.models import Chat
 
 
-def save_message(
-    message: str, current_user_id: int, other_user_id: int, room_name: str
-) -> Chat:
-    current_user = CustomUser.objects.get(id=current_user_id)
-    other_user = CustomUser.objects.get(id=other_user_id)
-    instance = Chat.objects.create(
-        sender=current_user,
-        receiver=other_user,
+async def save_message(message: str, current_user_id: int, other_user_id: int) -> Chat:
+    # ids only, the user rows are never loaded
+    instance = Chat(
+        sender_id=current_user_id,
+        receiver_id=other_user_id,
         message=message,
-        conversation_code=room_name,
+        conversation_code=conversation_code(current_user_id, other_user_id),
     )
-    instance.save()
+    await persist_message(instance)
     return instance
 
 
-def min_max(value1, value2) -> Tuple:
-    value1 = int(value1)
-    value2 = int(value2)
-    min_id = min(value1, value2)
-    max_id = max(value1, value2)
-    return min_id, max_id
+class ChatConsumer(AsyncWebsocketConsumer):
+    """
+    Chat socket of the authenticated user. Fully async, an idle connection only
+    costs its socket and a channel layer subscription, not a thread.
 
+    Opened on ws/chat/ it receives the events of every conversation of the user (the
+    inbox) and sends messages to the `receiver` given with each one. Opened on
+    ws/chat/<user_id>/ it is limited to the conversation with that user.
+    """
 
-class ChatConsumer(WebsocketConsumer):
     def generate_room_name(self):
-        other_user_id: int = self.get_other_user_id()
-        current_user_id: int = self.get_current_user_id()
-
-        min_id, max_id = min_max(other_user_id, current_user_id)
-        room_name = f"user{min_id}_{max_id}chat"
-        return room_name
+        return conversation_code(self.get_current_user_id(), self.get_other_user_id())
 
     def get_other_user_id(self):
-        return self.scope["url_route"]["kwargs"]["user_id"]
+        user_id = self.scope["url_route"]["kwargs"].get("user_id")
+        return None if user_id is None else int(user_id)
 
     def get_current_user_id(self):
-        return self.scope["auth_user_id"]
+        return int(self.scope["auth_user_id"])
 
-    def add_user_to_group(self):
-        self.room_name = self.generate_room_name()
-        async_to_sync(self.channel_layer.group_add)(self.room_name, self.channel_name)
+    async def add_user_to_group(self):
+        self.group_name = user_group(self.get_current_user_id())
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
 
-    def remove_user_from_group(self):
-        async_to_sync(self.channel_layer.group_discard)(
-            self.room_name, self.channel_name
-        )
+    async def remove_user_from_group(self):
+        if hasattr(self, "group_name"):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def user_exists(self, user_id):
+        if user_id not in self.known_users:
+            if not await CustomUser.objects.filter(id=user_id).aexists():
+                return False
+            self.known_users.add(user_id)
+        return True
 
-    def save_message(self, message):
-        current_user = self.get_current_user_id()
-        other_user = self.get_other_user_id()
-        instance = save_message(
+    async def save_message(self, message, other_user_id):
+        instance = await save_message(
             message=message,
-            current_user_id=current_user,
-            other_user_id=other_user,
-            room_name=self.room_name,
+            current_user_id=self.get_current_user_id(),
+            other_user_id=other_user_id,
         )
         return instance
 
-    def process_message(self, message):
-        new_message = self.save_message(message)
-        return {
-            "message": new_message.message,
-            "sender": new_message.sender.id,
-            "receiver": new_message.receiver.id,
-            "created_at": str(new_message.created_at),
-        }
-
-    def connect(self):
-        self.add_user_to_group()
-        self.accept()
-
-    def disconnect(self, close_code):
-        self.remove_user_from_group()
+    async def process_message(self, message, other_user_id):
+        new_message = await self.save_message(message, other_user_id)
+        return message_event(new_message)
+
+    async def connect(self):
+        self.known_users = set()
+        try:
+            other_user_id = self.get_other_user_id()
+        except ValueError:
+            await self.close()
+            return
+        if other_user_id is not None:
+            if not await self.user_exists(other_user_id):
+                await self.close()
+                return
+            self.room_name = self.generate_room_name()
+        await self.add_user_to_group()
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        await self.remove_user_from_group()
 
     # Receive message from WebSocket
-    def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         text_data_json = json.loads(text_data)
         message = text_data_json["message"]
-        processed_message: Dict = self.process_message(message)
-
-        # Send message to room group
-        async_to_sync(self.channel_layer.group_send)(
-            self.room_name, {"type": "chat_message", "message": processed_message}
+        other_user_id = self.get_other_user_id()
+        if other_user_id is None:
+            try:
+                other_user_id = int(text_data_json["receiver"])
+            except (KeyError, TypeError, ValueError):
+                other_user_id = None
+            if other_user_id is None or not await self.user_exists(other_user_id):
+                await self.send(
+                    text_data=json.dumps(
+                        {"type": "error", "message": "Unknown receiver"}
+                    )
+                )
+                return
+        processed_message: Dict = await self.process_message(message, other_user_id)
+
+        # Send message to every device of both users
+        await deliver(
+            processed_message,
+            [processed_message["sender"], processed_message["receiver"]],
+            self.channel_layer,
         )
 
-    # Receive message from room group
-    def chat_message(self, event):
-        message = event["message"]
+    # Receive an event (message, read receipt, unread counts) of one of the user's
+    # conversations
+    async def chat_event(self, event):
+        event = event["event"]
+        if hasattr(self, "room_name") and event["conversation"] != self.room_name:
+            return
 
-        # Send message to WebSocket
-        self.send(text_data=json.dumps(message))
+        # Send event to WebSocket
+        await self.send(text_data=json.dumps(event))
@@ -0,0 +1,205 @@
+"""
+Inbox bookkeeping. Every code path that writes chat messages goes through
+`save_messages()`, so the Conversation of a pair of users always points at its
+latest message and counts what each side has not read.
+"""
+
+from collections import Counter
+
+from django.db.models import Count, Max, Q
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+
+from chats.models import Chat, Conversation, UnreadCount
+from utils.paginator import KeysetPaginator
+
+PREVIEW_LENGTH = Conversation._meta.get_field("last_message_preview").max_length
+
+
+def conversation_code(user_id, other_user_id):
+    low, high = sorted((int(user_id), int(other_user_id)))
+    return f"user{low}_{high}chat"
+
+
+def set_last_message(conversation, message):
+    conversation.last_message = message
+    conversation.last_message_preview = message.message[:PREVIEW_LENGTH]
+    conversation.last_message_at = message.created_at
+
+
+def save_messages(messages):
+    """
+    Insert the unsaved chat `messages` and record them in their conversations, in
+    the caller's transaction. The conversations are locked before the insert, so
+    the ids of a conversation's messages are handed out in commit order: whoever
+    sees a message also sees every message of its conversation with a lower id,
+    see chats.threads.messages_since.
+    """
+    conversations = lock_conversations(messages)
+    Chat.objects.bulk_create(messages)
+    record_messages(messages, conversations)
+
+
+def lock_conversations(messages):
+    """
+    Create the missing conversations of `messages` and lock them all, in a fixed
+    order so concurrent batches cannot deadlock.
+    """
+    users = {
+        conversation_code(message.sender_id, message.receiver_id): (
+            message.sender_id,
+            message.receiver_id,
+        )
+        for message in messages
+    }
+    Conversation.objects.bulk_create(
+        [
+            Conversation(code=code, user_low_id=min(pair), user_high_id=max(pair))
+            for code, pair in users.items()
+        ],
+        ignore_conflicts=True,
+    )
+    return list(
+        Conversation.objects.select_for_update().filter(code__in=users).order_by("code")
+    )
+
+
+def record_messages(messages, conversations):
+    """
+    Move the locked `conversations` to their newest saved message among `messages`
+    and add them to the unread count of their receivers.
+    """
+    latest, unread = {}, Counter()
+    for message in messages:
+        code = conversation_code(message.sender_id, message.receiver_id)
+        if code not in latest or (message.created_at, message.pk) > (
+            latest[code].created_at,
+            latest[code].pk,
+        ):
+            latest[code] = message
+        if message.receiver_id != message.sender_id:
+            unread[code, message.receiver_id] += 1
+
+    for conversation in conversations:
+        message = latest[conversation.code]
+        if conversation.last_message_id is None or (
+            message.created_at >= conversation.last_message_at
+        ):
+            set_last_message(conversation, message)
+        conversation.updated_at = timezone.now()
+        conversation.unread_low += unread[conversation.code, conversation.user_low_id]
+        conversation.unread_high += unread[conversation.code, conversation.user_high_id]
+    Conversation.objects.bulk_update(
+        conversations,
+        [
+            "last_message",
+            "last_message_preview",
+            "last_message_at",
+            "unread_low",
+            "unread_high",
+            "updated_at",
+        ],
+    )
+
+    received = Counter()
+    for (code, receiver_id), count in unread.items():
+        received[receiver_id] += count
+    add_unread(received)
+
+
+def add_unread(counts):
+    """
+    Add `counts` ({user id: number of messages}, negative once read) to the
+    users' total unread counts. Returns the new totals.
+    """
+    counts = {user_id: count for user_id, count in counts.items() if count}
+    if not counts:
+        return {}
+    UnreadCount.objects.bulk_create(
+        [UnreadCount(user_id=user_id) for user_id in counts], ignore_conflicts=True
+    )
+    totals = list(
+        UnreadCount.objects.select_for_update().filter(user__in=counts).order_by("user")
+    )
+    for total in totals:
+        total.count = max(total.count + counts[total.user_id], 0)
+    UnreadCount.objects.bulk_update(totals, ["count"])
+    return {total.user_id: total.count for total in totals}
+
+
+def rebuild_conversations():
+    """
+    Recreate every Conversation and UnreadCount from the chat history. Returns the
+    number of conversations.
+    """
+    pairs = list(
+        Chat.objects.annotate(
+            low=Least("sender", "receiver"), high=Greatest("sender", "receiver")
+        )
+        .values("low", "high")
+        .annotate(
+            last_id=Max("id"),
+            unread_low=Count(
+                "id", filter=Q(is_read=False, receiver=Least("sender", "receiver"))
+            ),
+            unread_high=Count(
+                "id", filter=Q(is_read=False, receiver=Greatest("sender", "receiver"))
+            ),
+        )
+        .order_by()
+    )
+    last_messages = Chat.objects.in_bulk([pair["last_id"] for pair in pairs])
+    conversations, totals = [], Counter()
+    for pair in pairs:
+        conversation = Conversation(
+            code=conversation_code(pair["low"], pair["high"]),
+            user_low_id=pair["low"],
+            user_high_id=pair["high"],
+            unread_low=pair["unread_low"] if pair["low"] != pair["high"] else 0,
+            unread_high=pair["unread_high"] if pair["low"] != pair["high"] else 0,
+        )
+        set_last_message(conversation, last_messages[pair["last_id"]])
+        conversations.append(conversation)
+        totals[conversation.user_low_id] += conversation.unread_low
+        totals[conversation.user_high_id] += conversation.unread_high
+    Conversation.objects.all().delete()
+    Conversation.objects.bulk_create(conversations, batch_size=1000)
+    UnreadCount.objects.all().delete()
+    UnreadCount.objects.bulk_create(
+        [
+            UnreadCount(user_id=user_id, count=count)
+            for user_id, count in totals.items()
+        ],
+        batch_size=1000,
+    )
+    return len(conversations)
+
+
+class InboxPaginator(KeysetPaginator):
+    """
+    Conversations of the requesting user, most recent message first. A user is
+    either participant column, so a page merges one keyset read per column, each
+    served in order by its own index. (Filtering on either column at once plans as
+    a BitmapOr over both indexes and a sort of all the user's conversations.)
+    """
+
+    def fetch(self, queryset, ordering, position, limit):
+        conversations = {}
+        for participant in ("user_low", "user_high"):
+            # a conversation with oneself is found by both
+            conversations.update(
+                (conversation.pk, conversation)
+                for conversation in super().fetch(
+                    queryset.filter(**{participant: self.request.user.id}),
+                    ordering,
+                    position,
+                    limit,
+                )
+            )
+        return sorted(
+            conversations.values(),
+            key=lambda conversation: [
+                getattr(conversation, field.lstrip("-")) for field in ordering
+            ],
+            reverse=ordering[0].startswith("-"),
+        )[:limit]
@@ -0,0 +1,37 @@
+"""
+Live delivery of chat events. Every socket of a user joins that user's group, so an
+event sent to the groups of the users it concerns reaches each of their connected
+devices exactly once, whether they have the inbox or a thread open.
+"""
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+
+def user_group(user_id):
+    return f"chat_user_{int(user_id)}"
+
+
+def message_event(message):
+    return {
+        "type": "message",
+        "conversation": message.conversation_code,
+        "id": str(message.message_id),
+        "message": message.message,
+        "sender": message.sender_id,
+        "receiver": message.receiver_id,
+        "created_at": message.created_at.isoformat(),
+    }
+
+
+async def deliver(event, user_ids, channel_layer=None):
+    channel_layer = channel_layer or get_channel_layer()
+    for user_id in set(user_ids):
+        await channel_layer.group_send(
+            user_group(user_id), {"type": "chat_event", "event": event}
+        )
+
+
+def deliver_on_commit(event, user_ids):
+    transaction.on_commit(lambda: async_to_sync(deliver)(event, user_ids))
@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from chats.buffer import MessageBuffer
+from chats.conversations import conversation_code
+from chats.models import Chat
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare how many chat messages per second are persisted by one INSERT per "
+        "message and by the write-behind buffer, with and without waiting for commit."
+        " Creates (and removes) two users and their messages."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=50)
+        parser.add_argument("--messages", type=int, default=40, help="Per client.")
+
+    def handle(self, *args, **options):
+        sender = CustomUser.objects.create_user(username="bench_chat_sender")
+        receiver = CustomUser.objects.create_user(username="bench_chat_receiver")
+        try:
+            for mode in ("insert", "durable", "write-behind"):
+                elapsed = asyncio.run(
+                    self.run(
+                        mode,
+                        sender.pk,
+                        receiver.pk,
+                        options["clients"],
+                        options["messages"],
+                    )
+                )
+                total = options["clients"] * options["messages"]
+                self.stdout.write(
+                    f"{mode:>12}: {total} messages in {elapsed:.2f}s, "
+                    f"{total / elapsed:.0f} messages/s"
+                )
+        finally:
+            # removes their messages too
+            CustomUser.objects.filter(pk__in=[sender.pk, receiver.pk]).delete()
+
+    async def run(self, mode, sender_id, receiver_id, clients, messages):
+        buffer = MessageBuffer(
+            settings.CHAT_WRITE_BATCH_SIZE, settings.CHAT_WRITE_BATCH_DELAY
+        )
+
+        async def client():
+            # each client sends its next message once the previous one was handled,
+            # like ChatConsumer.receive
+            for index in range(messages):
+                message = Chat(
+                    sender_id=sender_id,
+                    receiver_id=receiver_id,
+                    message=f"message {index}",
+                    conversation_code=conversation_code(sender_id, receiver_id),
+                )
+                if mode == "insert":
+                    await message.asave()
+                elif mode == "durable":
+                    await buffer.add(message)
+                else:
+                    buffer.add(message)
+                    await asyncio.sleep(0)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(clients)))
+        await buffer.flush()
+        return time.perf_counter() - start
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from chats.conversations import rebuild_conversations
+
+
+class Command(BaseCommand):
+    help = "Recreate the inbox conversations (last message and unread counts) and the unread totals from the chat history."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = rebuild_conversations()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} conversations"))
@@ -0,0 +1,47 @@
+import uuid
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def generate_message_ids(apps, schema_editor):
+    Chat = apps.get_model("chats", "Chat")
+    chats = list(Chat.objects.only("id"))
+    for chat in chats:
+        chat.message_id = uuid.uuid4()
+    Chat.objects.bulk_update(chats, ["message_id"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chats", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chat",
+            name="message_id",
+            field=models.UUIDField(
+                editable=False, null=True, verbose_name="Message id"
+            ),
+        ),
+        migrations.RunPython(generate_message_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="chat",
+            name="message_id",
+            field=models.UUIDField(
+                default=uuid.uuid4,
+                editable=False,
+                unique=True,
+                verbose_name="Message id",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="chat",
+            name="created_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, verbose_name="Created at"
+            ),
+        ),
+    ]
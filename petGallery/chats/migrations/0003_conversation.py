@@ -0,0 +1,108 @@
+# Generated by Django 5.0.3 on 2026-10-18 16:37
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chats", "0002_chat_message_id"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Conversation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Created at"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Updated at"),
+                ),
+                (
+                    "code",
+                    models.CharField(
+                        max_length=50, unique=True, verbose_name="Conversation code"
+                    ),
+                ),
+                (
+                    "last_message_preview",
+                    models.CharField(
+                        blank=True, max_length=100, verbose_name="Last message preview"
+                    ),
+                ),
+                (
+                    "last_message_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        verbose_name="Last message at",
+                    ),
+                ),
+                (
+                    "unread_low",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Unread by user_low"
+                    ),
+                ),
+                (
+                    "unread_high",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Unread by user_high"
+                    ),
+                ),
+                (
+                    "last_message",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="chats.chat",
+                    ),
+                ),
+                (
+                    "user_high",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "user_low",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-last_message_at", "-id"],
+                "indexes": [
+                    models.Index(
+                        fields=["user_low", "-last_message_at", "-id"],
+                        name="conversation_low_recent_idx",
+                    ),
+                    models.Index(
+                        fields=["user_high", "-last_message_at", "-id"],
+                        name="conversation_high_recent_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.3 on 2026-10-18 16:38
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Value
+from django.db.models.functions import Cast, Concat, Greatest, Least
+
+
+def canonicalize_conversation_codes(apps, schema_editor):
+    Chat = apps.get_model("chats", "Chat")
+    Chat.objects.update(
+        conversation_code=Concat(
+            Value("user"),
+            Cast(Least("sender_id", "receiver_id"), models.CharField()),
+            Value("_"),
+            Cast(Greatest("sender_id", "receiver_id"), models.CharField()),
+            Value("chat"),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chats", "0003_conversation"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            canonicalize_conversation_codes, migrations.RunPython.noop
+        ),
+        migrations.AddIndex(
+            model_name="chat",
+            index=models.Index(
+                fields=["conversation_code", "created_at", "id"],
+                name="chat_conversation_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.3 on 2026-10-18 17:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chats", "0005_unread_counts"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="chat",
+            index=models.Index(
+                fields=["conversation_code", "id"], name="chat_conversation_id_idx"
+            ),
+        ),
+    ]
@@ -1,9 +1,11 @@
+import uuid
+
 from django.db import models
-from users.models import CustomUser, Account
+from django.utils import timezone
+from users.models import CustomUser
 from common.models import AbstractBaseModel
 from django.utils.translation import gettext_lazy as _
 
-
 # Create your models here.
 
 
@@ -18,17 +20,94 @@ class Chat(AbstractBaseModel):
     is_read = models.BooleanField(_("Read Message"), default=False)
     is_edited = models.BooleanField(_("Edited Message"), default=False)
     message = models.TextField("Message text")
+    # always user{low id}_{high id}chat, see chats.conversations.conversation_code
     conversation_code = models.CharField(max_length=50)
+    # assigned when the message is received, it is written later (see chats.buffer)
+    message_id = models.UUIDField(
+        _("Message id"), default=uuid.uuid4, unique=True, editable=False
+    )
+    created_at = models.DateTimeField("Created at", default=timezone.now)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["conversation_code", "created_at", "id"],
+                name="chat_conversation_idx",
+            ),
+            # catching up on a thread, see chats.threads.messages_since
+            models.Index(
+                fields=["conversation_code", "id"], name="chat_conversation_id_idx"
+            ),
+            # read receipts only visit the messages that are still unread
+            models.Index(
+                fields=["conversation_code", "created_at", "id"],
+                condition=models.Q(is_read=False),
+                name="chat_unread_idx",
+            ),
+        ]
 
+    # the accounts are cached on the users and can be loaded with
+    # select_related("sender__account", "receiver__account"), serializers use the
+    # identity map of chats.serializers.get_accounts instead
     @property
     def sender_account(self):
-        sender_account = Account.objects.get(user=self.sender)
-        return sender_account
+        return self.sender.account
 
     @property
     def receiver_account(self):
-        receiver_account = Account.objects.get(user=self.receiver)
-        return receiver_account
+        return self.receiver.account
+
+
+class Conversation(AbstractBaseModel):
+    """
+    Inbox entry of the chat between two users, kept up to date by every message
+    write (see chats.conversations). `user_low` is the participant with the lower id.
+    """
+
+    code = models.CharField(_("Conversation code"), max_length=50, unique=True)
+    user_low = models.ForeignKey(CustomUser, related_name="+", on_delete=models.CASCADE)
+    user_high = models.ForeignKey(
+        CustomUser, related_name="+", on_delete=models.CASCADE
+    )
+    last_message = models.ForeignKey(
+        Chat, related_name="+", null=True, on_delete=models.SET_NULL
+    )
+    last_message_preview = models.CharField(
+        _("Last message preview"), max_length=100, blank=True
+    )
+    last_message_at = models.DateTimeField(_("Last message at"), default=timezone.now)
+    unread_low = models.PositiveIntegerField(_("Unread by user_low"), default=0)
+    unread_high = models.PositiveIntegerField(_("Unread by user_high"), default=0)
+
+    class Meta:
+        ordering = ["-last_message_at", "-id"]
+        indexes = [
+            # one per participant column, the inbox reads both
+            models.Index(
+                fields=["user_low", "-last_message_at", "-id"],
+                name="conversation_low_recent_idx",
+            ),
+            models.Index(
+                fields=["user_high", "-last_message_at", "-id"],
+                name="conversation_high_recent_idx",
+            ),
+        ]
+
+    def other_user(self, user_id):
+        return self.user_high if self.user_low_id == user_id else self.user_low
+
+    def unread_count(self, user_id):
+        return self.unread_low if self.user_low_id == user_id else self.unread_high
+
+
+class UnreadCount(models.Model):
+    """
+    Unread chat messages of a user over all conversations, the sum of their
+    Conversation unread counts kept next to them so badges are one row lookup.
+    """
+
+    user = models.OneToOneField(
+        CustomUser, on_delete=models.CASCADE, primary_key=True, related_name="+"
+    )
+    count = models.PositiveIntegerField(_("Unread messages"), default=0)
@@ -0,0 +1,68 @@
+"""
+Read receipts. Reading a message marks it and everything received before it in the
+same conversation as read with one UPDATE, takes the number of changed rows off the
+conversation's and the user's unread counters and tells the devices of both users.
+"""
+
+import uuid
+
+from django.db.models import Q
+
+from chats.conversations import add_unread, conversation_code
+from chats.delivery import deliver_on_commit
+from chats.models import Chat, Conversation, UnreadCount
+from chats.threads import get_anchor
+
+
+def mark_read(user_id, other_user_id, message_id):
+    """
+    Mark the messages `user_id` received from `other_user_id` up to `message_id` as
+    read. Returns the number of newly read messages.
+    """
+    code = conversation_code(user_id, other_user_id)
+    messages = Chat.objects.filter(conversation_code=code)
+    created_at, pk = get_anchor(messages, message_id)
+    read = (
+        messages.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lte=pk)
+        )
+        .filter(is_read=False, receiver=user_id)
+        .exclude(sender=user_id)
+        .update(is_read=True)
+    )
+    if read:
+        conversation = (
+            Conversation.objects.select_for_update().filter(code=code).first()
+        )
+        unread_count = 0
+        if conversation is not None:
+            field = (
+                "unread_low" if conversation.user_low_id == user_id else "unread_high"
+            )
+            unread_count = max(getattr(conversation, field) - read, 0)
+            setattr(conversation, field, unread_count)
+            conversation.save(update_fields=[field, "updated_at"])
+        unread_total = add_unread({user_id: -read}).get(user_id, 0)
+        receipt = {
+            "type": "read",
+            "conversation": code,
+            "reader": user_id,
+            "message_id": str(uuid.UUID(str(message_id))),
+        }
+        deliver_on_commit(receipt, [user_id, other_user_id])
+        # the reader's other devices update their badges
+        counts = {
+            "type": "unread",
+            "conversation": code,
+            "unread_count": unread_count,
+            "unread_total": unread_total,
+        }
+        deliver_on_commit(counts, [user_id])
+    return read
+
+
+def get_unread_total(user_id):
+    return (
+        UnreadCount.objects.filter(user=user_id).values_list("count", flat=True).first()
+        or 0
+    )
@@ -1,6 +1,42 @@
 from rest_framework import serializers
+from users.models import Account
 from users.serializers import UserInfoSerializer, AccountInfoSerializer
-from chats.models import Chat
+from chats.models import Chat, Conversation
+from utils.prefetch import PrefetchListSerializer
+
+
+def get_accounts(context, user_ids):
+    """
+    Identity map of the accounts rendered in one response, keyed by user id. Only
+    the ids not seen yet are loaded, all of them in one query.
+    """
+    accounts = context.setdefault("accounts", {})
+    missing = set(user_ids) - accounts.keys()
+    if missing:
+        accounts.update(dict.fromkeys(missing))
+        accounts.update(
+            (account.user_id, account)
+            for account in Account.objects.filter(user__in=missing)
+        )
+    return accounts
+
+
+class ChatAccountSerializer(serializers.ModelSerializer):
+    """
+    What a chat shows of each participant.
+    """
+
+    class Meta:
+        model = Account
+        fields = ["id", "name", "avatar", "avatar_placeholder", "verified"]
+
+
+class ChatAccountsMixin:
+    def render_account(self, user_id):
+        account = get_accounts(self.context, [user_id])[user_id]
+        if account is None:
+            return None
+        return ChatAccountSerializer(account, context=self.context).data
 
 
 class ChatSerializer(serializers.ModelSerializer):
@@ -10,10 +46,78 @@ class ChatSerializer(serializers.ModelSerializer):
         exclude = ["id"]
 
 
-class MessageSerializer(serializers.ModelSerializer):
+class MessageListSerializer(PrefetchListSerializer):
+    def to_representation(self, data):
+        messages = list(self.prefetch(data))
+        get_accounts(
+            self.context,
+            {message.sender_id for message in messages}
+            | {message.receiver_id for message in messages},
+        )
+        return serializers.ListSerializer.to_representation(self, messages)
+
+
+class MessageSerializer(ChatAccountsMixin, serializers.ModelSerializer):
     sender = UserInfoSerializer()
     receiver = UserInfoSerializer()
+    sender_account = serializers.SerializerMethodField()
+    receiver_account = serializers.SerializerMethodField()
 
     class Meta:
         model = Chat
         exclude = ["id"]
+        list_serializer_class = MessageListSerializer
+
+    def get_sender_account(self, message):
+        return self.render_account(message.sender_id)
+
+    def get_receiver_account(self, message):
+        return self.render_account(message.receiver_id)
+
+
+class ConversationListSerializer(PrefetchListSerializer):
+    def to_representation(self, data):
+        conversations = list(self.prefetch(data))
+        user_id = self.context["request"].user.id
+        get_accounts(
+            self.context,
+            {conversation.other_user(user_id).id for conversation in conversations},
+        )
+        return serializers.ListSerializer.to_representation(self, conversations)
+
+
+class ConversationSerializer(ChatAccountsMixin, serializers.ModelSerializer):
+    user = serializers.SerializerMethodField()
+    account = serializers.SerializerMethodField()
+    last_message_id = serializers.UUIDField(
+        source="last_message.message_id", default=None
+    )
+    last_message_sender = serializers.IntegerField(
+        source="last_message.sender_id", default=None
+    )
+    unread_count = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Conversation
+        fields = [
+            "code",
+            "user",
+            "account",
+            "last_message_id",
+            "last_message_sender",
+            "last_message_preview",
+            "last_message_at",
+            "unread_count",
+        ]
+        list_serializer_class = ConversationListSerializer
+
+    def get_user(self, conversation):
+        user = conversation.other_user(self.context["request"].user.id)
+        return UserInfoSerializer(user).data
+
+    def get_account(self, conversation):
+        user = conversation.other_user(self.context["request"].user.id)
+        return self.render_account(user.id)
+
+    def get_unread_count(self, conversation):
+        return conversation.unread_count(self.context["request"].user.id)
@@ -1,3 +1,407 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from channels.layers import get_channel_layer
+from django.db import IntegrityError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from chats.buffer import MessageBuffer, get_buffer
+from chats.consumer import ChatConsumer
+from chats.conversations import conversation_code
+from chats.delivery import user_group
+from chats.models import Chat, Conversation
+from users.models import Account, CustomUser
+
+IN_MEMORY_CHANNEL_LAYERS = {
+    "default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}
+}
+
+
+def connect_chat(current_user_id, other_user_id=None):
+    if other_user_id is None:
+        path, kwargs = "/ws/chat/", {}
+    else:
+        path, kwargs = f"/ws/chat/{other_user_id}/", {"user_id": str(other_user_id)}
+    return ApplicationCommunicator(
+        ChatConsumer.as_asgi(),
+        {
+            "type": "websocket",
+            "path": path,
+            "url_route": {"kwargs": kwargs},
+            "auth_user_id": current_user_id,
+        },
+    )
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class ChatConsumerTest(TransactionTestCase):
+    def setUp(self):
+        self.sender = CustomUser.objects.create_user(username="rex", password="pw")
+        self.receiver = CustomUser.objects.create_user(username="tom", password="pw")
+
+    async def test_message_is_saved_and_sent_to_both_users(self):
+        sender = connect_chat(self.sender.id, self.receiver.id)
+        receiver = connect_chat(self.receiver.id, self.sender.id)
+        for communicator in (sender, receiver):
+            await communicator.send_input({"type": "websocket.connect"})
+            self.assertEqual(
+                (await communicator.receive_output())["type"], "websocket.accept"
+            )
+
+        await sender.send_input(
+            {"type": "websocket.receive", "text": json.dumps({"message": "woof"})}
+        )
+        for communicator in (sender, receiver):
+            event = await communicator.receive_output()
+            message = json.loads(event["text"])
+            self.assertEqual(
+                (message["message"], message["sender"], message["receiver"]),
+                ("woof", self.sender.id, self.receiver.id),
+            )
+
+        # written behind the broadcast
+        await get_buffer().flush()
+        chat = await Chat.objects.aget()
+        self.assertEqual(str(chat.message_id), message["id"])
+        self.assertEqual(
+            chat.conversation_code, f"user{self.sender.id}_{self.receiver.id}chat"
+        )
+        for communicator in (sender, receiver):
+            await communicator.send_input(
+                {"type": "websocket.disconnect", "code": 1000}
+            )
+            await communicator.wait()
+
+    @override_settings(CHAT_WRITE_DURABLE=True)
+    async def test_durable_message_is_committed_before_it_is_sent(self):
+        sender = connect_chat(self.sender.id, self.receiver.id)
+        await sender.send_input({"type": "websocket.connect"})
+        await sender.receive_output()
+
+        await sender.send_input(
+            {"type": "websocket.receive", "text": json.dumps({"message": "woof"})}
+        )
+        message = json.loads((await sender.receive_output())["text"])
+        self.assertTrue(await Chat.objects.filter(message_id=message["id"]).aexists())
+        await sender.send_input({"type": "websocket.disconnect", "code": 1000})
+        await sender.wait()
+
+    async def test_message_reaches_every_device_of_both_users_once(self):
+        other = await CustomUser.objects.acreate(username="max")
+        inbox = connect_chat(self.receiver.id)
+        thread = connect_chat(self.receiver.id, self.sender.id)
+        other_thread = connect_chat(self.receiver.id, other.id)
+        sender = connect_chat(self.sender.id)
+        sockets = (inbox, thread, other_thread, sender)
+        for communicator in sockets:
+            await communicator.send_input({"type": "websocket.connect"})
+            await communicator.receive_output()
+
+        await sender.send_input(
+            {
+                "type": "websocket.receive",
+                "text": json.dumps({"message": "woof", "receiver": self.receiver.id}),
+            }
+        )
+        for communicator in (inbox, thread, sender):
+            message = json.loads((await communicator.receive_output())["text"])
+            self.assertEqual((message["type"], message["message"]), ("message", "woof"))
+            self.assertTrue(await communicator.receive_nothing())
+        # a thread socket only gets the events of its own conversation
+        self.assertTrue(await other_thread.receive_nothing())
+
+        await sender.send_input(
+            {"type": "websocket.receive", "text": json.dumps({"message": "woof"})}
+        )
+        error = json.loads((await sender.receive_output())["text"])
+        self.assertEqual(error["type"], "error")
+
+        await get_buffer().flush()
+        for communicator in sockets:
+            await communicator.send_input(
+                {"type": "websocket.disconnect", "code": 1000}
+            )
+            await communicator.wait()
+
+    async def test_unknown_user_is_refused(self):
+        communicator = connect_chat(self.sender.id, 0)
+        await communicator.send_input({"type": "websocket.connect"})
+        self.assertEqual(
+            (await communicator.receive_output())["type"], "websocket.close"
+        )
+
+
+class MessageBufferTest(TransactionTestCase):
+    def setUp(self):
+        self.sender = CustomUser.objects.create_user(username="rex", password="pw")
+        self.receiver = CustomUser.objects.create_user(username="tom", password="pw")
+
+    def message(self, text, receiver_id):
+        return Chat(
+            sender_id=self.sender.id,
+            receiver_id=receiver_id,
+            message=text,
+            conversation_code=conversation_code(self.sender.id, receiver_id),
+        )
+
+    async def test_failed_batch_only_loses_the_bad_message(self):
+        buffer = MessageBuffer(batch_size=10, batch_delay=0.01)
+        with self.assertLogs("chats.buffer", "ERROR"):
+            written = [
+                buffer.add(self.message("woof", self.receiver.id)),
+                # the receiver does not exist
+                buffer.add(self.message("meow", 0)),
+                buffer.add(self.message("woof woof", self.receiver.id)),
+            ]
+            await buffer.flush()
+
+        self.assertIsNone(await written[0])
+        with self.assertRaises(IntegrityError):
+            await written[1]
+        self.assertIsNone(await written[2])
+        texts = {text async for text in Chat.objects.values_list("message", flat=True)}
+        self.assertEqual(texts, {"woof", "woof woof"})
+
+
+class InboxTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username="rex", password="pw")
+        self.tom = CustomUser.objects.create_user(username="tom", password="pw")
+        self.max = CustomUser.objects.create_user(username="max", password="pw")
+        self.client = APIClient()
+
+    def send(self, sender, receiver, message):
+        self.client.force_authenticate(CustomUser.objects.get(pk=sender.pk))
+        response = self.client.post(
+            "/api/chats/send/",
+            {"receiver_id": receiver.id, "message": message},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_inbox_lists_conversations_by_last_message(self):
+        self.send(self.tom, self.user, "woof")
+        self.send(self.user, self.max, "meow")
+        self.send(self.tom, self.user, "woof woof")
+
+        self.client.force_authenticate(CustomUser.objects.get(pk=self.user.pk))
+        # conversations by either participant column and their accounts inside the
+        # request savepoint
+        with self.assertNumQueries(5):
+            response = self.client.get("/api/chats/inbox/")
+        results = response.data["results"]
+        self.assertEqual(
+            [
+                (c["user"]["id"], c["last_message_preview"], c["unread_count"])
+                for c in results
+            ],
+            [(self.tom.id, "woof woof", 2), (self.max.id, "meow", 0)],
+        )
+
+        self.client.force_authenticate(CustomUser.objects.get(pk=self.max.pk))
+        response = self.client.get("/api/chats/inbox/")
+        self.assertEqual(response.data["results"][0]["unread_count"], 1)
+
+    def test_inbox_pages_merge_both_participant_columns(self):
+        self.send(self.tom, self.user, "woof")
+        self.send(self.max, self.tom, "meow")
+        self.send(self.tom, self.tom, "note to self")
+        self.send(self.user, self.tom, "woof woof")
+
+        self.client.force_authenticate(CustomUser.objects.get(pk=self.tom.pk))
+        previews, url = [], "/api/chats/inbox/?page_size=1"
+        while url:
+            response = self.client.get(url)
+            previews += [c["last_message_preview"] for c in response.data["results"]]
+            url = response.data["next"]
+        self.assertEqual(previews, ["woof woof", "note to self", "meow"])
+
+
+class MessageThreadTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username="rex", password="pw")
+        self.tom = CustomUser.objects.create_user(username="tom", password="pw")
+        other = CustomUser.objects.create_user(username="max", password="pw")
+        start = timezone.now()
+        self.messages = [
+            Chat.objects.create(
+                sender=self.user if index % 2 else self.tom,
+                receiver=self.tom if index % 2 else self.user,
+                message=str(index),
+                conversation_code=conversation_code(self.user.id, self.tom.id),
+                created_at=start + timedelta(seconds=index),
+            )
+            for index in range(5)
+        ]
+        Chat.objects.create(
+            sender=other,
+            receiver=self.user,
+            message="other",
+            conversation_code=conversation_code(self.user.id, other.id),
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.get(pk=self.user.pk))
+        self.url = f"/api/chats/thread/{self.tom.id}/"
+
+    def get_texts(self, params):
+        response = self.client.get(self.url, params)
+        return [message["message"] for message in response.data["results"]]
+
+    def test_thread_pages_around_a_message(self):
+        self.assertEqual(self.get_texts({"page_size": 2}), ["4", "3"])
+        anchor = self.messages[2].message_id
+        self.assertEqual(self.get_texts({"before": anchor, "page_size": 2}), ["1", "0"])
+        self.assertEqual(self.get_texts({"after": anchor, "page_size": 5}), ["4", "3"])
+
+        response = self.client.get(self.url, {"before": anchor, "page_size": 1})
+        self.assertNotIn("before=", response.data["next"])
+        self.assertEqual(
+            [
+                m["message"]
+                for m in self.client.get(response.data["next"]).data["results"]
+            ],
+            ["0"],
+        )
+
+    def test_delta_returns_newer_messages_oldest_first(self):
+        response = self.client.get(
+            self.url + "delta/", {"since": self.messages[1].message_id}
+        )
+        self.assertEqual(
+            [message["message"] for message in response.data["results"]],
+            ["2", "3", "4"],
+        )
+        self.assertFalse(response.data["has_more"])
+
+        # received before the anchor, committed by another worker's buffer after it
+        Chat.objects.create(
+            sender=self.tom,
+            receiver=self.user,
+            message="late",
+            conversation_code=conversation_code(self.user.id, self.tom.id),
+            created_at=self.messages[0].created_at - timedelta(seconds=1),
+        )
+        response = self.client.get(
+            self.url + "delta/", {"since": self.messages[4].message_id}
+        )
+        self.assertEqual(
+            [message["message"] for message in response.data["results"]], ["late"]
+        )
+
+        response = self.client.get(self.url + "delta/", {"since": "nope"})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+class ReadReceiptTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username="rex", password="pw")
+        self.tom = CustomUser.objects.create_user(username="tom", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.get(pk=self.tom.pk))
+        for message in ("woof", "woof woof", "woof woof woof"):
+            self.client.post(
+                "/api/chats/send/",
+                {"receiver_id": self.user.id, "message": message},
+                format="json",
+            )
+        self.client.force_authenticate(CustomUser.objects.get(pk=self.user.pk))
+
+    def test_reading_a_message_reads_everything_before_it(self):
+        self.assertEqual(
+            self.client.get("/api/chats/unread/").data, {"unread_total": 3}
+        )
+        layer = get_channel_layer()
+        devices = {}
+        for user in (self.user, self.tom):
+            devices[user.id] = async_to_sync(layer.new_channel)()
+            async_to_sync(layer.group_add)(user_group(user.id), devices[user.id])
+        code = conversation_code(self.user.id, self.tom.id)
+
+        second = Chat.objects.get(message="woof woof")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f"/api/chats/thread/{self.tom.id}/read/",
+                {"message_id": str(second.message_id)},
+                format="json",
+            )
+        self.assertEqual(response.data["unread_total"], 1)
+        self.assertEqual(
+            list(Chat.objects.filter(is_read=False).values_list("message", flat=True)),
+            ["woof woof woof"],
+        )
+        self.assertEqual(
+            Conversation.objects.get(code=code).unread_count(self.user.id), 1
+        )
+        receipt = {
+            "type": "read",
+            "conversation": code,
+            "reader": self.user.id,
+            "message_id": str(second.message_id),
+        }
+        self.assertEqual(
+            async_to_sync(layer.receive)(devices[self.tom.id])["event"], receipt
+        )
+        self.assertEqual(
+            async_to_sync(layer.receive)(devices[self.user.id])["event"], receipt
+        )
+        self.assertEqual(
+            async_to_sync(layer.receive)(devices[self.user.id])["event"],
+            {
+                "type": "unread",
+                "conversation": code,
+                "unread_count": 1,
+                "unread_total": 1,
+            },
+        )
+
+        # reading again changes nothing
+        response = self.client.post(
+            f"/api/chats/thread/{self.tom.id}/read/",
+            {"message_id": str(second.message_id)},
+            format="json",
+        )
+        self.assertEqual(response.data["unread_total"], 1)
+
+
+class MessageAccountsTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username="rex", password="pw")
+        self.tom = CustomUser.objects.create_user(username="tom", password="pw")
+        for user in (self.user, self.tom):
+            Account.objects.create(
+                user=user,
+                name=user.username.title(),
+                bio="bio",
+                age=2,
+                gender="MALE",
+                animal="DOG",
+                breed="Corgi",
+            )
+        Chat.objects.bulk_create(
+            Chat(
+                sender=self.user if index % 2 else self.tom,
+                receiver=self.tom if index % 2 else self.user,
+                message=str(index),
+                conversation_code=conversation_code(self.user.id, self.tom.id),
+            )
+            for index in range(50)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.get(pk=self.user.pk))
+
+    def test_thread_page_loads_accounts_once(self):
+        # savepoint, messages with their users, accounts, release
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                f"/api/chats/thread/{self.tom.id}/", {"page_size": 50}
+            )
+        names = {
+            (message["sender_account"]["name"], message["receiver_account"]["name"])
+            for message in response.data["results"]
+        }
+        self.assertEqual(names, {("Rex", "Tom"), ("Tom", "Rex")})
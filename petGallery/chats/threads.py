@@ -0,0 +1,80 @@
+"""
+Reading the messages of a conversation. Every read filters on the canonical
+`conversation_code` and orders by `(created_at, id)`, so it is served by
+`chat_conversation_idx` whichever way the thread is scrolled. Catching up after a
+reconnect follows the ids instead, see messages_since.
+"""
+
+import uuid
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import remove_query_param
+
+from chats.conversations import conversation_code
+from chats.models import Chat
+from utils.paginator import KeysetPaginator
+
+
+def thread_messages(user_id, other_user_id):
+    return Chat.objects.filter(
+        conversation_code=conversation_code(user_id, other_user_id)
+    ).select_related("sender", "receiver")
+
+
+def get_anchor(messages, message_id):
+    """
+    Position `(created_at, id)` of the message with `message_id` among `messages`.
+    """
+    try:
+        anchor = (
+            messages.filter(message_id=uuid.UUID(str(message_id)))
+            .values_list("created_at", "id")
+            .first()
+        )
+    except ValueError:
+        anchor = None
+    if anchor is None:
+        raise ValidationError("Unknown message id")
+    return list(anchor)
+
+
+def messages_since(messages, message_id, limit):
+    """
+    Up to `limit` messages written after `message_id`, in the order they were
+    committed, and whether there are more. Write-behind batches of other workers
+    can commit messages received before the anchor after it, so this follows the
+    ids (commit ordered per conversation, see chats.conversations.save_messages)
+    rather than `created_at`.
+    """
+    _, pk = get_anchor(messages, message_id)
+    newer = messages.filter(id__gt=pk).order_by("id")
+    results = list(newer[: limit + 1])
+    return results[:limit], len(results) > limit
+
+
+class MessageThreadPaginator(KeysetPaginator):
+    """
+    Newest messages first. Besides the opaque `cursor` of the next and previous
+    links, `?before=<message id>` and `?after=<message id>` start a page right
+    before (older) or after (newer) a message the client already has.
+    """
+
+    anchor_query_params = {"before": False, "after": True}
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.messages = queryset
+        return super().paginate_queryset(queryset, request, view)
+
+    def decode_cursor(self, request):
+        if not request.query_params.get(self.cursor_query_param):
+            for param, reverse in self.anchor_query_params.items():
+                message_id = request.query_params.get(param)
+                if message_id:
+                    return get_anchor(self.messages, message_id), reverse
+        return super().decode_cursor(request)
+
+    def encode_cursor(self, position, reverse=False):
+        url = super().encode_cursor(position, reverse)
+        for param in self.anchor_query_params:
+            url = remove_query_param(url, param)
+        return url
@@ -1,10 +1,20 @@
 from django.urls import path
 
-from chats.views import MessagesInboxView, MessageThreadView, SendMessageView
+from chats.views import (
+    MarkThreadReadView,
+    MessagesInboxView,
+    MessageThreadDeltaView,
+    MessageThreadView,
+    SendMessageView,
+    UnreadCountView,
+)
 
 
 urlpatterns = [
     path("inbox/", MessagesInboxView.as_view()),
-    path("thread/<receiver_id>/", MessageThreadView.as_view()),
+    path("thread/<int:receiver_id>/", MessageThreadView.as_view()),
+    path("thread/<int:receiver_id>/delta/", MessageThreadDeltaView.as_view()),
+    path("thread/<int:receiver_id>/read/", MarkThreadReadView.as_view()),
+    path("unread/", UnreadCountView.as_view()),
     path("send/", SendMessageView.as_view()),
 ]
@@ -2,57 +2,82 @@ from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import ValidationError
-from django.db.models import Subquery, OuterRef, Q
-from chats.models import Chat
-from users.models import CustomUser
-from chats.serializers import ChatSerializer, MessageSerializer
+from django.conf import settings
+from chats.conversations import InboxPaginator, conversation_code, save_messages
+from chats.delivery import deliver_on_commit, message_event
+from chats.models import Chat, Conversation
+from chats.serializers import (
+    ChatSerializer,
+    ConversationSerializer,
+    MessageSerializer,
+)
+from chats.receipts import get_unread_total, mark_read
+from chats.threads import MessageThreadPaginator, messages_since, thread_messages
 
 # Create your views here.
 
 
 class MessagesInboxView(generics.ListAPIView):
-    queryset = Chat.objects.all()
-    serializer_class = MessageSerializer
-    permission_classes = [IsAuthenticated]
+    """
+    Conversations of the authenticated user, most recent message first.
+    """
 
-    def get_queryset(self):
-        user_id = self.request.user.id
-        messages = Chat.objects.filter(
-            id__in=Subquery(
-                CustomUser.objects.filter(
-                    Q(sender__receiver=user_id) | Q(receiver__sender=user_id)
-                )
-                .distinct()
-                .annotate(
-                    last_msg=Subquery(
-                        Chat.objects.filter(
-                            Q(sender_id=OuterRef("id"), receiver=user_id)
-                            | Q(receiver_id=OuterRef("id"), sender=user_id)
-                        )
-                        .order_by("-id")[:1]
-                        .values_list("id", flat=True)
-                    )
-                )
-                .values_list("last_msg", flat=True)
-            )
-        ).order_by("-id")
-        return messages
+    queryset = Conversation.objects.select_related(
+        "user_low", "user_high", "last_message"
+    )
+    serializer_class = ConversationSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = InboxPaginator
+    keyset_ordering = ("-last_message_at", "-id")
 
 
 class MessageThreadView(generics.ListAPIView):
+    """
+    Messages with the user in the URL, newest first.
+    ?before=<message id> for older messages, ?after=<message id> for newer ones
+    """
+
     queryset = Chat.objects.all()
     serializer_class = MessageSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = MessageThreadPaginator
 
     def get_queryset(self):
+        return thread_messages(self.request.user.id, self.kwargs["receiver_id"])
 
-        sender_id = self.request.user.id
-        receiver_id = self.kwargs["receiver_id"]
-        messages = Chat.objects.filter(
-            sender__in=[sender_id, receiver_id],
-            receiver__in=[sender_id, receiver_id],
+
+class MessageThreadDeltaView(generics.GenericAPIView):
+    serializer_class = MessageSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        """
+        This route is for catching up on a thread after reconnecting, the messages
+        written after the last one the client has, oldest first
+        ?since=<message id>
+        """
+        since = request.query_params.get("since")
+        if not since:
+            return Response(
+                {"message": "Missing 'since' query parameter"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            messages, has_more = messages_since(
+                thread_messages(request.user.id, kwargs["receiver_id"]),
+                since,
+                settings.CHAT_DELTA_MAX_MESSAGES,
+            )
+        except ValidationError:
+            return Response(
+                {"message": "Unknown message id"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        serializer = self.get_serializer(messages, many=True)
+        return Response(
+            {"results": serializer.data, "has_more": has_more},
+            status=status.HTTP_200_OK,
         )
-        return messages
 
 
 class SendMessageView(generics.CreateAPIView):
@@ -67,14 +92,60 @@ class SendMessageView(generics.CreateAPIView):
                 "sender": request.user.id,
                 "receiver": request.data["receiver_id"],
                 "message": request.data["message"],
-                "conversation_code": request.data["conversation_code"],
+                "conversation_code": conversation_code(
+                    request.user.id, request.data["receiver_id"]
+                ),
             }
             serializer = self.serializer_class(data=chat_data)
             if serializer.is_valid(raise_exception=True):
-                serializer.save()
+                message = Chat(**serializer.validated_data)
+                save_messages([message])
+                serializer.instance = message
+                deliver_on_commit(
+                    message_event(message), [message.sender_id, message.receiver_id]
+                )
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
         except:
             return Response(
                 {"message": "Something went wrong please try again."},
                 status=status.HTTP_404_NOT_FOUND,
             )
+
+
+class MarkThreadReadView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        """
+        This route is for read receipts, it marks the messages received from the user
+        in the URL up to and including `message_id` as read
+        """
+        try:
+            read = mark_read(
+                request.user.id, kwargs["receiver_id"], request.data["message_id"]
+            )
+            return Response(
+                {
+                    "message": f"{read} messages marked as read",
+                    "unread_total": get_unread_total(request.user.id),
+                },
+                status=status.HTTP_200_OK,
+            )
+        except (KeyError, ValidationError):
+            return Response(
+                {"message": "Unknown message id"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+
+class UnreadCountView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        """
+        This route is for the unread messages badge
+        """
+        return Response(
+            {"unread_total": get_unread_total(request.user.id)},
+            status=status.HTTP_200_OK,
+        )
@@ -0,0 +1,104 @@
+import hashlib
+import os
+
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from common.models import MediaBlob
+
+
+def hash_file(file):
+    """
+    Return the sha256 hex digest and size of `file`, read in chunks. Upload
+    handlers can hash while the upload streams in and set `file.sha256` and
+    `file.size`, which is used instead.
+    """
+    # the upload itself may be wrapped in a FieldFile
+    digest = getattr(file, "sha256", None) or getattr(
+        getattr(file, "file", None), "sha256", None
+    )
+    if digest:
+        return digest, file.size
+    sha256 = hashlib.sha256()
+    size = 0
+    for chunk in file.chunks():
+        sha256.update(chunk)
+        size += len(chunk)
+    return sha256.hexdigest(), size
+
+
+def blob_name(prefix, digest, filename):
+    # only where the content was first stored, see acquire_blob
+    extension = os.path.splitext(filename)[1].lower()
+    return f"{prefix.rstrip('/')}/{digest[:2]}/{digest}{extension}"
+
+
+def acquire_blob(file, prefix, storage=default_storage):
+    """
+    Store `file` under its content hash, or take another reference to the stored
+    copy when the same content was uploaded before. Returns the storage name.
+
+    Deduplication is global, across fields and prefixes: content uploaded as an
+    avatar and then as a post image is one blob under the prefix of the field that
+    stored it first. Storage names therefore say nothing about which rows use a
+    file; anything deciding access must look at the rows referencing the name (see
+    posts.views.views3.MediaView), never at its prefix.
+    """
+    digest, size = hash_file(file)
+    blobs = MediaBlob.objects.filter(sha256=digest)
+    if blobs.update(ref_count=F("ref_count") + 1):
+        return blobs.values_list("name", flat=True).get()
+
+    # a file left at this name (by a rolled back upload, or a blob being released
+    # right now) is not reused, the storage picks a free name instead
+    name = storage.save(blob_name(prefix, digest, file.name), file)
+    try:
+        with transaction.atomic():
+            MediaBlob.objects.create(sha256=digest, name=name, size=size, ref_count=1)
+    except IntegrityError:
+        # the same content was stored concurrently
+        storage.delete(name)
+        blobs.update(ref_count=F("ref_count") + 1)
+        return blobs.values_list("name", flat=True).get()
+    return name
+
+
+def claim_blob(name, digest, size, storage=default_storage):
+    """
+    Take a reference to content that was written to storage as `name` directly
+    (e.g. a presigned upload), named by blob_name. Returns the storage name to use,
+    which is the one of the existing blob when the content was stored before.
+    """
+    blobs = MediaBlob.objects.filter(sha256=digest)
+    if not blobs.update(ref_count=F("ref_count") + 1):
+        try:
+            with transaction.atomic():
+                MediaBlob.objects.create(
+                    sha256=digest, name=name, size=size, ref_count=1
+                )
+            return name
+        except IntegrityError:
+            # the same content was claimed concurrently
+            blobs.update(ref_count=F("ref_count") + 1)
+    existing = blobs.values_list("name", flat=True).get()
+    if existing != name:
+        # the same content is stored under another extension or a renamed copy
+        storage.delete(name)
+    return existing
+
+
+def release_blob(name, storage=default_storage):
+    """
+    Drop a reference to the blob stored as `name` and delete the file with the last
+    one. Files that were not stored as blobs (e.g. the default avatar) are left alone.
+    """
+    with transaction.atomic():
+        blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+        if blob is None:
+            return
+        if blob.ref_count > 1:
+            MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F("ref_count") - 1)
+            return
+        blob.delete()
+    storage.delete(name)
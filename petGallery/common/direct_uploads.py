@@ -0,0 +1,209 @@
+import base64
+import hashlib
+import os
+import re
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+from common.blobs import blob_name, claim_blob
+from utils.upload_handlers import HEADER_LENGTH, is_image_header
+
+SIGNING_SALT = "common.direct_uploads"
+SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+CONTENT_TYPES = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+}
+
+
+class DirectUploadError(Exception):
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+class LocalBackend:
+    """
+    Stand-in for object storage in development and tests. Files are PUT to
+    common.views.DirectUploadView, which checks them like S3 checks a presigned
+    upload and saves them to the default storage.
+    """
+
+    def presign(self, token, upload):
+        return reverse("direct-upload", args=[token]), {
+            "Content-Type": upload["content_type"]
+        }
+
+    def stat(self, name):
+        if not default_storage.exists(name):
+            return None
+        return default_storage.size(name), None
+
+    def read_header(self, name):
+        with default_storage.open(name, "rb") as file:
+            return file.read(HEADER_LENGTH)
+
+
+class S3Backend:
+    """
+    Presigned PUTs to the bucket of the default (django-storages S3) storage. The
+    URL is signed for the declared size, type and SHA-256 checksum, so S3 refuses
+    any other content.
+    """
+
+    def __init__(self):
+        self.client = default_storage.connection.meta.client
+        self.bucket = default_storage.bucket_name
+
+    def key(self, name):
+        return default_storage._normalize_name(name)
+
+    def presign(self, token, upload):
+        checksum = base64.b64encode(bytes.fromhex(upload["sha256"])).decode()
+        params = {
+            "Bucket": self.bucket,
+            "Key": self.key(upload["name"]),
+            "ContentType": upload["content_type"],
+            "ContentLength": upload["size"],
+            "ChecksumSHA256": checksum,
+            **{
+                key: value
+                for key, value in settings.AWS_S3_OBJECT_PARAMETERS.items()
+                if key == "CacheControl"
+            },
+        }
+        url = self.client.generate_presigned_url(
+            "put_object", Params=params, ExpiresIn=settings.DIRECT_UPLOAD_EXPIRY
+        )
+        headers = {
+            "Content-Type": upload["content_type"],
+            "x-amz-checksum-sha256": checksum,
+        }
+        if "CacheControl" in params:
+            headers["Cache-Control"] = params["CacheControl"]
+        return url, headers
+
+    def stat(self, name):
+        try:
+            head = self.client.head_object(
+                Bucket=self.bucket, Key=self.key(name), ChecksumMode="ENABLED"
+            )
+        except self.client.exceptions.ClientError:
+            return None
+        checksum = head.get("ChecksumSHA256")
+        return head["ContentLength"], checksum and base64.b64decode(checksum).hex()
+
+    def read_header(self, name):
+        response = self.client.get_object(
+            Bucket=self.bucket,
+            Key=self.key(name),
+            Range=f"bytes=0-{HEADER_LENGTH - 1}",
+        )
+        return response["Body"].read()
+
+
+BACKENDS = {"local": LocalBackend, "s3": S3Backend}
+
+
+def get_backend():
+    return BACKENDS[settings.DIRECT_UPLOAD_BACKEND]()
+
+
+def get_field_label(field):
+    return f"{field.model._meta.label_lower}.{field.name}"
+
+
+def presign_upload(user, field, size, sha256, content_type):
+    """
+    Issue a URL the client uploads one image to, bypassing the API servers. The
+    file is stored under its content-addressed name for `field` (a
+    ContentAddressedImageField) and the returned token completes the upload.
+    """
+    sha256 = str(sha256).lower()
+    if not SHA256_PATTERN.match(sha256):
+        raise DirectUploadError("sha256 must be a hex encoded SHA-256 digest", 400)
+    if content_type not in CONTENT_TYPES:
+        raise DirectUploadError("Only JPEG, PNG, GIF and WebP images are accepted", 400)
+    size = int(size)
+    if not 0 < size <= settings.UPLOAD_MAX_FILE_SIZE:
+        raise DirectUploadError(
+            f"Files must be between 1 and {settings.UPLOAD_MAX_FILE_SIZE} bytes", 413
+        )
+
+    # the extension follows the declared type, not the client's file name
+    filename = "upload" + CONTENT_TYPES[content_type]
+    prefix = os.path.dirname(field.generate_filename(None, filename))
+    upload = {
+        "user": user.pk,
+        "field": get_field_label(field),
+        "name": blob_name(prefix, sha256, filename),
+        "size": size,
+        "sha256": sha256,
+        "content_type": content_type,
+    }
+    token = signing.dumps(upload, salt=SIGNING_SALT)
+    url, headers = get_backend().presign(token, upload)
+    return {
+        "url": url,
+        "method": "PUT",
+        "headers": headers,
+        "token": token,
+        "expires_in": settings.DIRECT_UPLOAD_EXPIRY,
+    }
+
+
+def load_token(token, max_age=None):
+    try:
+        return signing.loads(
+            token,
+            salt=SIGNING_SALT,
+            max_age=max_age or settings.DIRECT_UPLOAD_EXPIRY,
+        )
+    except signing.BadSignature:
+        raise DirectUploadError("Invalid or expired upload", 400)
+
+
+def complete_upload(user, field, token):
+    """
+    Check the object uploaded with `token` and take a reference to it, returns the
+    name to assign to `field`. Must run in the transaction saving that field.
+    """
+    # an upload started just before its URL expired may finish after it
+    upload = load_token(token, max_age=2 * settings.DIRECT_UPLOAD_EXPIRY)
+    if upload["user"] != user.pk or upload["field"] != get_field_label(field):
+        raise DirectUploadError("Invalid or expired upload", 400)
+
+    backend = get_backend()
+    stat = backend.stat(upload["name"])
+    if stat is None:
+        raise DirectUploadError("The file has not been uploaded", 409)
+    size, sha256 = stat
+    if size != upload["size"] or sha256 not in (None, upload["sha256"]):
+        raise DirectUploadError("The uploaded file does not match", 400)
+    if not is_image_header(backend.read_header(upload["name"])):
+        raise DirectUploadError("The file is not a JPEG, PNG, GIF or WebP image", 400)
+    return claim_blob(upload["name"], upload["sha256"], upload["size"])
+
+
+def receive_local_upload(token, stream):
+    """
+    Store a file PUT to LocalBackend, refusing content other than what was signed.
+    """
+    upload = load_token(token)
+    data = stream.read(upload["size"] + 1)
+    if len(data) != upload["size"]:
+        raise DirectUploadError("Body does not match the signed size", 400)
+    if hashlib.sha256(data).hexdigest() != upload["sha256"]:
+        raise DirectUploadError("Body does not match the signed checksum", 400)
+    if not default_storage.exists(upload["name"]):
+        # the name is derived from the content, so an existing file is identical
+        saved = default_storage.save(upload["name"], ContentFile(data))
+        if saved != upload["name"]:
+            default_storage.delete(saved)
@@ -0,0 +1,49 @@
+import os
+
+from django.db import models, transaction
+from django.db.models.signals import post_delete
+
+from common.blobs import acquire_blob, release_blob
+
+
+class ContentAddressedImageField(models.ImageField):
+    """
+    ImageField that stores uploads under `upload_to/<sha256[:2]>/<sha256>.<ext>` and
+    deduplicates them through common.models.MediaBlob. Uploading content that is
+    already stored (by any field) only takes another reference to it, so the file
+    may live under another field's `upload_to`. References are dropped when the row
+    is deleted or the file is replaced.
+    """
+
+    def contribute_to_class(self, cls, name, **kwargs):
+        super().contribute_to_class(cls, name, **kwargs)
+        if not cls._meta.abstract:
+            post_delete.connect(self.release_after_delete, sender=cls, weak=False)
+
+    def pre_save(self, model_instance, add):
+        file = getattr(model_instance, self.attname)
+        if file and not file._committed:
+            previous = None
+            if not add and model_instance.pk is not None:
+                previous = (
+                    type(model_instance)
+                    ._base_manager.filter(pk=model_instance.pk)
+                    .values_list(self.attname, flat=True)
+                    .first()
+                )
+            prefix = os.path.dirname(self.generate_filename(model_instance, file.name))
+            file.name = acquire_blob(file, prefix, self.storage)
+            file._committed = True
+            if previous:
+                # also when the same content was uploaded again, acquire_blob took
+                # another reference to it
+                self.release_on_commit(previous)
+        return file
+
+    def release_on_commit(self, name):
+        transaction.on_commit(lambda: release_blob(name, self.storage))
+
+    def release_after_delete(self, sender, instance, **kwargs):
+        name = getattr(instance, self.attname).name
+        if name:
+            self.release_on_commit(name)
@@ -13,3 +13,15 @@ class AbstractBaseModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class MediaBlob(AbstractBaseModel):
+    """
+    Uploaded file stored once under its content hash and shared by every row that
+    references it, see common.fields.ContentAddressedImageField.
+    """
+
+    sha256 = models.CharField("SHA-256", max_length=64, unique=True)
+    name = models.CharField("Storage name", max_length=255, unique=True)
+    size = models.PositiveBigIntegerField("Size")
+    ref_count = models.PositiveIntegerField("References", default=0)
@@ -1,3 +1,158 @@
-from django.test import TestCase
+import hashlib
+import tempfile
+from io import BytesIO
 
-# Create your tests here.
+from PIL import Image as PILImage
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from common.models import MediaBlob
+from posts.models import Image, Post
+from users.models import Account, CustomUser
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), IMAGE_PROCESSING_WORKERS=0)
+class MediaBlobTest(TestCase):
+    def upload(self, color="orange", name="pet.png"):
+        content = BytesIO()
+        PILImage.new("RGB", (4, 4), color).save(content, format="PNG")
+        return SimpleUploadedFile(name, content.getvalue())
+
+    def test_identical_uploads_share_one_file(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = Image.objects.create(image=self.upload())
+            second = Image.objects.create(image=self.upload(name="copy.png"))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.name.startswith("post_images/"))
+        blob = MediaBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        derivative_files = set(first.derivatives.values_list("file", flat=True))
+        self.assertEqual(len(derivative_files), 3)
+        self.assertEqual(
+            set(second.derivatives.values_list("file", flat=True)), derivative_files
+        )
+        # reuses one derivative of each kind, not one per referencing image
+        with self.captureOnCommitCallbacks(execute=True):
+            third = Image.objects.create(image=self.upload(name="again.png"))
+        self.assertCountEqual(
+            third.derivatives.values_list("file", flat=True), derivative_files
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            third.delete()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(default_storage.exists(blob.name))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(default_storage.exists(blob.name))
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(any(map(default_storage.exists, derivative_files)))
+
+    def test_replacing_an_avatar_releases_the_old_file(self):
+        user = CustomUser.objects.create_user(username="pet", password="pw")
+        account = Account.objects.create(
+            user=user,
+            name="pet",
+            bio="",
+            age=1,
+            gender="MALE",
+            animal="DOG",
+            breed="Pug",
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            account.avatar = self.upload()
+            account.save()
+            Image.objects.create(image=self.upload())
+            account.avatar = self.upload("black")
+            account.save()
+        # the orange file is still used by the post image
+        self.assertEqual(
+            list(MediaBlob.objects.values_list("ref_count", flat=True)), [1, 1]
+        )
+        self.assertEqual(MediaBlob.objects.count(), 2)
+
+
+@override_settings(
+    MEDIA_ROOT=tempfile.mkdtemp(),
+    IMAGE_PROCESSING_WORKERS=0,
+    DIRECT_UPLOAD_BACKEND="local",
+)
+class DirectUploadTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username="pet", password="pw")
+        Account.objects.create(
+            user=self.user,
+            name="pet",
+            bio="",
+            age=1,
+            gender="MALE",
+            animal="DOG",
+            breed="Pug",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.get(pk=self.user.pk))
+        content = BytesIO()
+        PILImage.new("RGB", (4, 4), "orange").save(content, format="PNG")
+        self.data = content.getvalue()
+
+    def presign(self, url):
+        response = self.client.post(
+            url,
+            {
+                "size": len(self.data),
+                "sha256": hashlib.sha256(self.data).hexdigest(),
+                "content_type": "image/png",
+            },
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.data
+
+    def put(self, upload, data):
+        # sent without credentials, the URL is signed
+        return APIClient().put(
+            upload["url"], data, content_type=upload["headers"]["Content-Type"]
+        )
+
+    def test_post_image_is_uploaded_to_storage_and_attached(self):
+        post = Post.objects.create(user=self.user, caption="")
+        upload = self.presign("/api/posts/uploads/presigned/")
+        complete = {"post": post.pk, "token": upload["token"]}
+
+        response = self.client.post("/api/posts/uploads/presigned/complete/", complete)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.put(upload, self.data[:-1] + b"x").status_code, 400)
+        self.assertEqual(self.put(upload, self.data).status_code, 200)
+
+        response = self.client.post("/api/posts/uploads/presigned/complete/", complete)
+        self.assertEqual(response.status_code, 201)
+        image = Image.objects.get(post=post)
+        blob = MediaBlob.objects.get()
+        self.assertEqual(image.image.name, blob.name)
+        self.assertEqual(blob.ref_count, 1)
+        with image.image.open("rb") as file:
+            self.assertEqual(file.read(), self.data)
+
+    def test_avatar_token_is_only_valid_for_the_avatar(self):
+        upload = self.presign("/api/users/account/avatar/")
+        self.put(upload, self.data)
+        post = Post.objects.create(user=self.user, caption="")
+        response = self.client.post(
+            "/api/posts/uploads/presigned/complete/",
+            {"post": post.pk, "token": upload["token"]},
+        )
+        self.assertEqual(response.status_code, 400)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/users/account/avatar/complete/", {"token": upload["token"]}
+            )
+        self.assertEqual(response.status_code, 200)
+        account = Account.objects.get(user=self.user)
+        self.assertTrue(account.avatar.name.startswith("profile_photos/"))
+        self.assertEqual(MediaBlob.objects.get().name, account.avatar.name)
+        self.assertEqual((account.avatar_width, account.avatar_height), (4, 4))
+        self.assertTrue(account.avatar_placeholder)
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from common.views import DirectUploadView
+
+
+urlpatterns = [
+    path("direct/<str:token>/", DirectUploadView.as_view(), name="direct-upload"),
+]
@@ -1,3 +1,25 @@
-from django.shortcuts import render
+from rest_framework import generics, status
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from common.direct_uploads import DirectUploadError, receive_local_upload
 
-# Create your views here.
+
+class DirectUploadView(generics.GenericAPIView):
+    # the signed token in the URL is the credential, like a presigned S3 URL
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def put(self, request, token, *args, **kwargs):
+        """
+        This route receives files uploaded to presigned URLs when DIRECT_UPLOAD_BACKEND is "local", the raw bytes are the request body.
+        """
+        try:
+            receive_local_upload(token, request._request)
+            return Response(status=status.HTTP_200_OK)
+        except DirectUploadError as e:
+            return Response({"message": e.message}, status=e.status_code)
+        except Exception as e:
+            return Response(
+                {"message": "Something went wrong. Please try again."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
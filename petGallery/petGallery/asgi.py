@@ -37,6 +37,7 @@ chat_application = ProtocolTypeRouter(
         "websocket": TokenAuthMiddleware(
             URLRouter(
                 [
+                    re_path(r"ws/chat/$", ChatConsumer.as_asgi()),
                     re_path(r"ws/chat/(?P<user_id>\w+)/$", ChatConsumer.as_asgi()),
                 ]
             )
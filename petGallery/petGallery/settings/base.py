@@ -43,6 +43,7 @@ DJANGO_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "django.contrib.admin",
+    "django.contrib.postgres",
     "django.forms",
 ]
 THIRD_PARTY_APPS = [
@@ -54,6 +55,7 @@ THIRD_PARTY_APPS = [
 ]
 
 LOCAL_APPS = [
+    "common.apps.CommonConfig",
     "users.apps.UsersConfig",
     "search.apps.SearchConfig",
     "posts.apps.PostsConfig",
@@ -190,7 +192,7 @@ REST_FRAMEWORK = {
         "rest_framework.authentication.SessionAuthentication",
         "rest_framework.authentication.BasicAuthentication",
     ),
-    "DEFAULT_PAGINATION_CLASS": "utils.paginator.DefaultCustomPaginator",
+    "DEFAULT_PAGINATION_CLASS": "utils.paginator.KeysetPaginator",
     "PAGE_SIZE": 10,
 }
 
@@ -218,6 +220,13 @@ SWAGGER_SETTINGS = {
 
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")  # Directory where uploaded media is saved.
 MEDIA_URL = "/media/"
+# How media files are sent once posts.views.views3.MediaView authorized the request:
+# "nginx" (X-Accel-Redirect to MEDIA_ACCEL_REDIRECT_PREFIX, an `internal` location
+# aliased to MEDIA_ROOT), "apache" (X-Sendfile) or "django" (development only).
+MEDIA_SERVING = os.getenv("MEDIA_SERVING", "django")
+MEDIA_ACCEL_REDIRECT_PREFIX = "/protected-media/"
+# Seconds browsers (and shared caches, for public files) may reuse a media file.
+MEDIA_CACHE_MAX_AGE = 7 * 24 * 60 * 60
 
 # Chat app configuration
 ASGI_APPLICATION = "petGallery.asgi.chat_application"
@@ -231,9 +240,108 @@ CHANNEL_LAYERS = {
     },
 }
 
+# FEED
+# ------------------------------------------------------------------------------
+# Home feeds are materialized per reader (posts.FeedEntry) when a post is created.
+# Number of entries kept in each reader's feed, trimmed as entries are written.
+FEED_MAX_LENGTH = 800
+# Number of an author's recent posts copied into a feed when they are followed.
+FEED_BACKFILL_LENGTH = 50
+FEED_FANOUT_BATCH_SIZE = 1000
+# Authors with at least this many followers (posts.FeedPullAuthor) are not fanned
+# out on write, their posts are pulled into their followers' feeds at read time.
+FEED_FANOUT_MAX_FOLLOWERS = 10000
+FEED_PULL_AUTHORS_CACHE_TIMEOUT = 60 * 10
+# Threads per server process writing feed entries after a post is created, 0 fans
+# out inline in the request.
+FEED_FANOUT_WORKERS = 2
+
+# IMAGES
+# ------------------------------------------------------------------------------
+# Uploaded post images are resized to these widths (never upscaled) and re-encoded
+# in each format by posts.media, the first format is the one served in `srcset`.
+IMAGE_VARIANTS = {"thumbnail": 150, "grid": 640, "full": 1080}
+IMAGE_DERIVATIVE_FORMATS = ["webp"]
+IMAGE_DERIVATIVE_QUALITY = 80
+# Largest side of the inline placeholder of post images and profile photos.
+IMAGE_PLACEHOLDER_SIZE = 32
+# Post images whose perceptual hashes differ by at most this many of their 64 bits
+# are reported as near-duplicates, see posts.duplicates.
+DUPLICATE_IMAGE_MAX_DISTANCE = 6
+# Worker processes (and scheduling threads) per server process, 0 processes images
+# inline in the request.
+IMAGE_PROCESSING_WORKERS = 2
+
+# UPLOADS
+# ------------------------------------------------------------------------------
+# Limits enforced while multipart uploads stream in, see utils.upload_handlers.
+UPLOAD_MAX_FILES = 10
+UPLOAD_MAX_FILE_SIZE = 10 * 1024 * 1024
+UPLOAD_MAX_REQUEST_SIZE = 60 * 1024 * 1024
+# Resumable upload sessions are assembled here, it has to be shared by all servers.
+UPLOAD_SESSION_ROOT = os.getenv(
+    "UPLOAD_SESSION_ROOT", os.path.join(BASE_DIR, "upload_sessions")
+)
+# Largest chunk accepted per request, and how long unfinished sessions are kept.
+UPLOAD_CHUNK_MAX_SIZE = 8 * 1024 * 1024
+UPLOAD_SESSION_EXPIRY_HOURS = 24
+# Where presigned uploads go, see common.direct_uploads: "s3" for the bucket of the
+# default storage, "local" for a stand-in served by the API itself.
+DIRECT_UPLOAD_BACKEND = os.getenv("DIRECT_UPLOAD_BACKEND", "local")
+# Seconds a presigned upload URL is valid.
+DIRECT_UPLOAD_EXPIRY = 15 * 60
+
+# EXPLORE
+# ------------------------------------------------------------------------------
+# Explore serves a pool of ranked posts (posts.ExploreCandidate) rebuilt on a
+# schedule with `manage.py build_explore_pool`.
+EXPLORE_POOL_SIZE = 1000
+# Only posts younger than this are ranked.
+EXPLORE_MAX_AGE_DAYS = 7
+# score = (weighted engagement + 1) / (age in hours + 2) ** EXPLORE_GRAVITY
+EXPLORE_WEIGHTS = {"likes": 1, "comments": 2, "saves": 3}
+EXPLORE_GRAVITY = 1.5
+
+# SEARCH
+# ------------------------------------------------------------------------------
+SEARCH_RESULTS_LIMIT = 10
+# Similar spellings (pg_trgm) are only searched for terms at least this long.
+SEARCH_FUZZY_MIN_LENGTH = 3
+# Text search configuration used for post captions and locations.
+SEARCH_TEXT_CONFIG = "english"
+# Trending hashtags are ranked over these sliding windows, in hours.
+TRENDING_WINDOWS = {"1h": 1, "24h": 24, "7d": 24 * 7}
+TRENDING_RESULTS_LIMIT = 20
+TRENDING_CACHE_TIMEOUT = 60
+
+# ACCOUNTS
+# ------------------------------------------------------------------------------
+# Follower/following counts of profile cards are cached per account under a
+# version that is dropped whenever a follow is created or removed.
+FOLLOW_COUNTS_CACHE_TIMEOUT = 60 * 60 * 24
+
+# COMMENTS
+# ------------------------------------------------------------------------------
+# Number of replies shown under each comment in the comment tree.
+COMMENT_REPLY_PREVIEW_SIZE = 3
+# Number of reply levels shown below a top-level comment in the comment tree.
+COMMENT_TREE_MAX_DEPTH = 3
+
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_URLS_REGEX = r"^/api/.*$"
 
+# CHATS
+# ------------------------------------------------------------------------------
+# Chat messages are broadcast as soon as they are received and written behind in
+# batches (chats.buffer) of at most CHAT_WRITE_BATCH_SIZE messages, at the latest
+# CHAT_WRITE_BATCH_DELAY seconds after the first message of a batch.
+CHAT_WRITE_BATCH_SIZE = 100
+CHAT_WRITE_BATCH_DELAY = 0.02
+# Only broadcast (and acknowledge to the sender) messages once they are committed.
+CHAT_WRITE_DURABLE = os.getenv("CHAT_WRITE_DURABLE", "false").lower() == "true"
+# Most messages returned by one request to the thread delta endpoint.
+CHAT_DELTA_MAX_MESSAGES = 500
+
 # SECURITY
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#session-cookie-httponly
@@ -84,6 +84,8 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 # ------------------------------------------------------------------------------
 DEFAULT_FILE_STORAGE = "rentalsystem.utils.storages.MediaRootS3Boto3Storage"
 MEDIA_URL = f"https://{aws_s3_domain}/media/"
+# Images are uploaded straight to the bucket with presigned URLs.
+DIRECT_UPLOAD_BACKEND = "s3"
 
 # EMAIL
 # ------------------------------------------------------------------------------
@@ -18,11 +18,12 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import include, path
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib.staticfiles.urls import staticfiles_urlpatterns
 from users import urls as user_urls
 from posts import urls as post_urls
 from chats import urls as chat_urls
+from search import urls as search_urls
+from common import urls as common_urls
 
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
@@ -32,6 +33,7 @@ from rest_framework_simplejwt.views import (
     TokenVerifyView,
 )
 from users.views.views1 import CustomTokenObtainPairView
+from posts.views.views3 import MediaView
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -51,6 +53,8 @@ urlpatterns = [
     path("api/users/", include(user_urls)),
     path("api/posts/", include(post_urls)),
     path("api/chats/", include(chat_urls)),
+    path("api/search/", include(search_urls)),
+    path("api/media/", include(common_urls)),
     path("api/token/", CustomTokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("api/token/verify/", TokenVerifyView.as_view(), name="token_verify"),
@@ -60,7 +64,13 @@ urlpatterns = [
         name="schema-swagger-ui",
     ),
     path("redoc/", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
+
+if not settings.MEDIA_URL.startswith(("http://", "https://")):
+    # media is authorized here and sent by the front proxy, see utils.media_serving
+    urlpatterns += [
+        path(f"{settings.MEDIA_URL.lstrip('/')}<path:name>", MediaView.as_view())
+    ]
 
 if settings.DEBUG:
     # Static file serving when using Gunicorn + Uvicorn for local web socket development
@@ -1,4 +1,7 @@
+from django.conf import settings
 from django.contrib import admin
+from django.http import HttpResponseRedirect
+from posts.duplicates import near_duplicates
 from posts.models import Hashtag, Post, Comment, Image, SavePost, ArchivePost
 
 # Register your models here.
@@ -29,6 +32,24 @@ class CommentAdmin(admin.ModelAdmin):
 @admin.register(Image)
 class ImageAdmin(admin.ModelAdmin):
     list_display = ("post", "image", "created_at", "updated_at")
+    actions = ["find_near_duplicates"]
+
+    @admin.action(description="Find near-duplicates of selected images")
+    def find_near_duplicates(self, request, queryset):
+        # list the selected images together with their near-duplicates
+        image_ids = set(queryset.values_list("id", flat=True))
+        for phash in queryset.filter(phash__isnull=False).values_list(
+            "phash", flat=True
+        ):
+            image_ids.update(
+                near_duplicates(
+                    phash, settings.DUPLICATE_IMAGE_MAX_DISTANCE
+                ).values_list("id", flat=True)
+            )
+        self.message_user(
+            request, f"{len(image_ids) - queryset.count()} near-duplicates found."
+        )
+        return HttpResponseRedirect(f"?id__in={','.join(map(str, sorted(image_ids)))}")
 
 
 @admin.register(SavePost)
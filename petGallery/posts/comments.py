@@ -0,0 +1,91 @@
+from django.conf import settings
+from django.db.models import Count, F, Window, prefetch_related_objects
+from django.db.models.functions import RowNumber
+
+from posts.models import Comment
+
+
+def get_reply_previews(parent_ids, preview_size):
+    """
+    Fetch the first `preview_size` direct replies (oldest first) of each of the
+    given comments, each annotated with `sibling_count`, the number of replies of
+    its parent. Replies are numbered and counted per parent in SQL, only the
+    previewed ones are returned.
+    """
+    return list(
+        Comment.objects.filter(replies__in=parent_ids, is_deleted=False)
+        .annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=F("replies"),
+                order_by=[F("created_at").asc(), F("id").asc()],
+            ),
+            sibling_count=Window(Count("id"), partition_by=F("replies")),
+        )
+        .filter(position__lte=preview_size)
+        .order_by("created_at", "id")
+    )
+
+
+def count_replies(parent_ids):
+    return dict(
+        Comment.objects.filter(replies__in=parent_ids, is_deleted=False)
+        .order_by()
+        .values("replies")
+        .annotate(count=Count("id"))
+        .values_list("replies", "count")
+    )
+
+
+def build_comment_tree(roots, preview_size=None, max_depth=None):
+    """
+    Attach `reply_count` and a `reply_preview` (the first `preview_size` direct
+    replies, oldest first) to each of `roots` and their previewed replies, down to
+    `max_depth` levels, with one query per level. Replies of deleted comments are
+    not followed. Returns every comment that ends up in the tree.
+    """
+    if preview_size is None:
+        preview_size = settings.COMMENT_REPLY_PREVIEW_SIZE
+    if max_depth is None:
+        max_depth = settings.COMMENT_TREE_MAX_DEPTH
+
+    visible = []
+    level = list(roots)
+    depth = 0
+    while level:
+        by_id = {comment.id: comment for comment in level}
+        for comment in level:
+            comment.reply_count = 0
+            comment.reply_preview = []
+        next_level = []
+        if depth < max_depth and preview_size:
+            next_level = get_reply_previews(list(by_id), preview_size)
+            for reply in next_level:
+                parent = by_id[reply.replies_id]
+                parent.reply_count = reply.sibling_count
+                parent.reply_preview.append(reply)
+        else:
+            # the deepest shown comments only get a reply_count
+            for parent_id, count in count_replies(list(by_id)).items():
+                by_id[parent_id].reply_count = count
+        visible += level
+        level = next_level
+        depth += 1
+
+    prefetch_related_objects(visible, "user")
+    return visible
+
+
+def nest_comment_data(roots, serialized):
+    """
+    Turn serialized comments (keyed by id) into nested dicts following each
+    comment's `reply_preview`.
+    """
+
+    def nest(comment):
+        data = serialized[comment.id]
+        data["reply_count"] = comment.reply_count
+        data["replies"] = [nest(reply) for reply in comment.reply_preview]
+        return data
+
+    return [nest(root) for root in roots]
@@ -0,0 +1,38 @@
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from posts.models import Post, Comment
+
+
+def count_subquery(queryset, field):
+    """
+    Correlated COUNT(*) of `queryset` rows whose `field` points at the outer row.
+    """
+    counts = (
+        queryset.filter(**{field: OuterRef("pk")})
+        .order_by()
+        .values(field)
+        .annotate(count=Count("*"))
+        .values("count")
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def repair_post_counters(posts=None):
+    """
+    Recompute the denormalized like, comment and save counts of `posts` (or all posts).
+    Returns the number of updated rows.
+    """
+    posts = Post.objects.all() if posts is None else posts
+    return posts.update(
+        like_count=count_subquery(Post.likes.through.objects.all(), "post"),
+        comment_count=count_subquery(Comment.objects.filter(is_deleted=False), "post"),
+        save_count=count_subquery(Post.saved_by.through.objects.all(), "post"),
+    )
+
+
+def repair_comment_counters(comments=None):
+    comments = Comment.objects.all() if comments is None else comments
+    return comments.update(
+        like_count=count_subquery(Comment.likes.through.objects.all(), "comment")
+    )
@@ -0,0 +1,94 @@
+"""
+Near-duplicate detection over the perceptual hashes of post images.
+
+The 64 bit hash is also stored as BANDS indexed 16 bit bands (multi-index hashing):
+two hashes at most `distance` bits apart have at least one band at most
+`distance // BANDS` bits apart, so candidates are found through index lookups of
+the few band values that close, and only they are compared bit by bit.
+"""
+
+from itertools import combinations
+
+from django.db.models import BigIntegerField, F, Func, IntegerField, Q, Value
+
+from posts.models import Image
+
+BANDS = 4
+BAND_BITS = 64 // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+
+class HammingDistance(Func):
+    arg_joiner = " # "
+    template = "bit_count((%(expressions)s)::bit(64))"
+    output_field = IntegerField()
+
+
+def to_signed(value):
+    # stored in a signed bigint column
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def split_bands(value):
+    value &= (1 << 64) - 1
+    return [value >> (band * BAND_BITS) & BAND_MASK for band in range(BANDS)]
+
+
+def get_hash_fields(value):
+    """
+    Image field values storing the perceptual hash `value`.
+    """
+    fields = {"phash": to_signed(value)}
+    for band, band_value in enumerate(split_bands(value)):
+        fields[f"phash_band_{band}"] = band_value
+    return fields
+
+
+def band_neighbours(value, radius):
+    """
+    Every band value at most `radius` bits from `value`.
+    """
+    neighbours = []
+    for distance in range(radius + 1):
+        for bits in combinations(range(BAND_BITS), distance):
+            flipped = value
+            for bit in bits:
+                flipped ^= 1 << bit
+            neighbours.append(flipped)
+    return neighbours
+
+
+def near_duplicates(phash, max_distance, images=None):
+    """
+    Images (from `images`, all by default) whose perceptual hash is at most
+    `max_distance` bits from `phash`, closest first and annotated with `distance`.
+    """
+    if images is None:
+        images = Image.objects.all()
+    radius = max_distance // BANDS
+    candidates = Q()
+    for band, band_value in enumerate(split_bands(phash)):
+        candidates |= Q(
+            **{f"phash_band_{band}__in": band_neighbours(band_value, radius)}
+        )
+    return (
+        images.filter(candidates)
+        .annotate(
+            distance=HammingDistance(
+                F("phash"), Value(to_signed(phash), BigIntegerField())
+            )
+        )
+        .filter(distance__lte=max_distance)
+        .order_by("distance", "id")
+    )
+
+
+def find_duplicate_pairs(images, max_distance):
+    """
+    Yield `(image, duplicate)` for every image in `images` and each near-duplicate
+    of it uploaded later, so every pair is reported once.
+    """
+    for image in images.filter(phash__isnull=False).order_by("id").iterator():
+        later = Image.objects.filter(id__gt=image.id)
+        for duplicate in near_duplicates(image.phash, max_distance, later):
+            yield image, duplicate
@@ -0,0 +1,78 @@
+import heapq
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from posts.models import ExploreCandidate, Post
+from users.models import BlockAccount
+
+
+def explore_score(like_count, comment_count, save_count, created_at, now):
+    """
+    Engagement weighted by `EXPLORE_WEIGHTS` and decayed with the post's age in
+    hours, `(engagement + 1) / (age + 2) ** EXPLORE_GRAVITY`.
+    """
+    weights = settings.EXPLORE_WEIGHTS
+    engagement = (
+        like_count * weights["likes"]
+        + comment_count * weights["comments"]
+        + save_count * weights["saves"]
+    )
+    age_hours = max((now - created_at).total_seconds() / 3600, 0)
+    return (engagement + 1) / (age_hours + 2) ** settings.EXPLORE_GRAVITY
+
+
+def build_explore_pool():
+    """
+    Rank the public posts of the last `EXPLORE_MAX_AGE_DAYS` days and replace the explore pool
+    with the best `EXPLORE_POOL_SIZE` of them. Returns the size of the new pool.
+    """
+    now = timezone.now()
+    posts = Post.objects.filter(
+        created_at__gte=now - timedelta(days=settings.EXPLORE_MAX_AGE_DAYS),
+        is_deleted=False,
+        is_archived=False,
+        user__account__private=False,
+    ).values_list("id", "like_count", "comment_count", "save_count", "created_at")
+    ranked = heapq.nlargest(
+        settings.EXPLORE_POOL_SIZE,
+        (
+            (explore_score(*counts, now=now), post_id)
+            for post_id, *counts in posts.iterator()
+        ),
+    )
+    with transaction.atomic():
+        ExploreCandidate.objects.all().delete()
+        ExploreCandidate.objects.bulk_create(
+            ExploreCandidate(post_id=post_id, score=score) for score, post_id in ranked
+        )
+    return len(ranked)
+
+
+def explore_queryset(user):
+    """
+    Posts from the explore pool the user may see, best ranked first. Authors the
+    user blocked or was blocked by, private accounts and the user's own posts are
+    left out.
+    """
+    blocked_user_ids = BlockAccount.objects.filter(
+        user__user=user, users__isnull=False
+    ).values("users__user_id")
+    blocked_by_user_ids = BlockAccount.objects.filter(users__user=user).values(
+        "user__user_id"
+    )
+    return (
+        Post.objects.filter(
+            explore_candidate__isnull=False,
+            is_deleted=False,
+            is_archived=False,
+            user__account__private=False,
+        )
+        .exclude(user=user)
+        .exclude(user_id__in=blocked_user_ids)
+        .exclude(user_id__in=blocked_by_user_ids)
+        .annotate(explore_score=F("explore_candidate__score"))
+    )
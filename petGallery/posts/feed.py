@@ -0,0 +1,262 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connection, transaction
+
+from posts.models import FeedEntry, FeedPullAuthor, Post
+from users.models import CustomUser, FollowAccount
+from utils.paginator import KeysetPaginator
+
+logger = logging.getLogger(__name__)
+
+PULL_AUTHORS_CACHE_KEY = "feed:pull_author_ids"
+
+_scheduler = None
+
+
+def get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = ThreadPoolExecutor(
+            max_workers=settings.FEED_FANOUT_WORKERS,
+            thread_name_prefix="feed-fanout",
+        )
+    return _scheduler
+
+
+def run_safely(task, *args):
+    try:
+        task(*args)
+    except Exception:
+        logger.exception("Failed to run %s for %s", task.__name__, args)
+
+
+def run_in_background(task, *args):
+    try:
+        run_safely(task, *args)
+    finally:
+        close_old_connections()
+
+
+def schedule_fan_out(task, *args):
+    """
+    Run `task` (fan_out_post or backfill_followers) off the request thread, or
+    inline when `FEED_FANOUT_WORKERS` is 0. Work lost (e.g. on a restart) is
+    picked up by `manage.py backfill_feeds`.
+    """
+    if not settings.FEED_FANOUT_WORKERS:
+        run_safely(task, *args)
+        return
+    get_scheduler().submit(run_in_background, task, *args)
+
+
+def pull_author_ids():
+    """
+    Return the ids of users with too many followers to fan out on write.
+    Their posts are merged into followers' feeds at read time instead.
+    """
+    author_ids = cache.get(PULL_AUTHORS_CACHE_KEY)
+    if author_ids is None:
+        author_ids = set(FeedPullAuthor.objects.values_list("user_id", flat=True))
+        cache.set(
+            PULL_AUTHORS_CACHE_KEY,
+            author_ids,
+            settings.FEED_PULL_AUTHORS_CACHE_TIMEOUT,
+        )
+    return author_ids
+
+
+def is_pull_author(user_id):
+    # writers read the table, a stale cached set would lose posts
+    return FeedPullAuthor.objects.filter(user_id=user_id).exists()
+
+
+def follower_user_ids(author_user_id):
+    return (
+        FollowAccount.objects.filter(following__user_id=author_user_id)
+        .values_list("follower__user_id", flat=True)
+        .iterator()
+    )
+
+
+def recent_posts(author_user_id):
+    return list(
+        Post.objects.filter(
+            user_id=author_user_id, is_deleted=False, is_archived=False
+        ).values_list("id", "created_at")[: settings.FEED_BACKFILL_LENGTH]
+    )
+
+
+def add_to_feeds(posts, user_ids):
+    """
+    Write feed entries for `posts` (`(id, created_at)` pairs) into the feeds of
+    `user_ids`, `FEED_FANOUT_BATCH_SIZE` feeds at a time, trimming each batch of
+    feeds back to `FEED_MAX_LENGTH` entries.
+    """
+    user_ids = iter(user_ids)
+    while batch := list(islice(user_ids, settings.FEED_FANOUT_BATCH_SIZE)):
+        with transaction.atomic():
+            FeedEntry.objects.bulk_create(
+                (
+                    FeedEntry(user_id=user_id, post_id=post_id, created_at=created_at)
+                    for user_id in batch
+                    for post_id, created_at in posts
+                ),
+                batch_size=settings.FEED_FANOUT_BATCH_SIZE,
+                ignore_conflicts=True,
+            )
+            trim_feeds(batch)
+
+
+def fan_out_post(post_id):
+    """
+    Write a feed entry for every follower of the post's author.
+    """
+    post = (
+        Post.objects.filter(pk=post_id, is_deleted=False, is_archived=False)
+        .values("user_id", "created_at")
+        .first()
+    )
+    if post is None or is_pull_author(post["user_id"]):
+        return
+    add_to_feeds([(post_id, post["created_at"])], follower_user_ids(post["user_id"]))
+
+
+def backfill_feed(follower_user_id, author_user_id):
+    """
+    Copy the author's most recent posts into a new follower's feed.
+    """
+    if is_pull_author(author_user_id):
+        return
+    add_to_feeds(recent_posts(author_user_id), [follower_user_id])
+
+
+def backfill_followers(author_user_id):
+    """
+    Copy the author's most recent posts into the feeds of all their followers, for
+    an author switched back to fan-out on write: the posts they made while pulled
+    are in no feed.
+    """
+    if is_pull_author(author_user_id):
+        return
+    add_to_feeds(recent_posts(author_user_id), follower_user_ids(author_user_id))
+
+
+def update_fan_out_mode(author_user_id, author_account_id, followed):
+    """
+    Switch the author between fan-out on write and pull on read when a follow
+    (`followed`) or unfollow made their follower count cross
+    `FEED_FANOUT_MAX_FOLLOWERS`. Counting stops at the threshold.
+    """
+    pulled = FeedPullAuthor.objects.filter(user_id=author_user_id)
+    if pulled.exists() == followed:
+        # a follow keeps a pulled author pulled, an unfollow a pushed one pushed
+        return
+
+    threshold = settings.FEED_FANOUT_MAX_FOLLOWERS
+    popular = (
+        FollowAccount.objects.filter(following_id=author_account_id)
+        .order_by()[threshold - 1 : threshold]
+        .exists()
+    )
+    if popular != followed:
+        # still on the same side of the threshold
+        return
+    if followed:
+        FeedPullAuthor.objects.get_or_create(user_id=author_user_id)
+    else:
+        pulled.delete()
+        transaction.on_commit(
+            lambda: schedule_fan_out(backfill_followers, author_user_id)
+        )
+    transaction.on_commit(lambda: cache.delete(PULL_AUTHORS_CACHE_KEY))
+
+
+def remove_author_from_feed(follower_user_id, author_user_id):
+    FeedEntry.objects.filter(
+        user_id=follower_user_id, post__user_id=author_user_id
+    ).delete()
+
+
+def trim_feeds(user_ids=None):
+    """
+    Delete feed entries beyond `FEED_MAX_LENGTH` for the given users (or everyone).
+    Each feed costs an index probe at its last kept entry and a range delete below
+    it. Returns the number of deleted entries.
+    """
+    if user_ids is None:
+        deleted = 0
+        user_ids = CustomUser.objects.order_by("id").values_list("id", flat=True)
+        user_ids = user_ids.iterator()
+        while batch := list(islice(user_ids, settings.FEED_FANOUT_BATCH_SIZE)):
+            deleted += trim_feeds(batch)
+        return deleted
+
+    quote_name = connection.ops.quote_name
+    table = quote_name(FeedEntry._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            DELETE FROM {table} entry
+            USING unnest(%s::bigint[]) AS feed (user_id)
+            CROSS JOIN LATERAL (
+                SELECT created_at, post_id FROM {table}
+                WHERE user_id = feed.user_id
+                ORDER BY created_at DESC, post_id DESC
+                OFFSET %s LIMIT 1
+            ) overflow
+            WHERE entry.user_id = feed.user_id
+            AND (entry.created_at, entry.post_id)
+                <= (overflow.created_at, overflow.post_id)
+            """,
+            [list(user_ids), settings.FEED_MAX_LENGTH],
+        )
+        return cursor.rowcount
+
+
+class FeedPaginator(KeysetPaginator):
+    """
+    Home feed of the requesting user, newest first. A page is merged from two
+    bounded keyset reads: the reader's feed entries and the recent posts of the
+    followed authors pulled at read time.
+    """
+
+    def fetch(self, queryset, ordering, position, limit):
+        # feed entries carry the post's id as post_id
+        entry_ordering = tuple(
+            field[:-2] + "post_id" if field.lstrip("-") == "id" else field
+            for field in ordering
+        )
+        entries = FeedEntry.objects.filter(
+            user=self.request.user, post__is_deleted=False, post__is_archived=False
+        ).order_by(*entry_ordering)
+        if position is not None:
+            entries = entries.filter(self.keyset_filter(entry_ordering, position))
+        candidates = set(entries.values_list("created_at", "post_id")[:limit])
+
+        author_ids = self.followed_pull_author_ids()
+        if author_ids:
+            pulled = queryset.filter(user_id__in=author_ids).order_by(*ordering)
+            if position is not None:
+                pulled = pulled.filter(self.keyset_filter(ordering, position))
+            candidates.update(pulled.values_list("created_at", "id")[:limit])
+
+        descending = ordering[0].startswith("-")
+        post_ids = [
+            post_id for _, post_id in sorted(candidates, reverse=descending)[:limit]
+        ]
+        posts = queryset.in_bulk(post_ids)
+        return [posts[post_id] for post_id in post_ids if post_id in posts]
+
+    def followed_pull_author_ids(self):
+        author_ids = pull_author_ids()
+        if not author_ids:
+            return []
+        return list(
+            FollowAccount.objects.filter(
+                follower__user=self.request.user, following__user_id__in=author_ids
+            ).values_list("following__user_id", flat=True)
+        )
@@ -0,0 +1,99 @@
+"""
+Image decoding, resizing and encoding. This module only depends on Pillow so it can
+run in worker processes that never set up Django.
+"""
+
+import base64
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+# placeholders are stretched and blurred by clients, detail does not matter
+PLACEHOLDER_QUALITY = 40
+# EXIF orientations that rotate the image by 90 degrees
+TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+
+def open_image(data, largest):
+    """
+    Decode the encoded image in `data` upright and in RGB(A), returns it with the
+    upright size of the original. `largest` is the largest size needed, JPEGs are
+    decoded at a reduced scale when it allows it.
+    """
+    with Image.open(BytesIO(data)) as source:
+        size = source.size
+        if source.getexif().get(0x0112) in TRANSPOSED_ORIENTATIONS:
+            size = size[::-1]
+        source.draft("RGB", (largest, largest))
+        source = ImageOps.exif_transpose(source)
+        if source.mode not in ("RGB", "RGBA"):
+            has_alpha = source.mode in ("LA", "PA") or "transparency" in source.info
+            source = source.convert("RGBA" if has_alpha else "RGB")
+        source.load()
+    return source, size
+
+
+def render_variants(source, widths, formats, quality):
+    """
+    Resize `source` to each of `widths` ({variant: width}, never upscaled) and
+    encode every size in each of `formats`. Returns a list of
+    `(variant, format, width, height, encoded bytes)`.
+    """
+    renders = []
+    for variant, width in widths.items():
+        width = min(width, source.width)
+        height = max(round(source.height * width / source.width), 1)
+        resized = source
+        if width != source.width:
+            resized = source.resize((width, height), Image.LANCZOS)
+        for image_format in formats:
+            output = BytesIO()
+            resized.save(output, format=image_format.upper(), quality=quality)
+            renders.append((variant, image_format, width, height, output.getvalue()))
+    return renders
+
+
+def render_placeholder(source, size):
+    """
+    Encode a copy of `source` at most `size` pixels wide and high as a WebP data
+    URI, small enough to be sent inline and stretched by clients until the image
+    loads.
+    """
+    thumbnail = source.copy()
+    thumbnail.thumbnail((size, size), Image.BILINEAR)
+    output = BytesIO()
+    thumbnail.save(output, format="WEBP", quality=PLACEHOLDER_QUALITY)
+    return "data:image/webp;base64," + base64.b64encode(output.getvalue()).decode()
+
+
+def perceptual_hash(source):
+    """
+    64 bit difference hash (dHash) of `source`: each bit tells whether a pixel of a
+    9x8 grayscale thumbnail is brighter than its right neighbour. Re-encodes,
+    resizes and small crops or edits only flip a few bits.
+    """
+    pixels = source.convert("L").resize((9, 8), Image.LANCZOS).tobytes()
+    value = 0
+    for row in range(8):
+        for column in range(8):
+            left, right = pixels[row * 9 + column], pixels[row * 9 + column + 1]
+            value = value << 1 | (left > right)
+    return value
+
+
+def render_image(data, widths, formats, quality, placeholder_size):
+    """
+    Decode `data` once and return `(width, height, placeholder, perceptual hash,
+    variants)`, see render_placeholder, perceptual_hash and render_variants. Pass
+    no `widths` for the placeholder and hash only.
+    """
+    source, (width, height) = open_image(
+        data, max([*widths.values(), placeholder_size])
+    )
+    return (
+        width,
+        height,
+        render_placeholder(source, placeholder_size),
+        perceptual_hash(source),
+        render_variants(source, widths, formats, quality),
+    )
@@ -0,0 +1,54 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+
+def get_like_lookup(model, obj_id, user_id):
+    return {f"{model._meta.model_name}_id": obj_id, "customuser_id": user_id}
+
+
+def add_like(model, obj_id, user_id):
+    """
+    Insert a like row, relying on the through table's unique (obj, user) index
+    instead of reading the existing likes. Returns False if it was already liked.
+    """
+    through = model.likes.through
+    try:
+        with transaction.atomic():
+            through.objects.create(**get_like_lookup(model, obj_id, user_id))
+    except IntegrityError:
+        return False
+    model.objects.filter(pk=obj_id).update(like_count=F("like_count") + 1)
+    return True
+
+
+def remove_like(model, obj_id, user_id):
+    """
+    Delete a like row. Returns False if there was nothing to remove.
+    """
+    through = model.likes.through
+    deleted, _ = through.objects.filter(
+        **get_like_lookup(model, obj_id, user_id)
+    ).delete()
+    if not deleted:
+        return False
+    model.objects.filter(pk=obj_id).update(like_count=F("like_count") - 1)
+    return True
+
+
+def toggle_like(model, obj_id, user_id, action=None):
+    """
+    Like or unlike `model` row `obj_id` for the user and return whether it is liked now.
+    `action` can be "like" or "unlike" to make the request idempotent, otherwise
+    the current state is flipped. Only the through table and the row's like counter
+    are written, the parent row itself is never saved.
+    """
+    if action == "like":
+        add_like(model, obj_id, user_id)
+        return True
+    if action == "unlike":
+        remove_like(model, obj_id, user_id)
+        return False
+    if remove_like(model, obj_id, user_id):
+        return False
+    add_like(model, obj_id, user_id)
+    return True
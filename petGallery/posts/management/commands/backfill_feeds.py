@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts.feed import backfill_feed
+from users.models import FollowAccount
+
+
+class Command(BaseCommand):
+    help = "Populate materialized home feeds from existing follows and posts."
+
+    def handle(self, *args, **options):
+        follows = FollowAccount.objects.values_list(
+            "follower__user_id", "following__user_id"
+        )
+        count = 0
+        for follower_user_id, author_user_id in follows.iterator():
+            backfill_feed(follower_user_id, author_user_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {count} follows"))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.explore import build_explore_pool
+
+
+class Command(BaseCommand):
+    help = (
+        "Rank recent public posts and rebuild the explore pool, run it on a schedule."
+    )
+
+    def handle(self, *args, **options):
+        size = build_explore_pool()
+        self.stdout.write(self.style.SUCCESS(f"Explore pool rebuilt with {size} posts"))
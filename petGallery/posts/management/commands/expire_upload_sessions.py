@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts.uploads import expire_sessions
+
+
+class Command(BaseCommand):
+    help = "Delete expired upload sessions and their partial files."
+
+    def handle(self, *args, **options):
+        deleted = expire_sessions()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} upload sessions"))
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.duplicates import find_duplicate_pairs, near_duplicates
+from posts.models import Image
+
+
+class Command(BaseCommand):
+    help = (
+        "List near-duplicate post images, by the distance of their perceptual hashes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--image", type=int, help="Only list the near-duplicates of this image."
+        )
+        parser.add_argument(
+            "--distance",
+            type=int,
+            default=settings.DUPLICATE_IMAGE_MAX_DISTANCE,
+            help="Largest number of differing bits.",
+        )
+
+    def handle(self, *args, **options):
+        if options["image"] is not None:
+            image = Image.objects.get(pk=options["image"])
+            pairs = (
+                (image, duplicate)
+                for duplicate in near_duplicates(
+                    image.phash, options["distance"]
+                ).exclude(pk=image.pk)
+            )
+        else:
+            pairs = find_duplicate_pairs(Image.objects.all(), options["distance"])
+
+        count = 0
+        for image, duplicate in pairs:
+            self.stdout.write(
+                f"image {image.pk} (post {image.post_id}) ~ image {duplicate.pk} "
+                f"(post {duplicate.post_id}), distance {duplicate.distance}"
+            )
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Found {count} near-duplicate pairs"))
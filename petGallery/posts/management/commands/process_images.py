@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from django.db.models import Q
+
+from posts.media import process_avatar, process_image
+from posts.models import Image
+from users.models import Account
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the resized derivatives, placeholders and perceptual hashes of "
+        "post images (and the placeholders of profile photos) missing them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Reprocess every image.")
+
+    def handle(self, *args, **options):
+        images = Image.objects.all()
+        accounts = Account.objects.exclude(
+            avatar=Account._meta.get_field("avatar").default
+        )
+        if not options["all"]:
+            images = images.filter(
+                Q(derivatives__isnull=True) | Q(placeholder="") | Q(phash__isnull=True)
+            ).distinct()
+            accounts = accounts.filter(avatar_placeholder="")
+        count = 0
+        for image_id in images.values_list("id", flat=True).iterator():
+            if process_image(image_id):
+                count += 1
+        avatar_count = 0
+        for account_id in accounts.values_list("id", flat=True).iterator():
+            process_avatar(account_id)
+            avatar_count += 1
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Processed {count} images and {avatar_count} profile photos"
+            )
+        )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import repair_post_counters, repair_comment_counters
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized like, comment and save counts of posts and comments."
+
+    def handle(self, *args, **options):
+        posts = repair_post_counters()
+        comments = repair_comment_counters()
+        self.stdout.write(
+            self.style.SUCCESS(f"Repaired {posts} posts and {comments} comments")
+        )
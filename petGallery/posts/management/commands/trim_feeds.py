@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts.feed import trim_feeds
+
+
+class Command(BaseCommand):
+    help = "Trim every materialized home feed to FEED_MAX_LENGTH entries."
+
+    def handle(self, *args, **options):
+        deleted = trim_feeds()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} feed entries"))
@@ -0,0 +1,177 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+
+from posts.duplicates import get_hash_fields
+from posts.imaging import render_image
+from posts.models import Image, ImageDerivative
+from users.models import Account
+
+logger = logging.getLogger(__name__)
+
+_process_pool = None
+_scheduler = None
+
+
+def get_process_pool():
+    """
+    Worker processes for the CPU bound decode/resize/encode work, started on first
+    use. Spawned rather than forked so they do not inherit the server's threads.
+    """
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_PROCESSING_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _process_pool
+
+
+def get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_PROCESSING_WORKERS,
+            thread_name_prefix="image-processing",
+        )
+    return _scheduler
+
+
+def render(data, variants=True):
+    """
+    Returns `(width, height, placeholder, perceptual hash, derivatives)`, see
+    posts.imaging.
+    """
+    args = (
+        data,
+        settings.IMAGE_VARIANTS if variants else {},
+        settings.IMAGE_DERIVATIVE_FORMATS,
+        settings.IMAGE_DERIVATIVE_QUALITY,
+        settings.IMAGE_PLACEHOLDER_SIZE,
+    )
+    if not settings.IMAGE_PROCESSING_WORKERS:
+        return render_image(*args)
+    return get_process_pool().submit(render_image, *args).result()
+
+
+def process_image(image_id):
+    """
+    Generate and store the derivatives of an uploaded image, replacing any existing
+    ones, and its size, placeholder and perceptual hash. Returns the number of
+    derivatives created.
+    """
+    image = Image.objects.filter(pk=image_id).first()
+    if image is None or not image.image:
+        return 0
+    shared_image = (
+        Image.objects.filter(
+            image=image.image.name, placeholder__gt="", phash__isnull=False
+        )
+        .exclude(pk=image.pk)
+        .values("width", "height", "placeholder", *get_hash_fields(0))
+        .first()
+    )
+    shared = {}
+    if shared_image is not None:
+        # one of each (variant, format), the file may be referenced by several rows
+        shared = {
+            (derivative.variant, derivative.format): derivative
+            for derivative in ImageDerivative.objects.filter(
+                image__image=image.image.name
+            ).exclude(image=image)
+        }
+    if shared:
+        # another row references the same (deduplicated) file, reuse its derivatives
+        with transaction.atomic():
+            Image.objects.filter(pk=image.pk).update(**shared_image)
+            ImageDerivative.objects.filter(image=image).delete()
+            derivatives = ImageDerivative.objects.bulk_create(
+                ImageDerivative(
+                    image=image,
+                    variant=derivative.variant,
+                    format=derivative.format,
+                    width=derivative.width,
+                    height=derivative.height,
+                    file=derivative.file.name,
+                )
+                for derivative in shared.values()
+            )
+        return len(derivatives)
+
+    with image.image.open("rb") as source:
+        data = source.read()
+
+    name = os.path.splitext(os.path.basename(image.image.name))[0]
+    image.width, image.height, image.placeholder, phash, renders = render(data)
+    hash_fields = get_hash_fields(phash)
+    for field, value in hash_fields.items():
+        setattr(image, field, value)
+    derivatives = []
+    for variant, image_format, width, height, encoded in renders:
+        derivative = ImageDerivative(
+            image=image,
+            variant=variant,
+            format=image_format,
+            width=width,
+            height=height,
+        )
+        derivative.file.save(
+            f"{name}_{variant}.{image_format}", ContentFile(encoded), save=False
+        )
+        derivatives.append(derivative)
+
+    with transaction.atomic():
+        image.save(
+            update_fields=["width", "height", "placeholder", *hash_fields, "updated_at"]
+        )
+        # files of the replaced derivatives are removed by posts.signals
+        ImageDerivative.objects.filter(image=image).delete()
+        ImageDerivative.objects.bulk_create(derivatives)
+    return len(derivatives)
+
+
+def process_avatar(account_id):
+    """
+    Store the size and placeholder of an account's profile photo.
+    """
+    account = Account.objects.filter(pk=account_id).first()
+    if account is None or not account.avatar:
+        return
+    with account.avatar.open("rb") as source:
+        data = source.read()
+    width, height, placeholder, _, _ = render(data, variants=False)
+    # unless the photo was replaced in the meantime
+    Account.objects.filter(pk=account.pk, avatar=account.avatar.name).update(
+        avatar_width=width, avatar_height=height, avatar_placeholder=placeholder
+    )
+
+
+def process_safely(process, object_id):
+    try:
+        process(object_id)
+    except Exception:
+        logger.exception("Failed to run %s for %s", process.__name__, object_id)
+
+
+def process_in_background(process, object_id):
+    try:
+        process_safely(process, object_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_processing(process, object_id):
+    """
+    Run `process` (process_image or process_avatar) off the request thread, or
+    inline when `IMAGE_PROCESSING_WORKERS` is 0. Work lost (e.g. on a restart) is
+    picked up by `manage.py process_images`.
+    """
+    if not settings.IMAGE_PROCESSING_WORKERS:
+        process_safely(process, object_id)
+        return
+    get_scheduler().submit(process_in_background, process, object_id)
@@ -0,0 +1,60 @@
+# Generated by Django 5.0.3 on 2026-10-18 16:01
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(queryset, field):
+    counts = (
+        queryset.filter(**{field: OuterRef("pk")})
+        .order_by()
+        .values(field)
+        .annotate(count=Count("*"))
+        .values("count")
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def populate_counters(apps, schema_editor):
+    Post = apps.get_model("posts", "Post")
+    Comment = apps.get_model("posts", "Comment")
+    Post.objects.update(
+        like_count=count_subquery(Post.likes.through.objects.all(), "post"),
+        comment_count=count_subquery(Comment.objects.filter(is_deleted=False), "post"),
+        save_count=count_subquery(Post.saved_by.through.objects.all(), "post"),
+    )
+    Comment.objects.update(
+        like_count=count_subquery(Comment.likes.through.objects.all(), "comment")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_feedentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Like Count'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Comment Count'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Like Count'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='save_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Save Count'),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.3 on 2026-10-18 16:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0017_comment_like_count_post_comment_count_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExploreCandidate",
+            fields=[
+                (
+                    "post",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="explore_candidate",
+                        serialize=False,
+                        to="posts.post",
+                    ),
+                ),
+                ("score", models.FloatField(verbose_name="Score")),
+            ],
+            options={
+                "ordering": ["-score", "-post"],
+                "indexes": [
+                    models.Index(fields=["-score", "-post"], name="explore_score_idx")
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.3 on 2026-10-18 16:09
+
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0018_explorecandidate"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="hashtag",
+            index=models.Index(
+                django.db.models.functions.comparison.Collate(
+                    django.db.models.functions.text.Upper("name"), "C"
+                ),
+                name="hashtag_name_prefix_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.3 on 2026-10-18 16:11
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0019_hashtag_hashtag_name_prefix_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True, verbose_name="Search Vector"
+            ),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.0.3 on 2026-10-18 16:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0020_post_search_vector"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImageDerivative",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Created at"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Updated at"),
+                ),
+                (
+                    "variant",
+                    models.CharField(
+                        choices=[
+                            ("thumbnail", "Thumbnail"),
+                            ("grid", "Grid"),
+                            ("full", "Full"),
+                        ],
+                        max_length=20,
+                        verbose_name="Variant",
+                    ),
+                ),
+                ("format", models.CharField(max_length=10, verbose_name="Format")),
+                ("width", models.PositiveIntegerField(verbose_name="Width")),
+                ("height", models.PositiveIntegerField(verbose_name="Height")),
+                (
+                    "file",
+                    models.ImageField(
+                        upload_to="post_images/derivatives/", verbose_name="File"
+                    ),
+                ),
+                (
+                    "image",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="derivatives",
+                        to="posts.image",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["width"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="imagederivative",
+            constraint=models.UniqueConstraint(
+                fields=("image", "variant", "format"), name="unique_image_derivative"
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.3 on 2026-10-18 16:14
+
+import common.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0021_imagederivative"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="image",
+            name="image",
+            field=common.fields.ContentAddressedImageField(
+                upload_to="post_images/", verbose_name="Image"
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.3 on 2026-10-18 16:24
+
+import common.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0023_uploadsession"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="image",
+            name="image",
+            field=common.fields.ContentAddressedImageField(
+                db_index=True, upload_to="post_images/", verbose_name="Image"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="imagederivative",
+            name="file",
+            field=models.ImageField(
+                db_index=True, upload_to="post_images/derivatives/", verbose_name="File"
+            ),
+        ),
+    ]
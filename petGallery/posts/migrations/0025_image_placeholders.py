@@ -0,0 +1,32 @@
+# Generated by Django 5.0.3 on 2026-10-18 16:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0024_media_name_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="image",
+            name="height",
+            field=models.PositiveIntegerField(
+                blank=True, null=True, verbose_name="Height"
+            ),
+        ),
+        migrations.AddField(
+            model_name="image",
+            name="placeholder",
+            field=models.TextField(blank=True, verbose_name="Placeholder"),
+        ),
+        migrations.AddField(
+            model_name="image",
+            name="width",
+            field=models.PositiveIntegerField(
+                blank=True, null=True, verbose_name="Width"
+            ),
+        ),
+    ]
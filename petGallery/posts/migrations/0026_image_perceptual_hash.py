@@ -0,0 +1,40 @@
+# Generated by Django 5.0.3 on 2026-10-18 16:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0025_image_placeholders"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="image",
+            name="phash",
+            field=models.BigIntegerField(
+                blank=True, null=True, verbose_name="Perceptual hash"
+            ),
+        ),
+        migrations.AddField(
+            model_name="image",
+            name="phash_band_0",
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="image",
+            name="phash_band_1",
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="image",
+            name="phash_band_2",
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="image",
+            name="phash_band_3",
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.0.3 on 2026-10-18 16:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_pull_authors(apps, schema_editor):
+    FollowAccount = apps.get_model("users", "FollowAccount")
+    FeedPullAuthor = apps.get_model("posts", "FeedPullAuthor")
+    author_ids = (
+        FollowAccount.objects.order_by()
+        .values("following__user_id")
+        .annotate(followers_count=Count("id"))
+        .filter(followers_count__gte=settings.FEED_FANOUT_MAX_FOLLOWERS)
+        .values_list("following__user_id", flat=True)
+    )
+    FeedPullAuthor.objects.bulk_create(
+        FeedPullAuthor(user_id=author_id) for author_id in author_ids
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0026_image_perceptual_hash"),
+        ("users", "0033_avatar_placeholders"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FeedPullAuthor",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="+",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AlterModelOptions(
+            name="feedentry",
+            options={"ordering": ["-created_at", "-post_id"]},
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["user", "-created_at", "-id"], name="post_user_created_idx"
+            ),
+        ),
+        migrations.RunPython(populate_pull_authors, migrations.RunPython.noop),
+    ]
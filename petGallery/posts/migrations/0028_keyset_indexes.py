@@ -0,0 +1,53 @@
+# Generated by Django 5.0.3 on 2026-10-18 16:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0027_feed_pull_authors"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="archivepost",
+            index=models.Index(
+                fields=["user", "-created_at", "-id"], name="archive_user_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="comment_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["post", "-created_at", "-id"], name="comment_post_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(fields=["-created_at", "-id"], name="post_created_idx"),
+        ),
+        # the posts a user liked, was tagged in or saved, read from the join tables
+        migrations.RunSQL(
+            "CREATE INDEX post_likes_user_post_idx "
+            "ON posts_post_likes (customuser_id, post_id)",
+            "DROP INDEX post_likes_user_post_idx",
+        ),
+        migrations.RunSQL(
+            "CREATE INDEX post_tags_user_post_idx "
+            "ON posts_post_tags (customuser_id, post_id)",
+            "DROP INDEX post_tags_user_post_idx",
+        ),
+        migrations.RunSQL(
+            "CREATE INDEX savepost_posts_saved_idx "
+            "ON posts_savepost_posts (savepost_id, id)",
+            "DROP INDEX savepost_posts_saved_idx",
+        ),
+    ]
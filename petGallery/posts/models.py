@@ -1,12 +1,23 @@
+import uuid
+
 from django.db import models
+from django.db.models.functions import Collate, Upper
+from django.contrib.postgres.search import SearchVectorField
 from users.models import CustomUser
 from django.utils.translation import gettext_lazy as _
+from common.fields import ContentAddressedImageField
 from common.models import AbstractBaseModel
 
 
 class Hashtag(AbstractBaseModel):
     name = models.CharField(max_length=100, unique=True)
 
+    class Meta:
+        indexes = [
+            # serves case-insensitive prefix search in name order, see search.queries
+            models.Index(Collate(Upper("name"), "C"), name="hashtag_name_prefix_idx")
+        ]
+
 
 class Post(AbstractBaseModel):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
@@ -14,6 +25,11 @@ class Post(AbstractBaseModel):
     location = models.CharField(_("Location"), blank=True, null=True, max_length=255)
     is_deleted = models.BooleanField(_("Is Deleted"), default=False)
     is_archived = models.BooleanField(_("Is Archived"), default=False)
+    like_count = models.PositiveIntegerField(_("Like Count"), default=0)
+    comment_count = models.PositiveIntegerField(_("Comment Count"), default=0)
+    save_count = models.PositiveIntegerField(_("Save Count"), default=0)
+    # caption and location lexemes, kept up to date by search.signals
+    search_vector = SearchVectorField(_("Search Vector"), null=True, editable=False)
 
     likes = models.ManyToManyField(
         CustomUser, related_name="liked_posts", blank=True, verbose_name=_("Liked By")
@@ -30,13 +46,89 @@ class Post(AbstractBaseModel):
 
     class Meta:
         ordering = ["-created_at"]
+        # keyset pages, see utils.paginator.KeysetPaginator
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="post_created_idx"),
+            # an author's posts newest first, e.g. the pulled part of a feed page
+            models.Index(
+                fields=["user", "-created_at", "-id"], name="post_user_created_idx"
+            ),
+        ]
 
 
 class Image(AbstractBaseModel):
     post = models.ForeignKey(
         Post, null=True, on_delete=models.CASCADE, related_name="images"
     )
-    image = models.ImageField(_("Image"), upload_to="post_images/")
+    # looked up by file name when serving media and sharing derivatives
+    image = ContentAddressedImageField(
+        _("Image"), upload_to="post_images/", db_index=True
+    )
+    # filled in by posts.media once the upload is processed
+    width = models.PositiveIntegerField(_("Width"), null=True, blank=True)
+    height = models.PositiveIntegerField(_("Height"), null=True, blank=True)
+    placeholder = models.TextField(_("Placeholder"), blank=True)
+    # 64 bit perceptual hash and its 16 bit bands, see posts.duplicates
+    phash = models.BigIntegerField(_("Perceptual hash"), null=True, blank=True)
+    phash_band_0 = models.IntegerField(null=True, blank=True, db_index=True)
+    phash_band_1 = models.IntegerField(null=True, blank=True, db_index=True)
+    phash_band_2 = models.IntegerField(null=True, blank=True, db_index=True)
+    phash_band_3 = models.IntegerField(null=True, blank=True, db_index=True)
+
+
+class ImageDerivative(AbstractBaseModel):
+    """
+    Resized and re-encoded copy of a post image, generated by posts.media after the
+    upload. Clients pick one from the serialized `srcset`.
+    """
+
+    VARIANT_CHOICES = (
+        ("thumbnail", "Thumbnail"),
+        ("grid", "Grid"),
+        ("full", "Full"),
+    )
+
+    image = models.ForeignKey(
+        Image, on_delete=models.CASCADE, related_name="derivatives"
+    )
+    variant = models.CharField(_("Variant"), max_length=20, choices=VARIANT_CHOICES)
+    format = models.CharField(_("Format"), max_length=10)
+    width = models.PositiveIntegerField(_("Width"))
+    height = models.PositiveIntegerField(_("Height"))
+    file = models.ImageField(
+        _("File"), upload_to="post_images/derivatives/", db_index=True
+    )
+
+    class Meta:
+        ordering = ["width"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["image", "variant", "format"], name="unique_image_derivative"
+            )
+        ]
+
+
+class UploadSession(AbstractBaseModel):
+    """
+    Resumable upload of one post image, sent in ranged chunks and assembled in
+    `UPLOAD_SESSION_ROOT`. Completed sessions are turned into images when a post
+    is created with their ids, see posts.uploads.
+    """
+
+    STATUS_CHOICES = (("UPLOADING", "Uploading"), ("COMPLETE", "Complete"))
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name="upload_sessions"
+    )
+    filename = models.CharField(_("File name"), max_length=255)
+    size = models.PositiveBigIntegerField(_("Size"))
+    offset = models.PositiveBigIntegerField(_("Bytes received"), default=0)
+    status = models.CharField(
+        _("Status"), max_length=20, choices=STATUS_CHOICES, default="UPLOADING"
+    )
+    sha256 = models.CharField(_("SHA-256"), max_length=64, blank=True)
+    expires_at = models.DateTimeField(_("Expires at"))
 
 
 class SavePost(AbstractBaseModel):
@@ -60,6 +152,11 @@ class ArchivePost(AbstractBaseModel):
     class Meta:
         unique_together = ("user", "post")
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at", "-id"], name="archive_user_created_idx"
+            )
+        ]
 
 
 class Comment(AbstractBaseModel):
@@ -82,6 +179,77 @@ class Comment(AbstractBaseModel):
         verbose_name=_("Liked By"),
     )
     edited = models.BooleanField(_("Edited Comment"), default=False)
+    like_count = models.PositiveIntegerField(_("Like Count"), default=0)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="comment_created_idx"),
+            models.Index(
+                fields=["post", "-created_at", "-id"], name="comment_post_created_idx"
+            ),
+            # replies of a comment oldest first, see posts.comments
+            models.Index(
+                fields=["replies", "created_at", "id"],
+                condition=models.Q(is_deleted=False),
+                name="comment_replies_created_idx",
+            ),
+        ]
+
+
+class FeedEntry(models.Model):
+    """
+    Materialized home feed row, one per (reader, post). `created_at` mirrors the
+    post's creation time so a feed page is a range scan over the reader's rows.
+    """
+
+    user = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name="feed_entries"
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="feed_entries"
+    )
+    created_at = models.DateTimeField(_("Posted at"))
+
+    class Meta:
+        # by the post id column, "-post" would follow Post's ordering through a join
+        ordering = ["-created_at", "-post_id"]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "post"], name="unique_feed_entry")
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at", "-post"], name="feed_user_created_idx"
+            )
+        ]
+
+
+class FeedPullAuthor(models.Model):
+    """
+    Author with at least `FEED_FANOUT_MAX_FOLLOWERS` followers. Their posts are not
+    fanned out into feeds but pulled into their followers' feeds at read time, see
+    posts.feed.
+    """
+
+    user = models.OneToOneField(
+        CustomUser, on_delete=models.CASCADE, primary_key=True, related_name="+"
+    )
+
+
+class ExploreCandidate(models.Model):
+    """
+    Post in the precomputed explore pool with its ranking score. The pool is rebuilt
+    on a schedule by the `build_explore_pool` management command.
+    """
+
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="explore_candidate",
+    )
+    score = models.FloatField(_("Score"))
+
+    class Meta:
+        ordering = ["-score", "-post"]
+        indexes = [models.Index(fields=["-score", "-post"], name="explore_score_idx")]
@@ -0,0 +1,31 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from posts.models import Post, SavePost
+
+
+def add_save(save_post, post_id):
+    """
+    Insert a saved post row, relying on the through table's unique (savepost, post)
+    index instead of reading the saved posts. Returns False if it was already saved.
+    """
+    through = SavePost.posts.through
+    try:
+        with transaction.atomic():
+            through.objects.create(savepost=save_post, post_id=post_id)
+    except IntegrityError:
+        return False
+    Post.objects.filter(pk=post_id).update(save_count=F("save_count") + 1)
+    return True
+
+
+def remove_save(save_post, post_id):
+    """
+    Delete a saved post row. Returns False if there was nothing to remove.
+    """
+    through = SavePost.posts.through
+    deleted, _ = through.objects.filter(savepost=save_post, post_id=post_id).delete()
+    if not deleted:
+        return False
+    Post.objects.filter(pk=post_id).update(save_count=F("save_count") - 1)
+    return True
@@ -1,8 +1,19 @@
 import base64
 from rest_framework import serializers
-from posts.models import Hashtag, Post, SavePost, ArchivePost, Comment, Image
+from django.conf import settings
+from posts.models import (
+    Hashtag,
+    Post,
+    SavePost,
+    ArchivePost,
+    Comment,
+    Image,
+    ImageDerivative,
+    UploadSession,
+)
 from users.models import CustomUser
 from users.serializers import UserInfoSerializer
+from utils.prefetch import PrefetchListSerializer
 
 
 class HashtagSerializer(serializers.ModelSerializer):
@@ -11,17 +22,115 @@ class HashtagSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class ImageSerializer(serializers.ModelSerializer):
+def build_file_url(file, request):
+    return request.build_absolute_uri(file.url) if request else file.url
+
+
+class ImageDerivativeSerializer(serializers.ModelSerializer):
     class Meta:
-        model = Image
-        fields = "__all__"
+        model = ImageDerivative
+        fields = ["variant", "format", "width", "height", "file"]
+
 
+class ImageSerializer(serializers.ModelSerializer):
+    derivatives = ImageDerivativeSerializer(many=True, read_only=True)
+    srcset = serializers.SerializerMethodField()
+    aspect_ratio = serializers.SerializerMethodField()
 
-class PostSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Image
+        exclude = [
+            "phash",
+            "phash_band_0",
+            "phash_band_1",
+            "phash_band_2",
+            "phash_band_3",
+        ]
+        read_only_fields = ["width", "height", "placeholder"]
+
+    def get_aspect_ratio(self, obj):
+        """
+        width / height, null until the image has been processed (like `placeholder`).
+        """
+        if not obj.width or not obj.height:
+            return None
+        return round(obj.width / obj.height, 4)
+
+    def get_srcset(self, obj):
+        """
+        `srcset` of the derivatives in the preferred format, empty until the image
+        has been processed (clients then fall back to the original `image`).
+        """
+        request = self.context.get("request")
+        image_format = settings.IMAGE_DERIVATIVE_FORMATS[0]
+        return ", ".join(
+            f"{build_file_url(derivative.file, request)} {derivative.width}w"
+            for derivative in obj.derivatives.all()
+            if derivative.format == image_format
+        )
+
+
+def remember_liked_by_me(context, model, instances):
+    """
+    Record in `context` which of `instances` the requesting user liked, in one
+    query, for LikedByMeMixin.
+    """
+    request = context.get("request")
+    if request is None or not request.user.is_authenticated:
+        return
+    liked_states = context.setdefault("liked_by_me", {}).setdefault(model, {})
+    object_ids = {obj.pk for obj in instances} - liked_states.keys()
+    if not object_ids:
+        return
+    related_name = f"{model._meta.model_name}_id"
+    liked_ids = set(
+        model.likes.through.objects.filter(
+            customuser_id=request.user.id, **{f"{related_name}__in": object_ids}
+        ).values_list(related_name, flat=True)
+    )
+    liked_states.update((object_id, object_id in liked_ids) for object_id in object_ids)
+
+
+class LikedByMeMixin:
+    def get_liked_by_me(self, obj):
+        request = self.context.get("request")
+        if request is None or not request.user.is_authenticated:
+            return False
+        liked_states = self.context.get("liked_by_me", {}).get(type(obj), {})
+        if obj.pk in liked_states:
+            return liked_states[obj.pk]
+        # one query per item when listed without LikedListSerializer
+        return obj.likes.filter(pk=request.user.pk).exists()
+
+
+class LikedListSerializer(PrefetchListSerializer):
+    """
+    Looks up which of the listed objects, and of the objects their nested
+    LikedByMeMixin serializers render (e.g. the post of a comment), the requesting
+    user liked, in one query per model.
+    """
+
+    def to_representation(self, data):
+        instances = list(self.prefetch(data))
+        if isinstance(self.child, LikedByMeMixin):
+            remember_liked_by_me(self.context, self.child.Meta.model, instances)
+        for field in self.child.fields.values():
+            if isinstance(field, LikedByMeMixin):
+                related = (getattr(obj, field.source) for obj in instances)
+                remember_liked_by_me(
+                    self.context,
+                    field.Meta.model,
+                    [obj for obj in related if obj is not None],
+                )
+        return serializers.ListSerializer.to_representation(self, instances)
+
+
+class PostSerializer(LikedByMeMixin, serializers.ModelSerializer):
     user = UserInfoSerializer()
     images = ImageSerializer(many=True, read_only=True)
     tags = UserInfoSerializer(many=True, read_only=True)
     hashtags = HashtagSerializer(many=True, read_only=True)
+    liked_by_me = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
@@ -35,11 +144,15 @@ class PostSerializer(serializers.ModelSerializer):
             "images",
             "is_deleted",
             "is_archived",
-            "likes",
+            "like_count",
+            "comment_count",
+            "save_count",
+            "liked_by_me",
             "created_at",
             "updated_at",
         ]
         depth = 1
+        list_serializer_class = LikedListSerializer
 
 
 class ArchivePostSerializer(serializers.ModelSerializer):
@@ -50,6 +163,13 @@ class ArchivePostSerializer(serializers.ModelSerializer):
         model = ArchivePost
         fields = "__all__"
         depth = 2
+        list_serializer_class = LikedListSerializer
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadSession
+        fields = ["id", "filename", "size", "offset", "status", "expires_at"]
 
 
 class SavePostSerializer(serializers.ModelSerializer):
@@ -61,14 +181,41 @@ class SavePostSerializer(serializers.ModelSerializer):
         model = SavePost
         fields = "__all__"
         depth = 1
+        list_serializer_class = PrefetchListSerializer
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(LikedByMeMixin, serializers.ModelSerializer):
     user = UserInfoSerializer()
     post = PostSerializer()
-    likes = UserInfoSerializer(many=True)
+    liked_by_me = serializers.SerializerMethodField()
 
     class Meta:
         model = Comment
-        fields = "__all__"
+        exclude = ["likes"]
         depth = 1
+        list_serializer_class = LikedListSerializer
+
+
+class CommentTreeSerializer(LikedByMeMixin, serializers.ModelSerializer):
+    """
+    Comment without its post, for the comment tree where the post is sent once.
+    """
+
+    user = UserInfoSerializer()
+    parent = serializers.IntegerField(source="replies_id", read_only=True)
+    liked_by_me = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Comment
+        fields = [
+            "id",
+            "user",
+            "parent",
+            "text",
+            "edited",
+            "like_count",
+            "liked_by_me",
+            "created_at",
+            "updated_at",
+        ]
+        list_serializer_class = LikedListSerializer
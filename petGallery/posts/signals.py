@@ -0,0 +1,66 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from posts.models import Image, ImageDerivative, Post
+from posts.media import process_avatar, process_image, schedule_processing
+from posts.feed import (
+    backfill_feed,
+    fan_out_post,
+    remove_author_from_feed,
+    schedule_fan_out,
+    update_fan_out_mode,
+)
+from users.models import Account, FollowAccount
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post_after_created(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: schedule_fan_out(fan_out_post, instance.pk))
+
+
+@receiver(post_save, sender=Image)
+def process_image_after_upload(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: schedule_processing(process_image, instance.pk))
+
+
+@receiver(post_save, sender=Account)
+def process_avatar_after_upload(sender, instance, created, update_fields, **kwargs):
+    # the photo is only replaced through saves naming it, see AvatarUploadCompleteView
+    replaced = created or (update_fields and "avatar" in update_fields)
+    if replaced and instance.avatar.name != sender._meta.get_field("avatar").default:
+        transaction.on_commit(lambda: schedule_processing(process_avatar, instance.pk))
+
+
+@receiver(post_delete, sender=ImageDerivative)
+def delete_derivative_file(sender, instance, **kwargs):
+    # derivatives of deduplicated images share files
+    name = instance.file.name
+    if not ImageDerivative.objects.filter(file=name).exists():
+        transaction.on_commit(lambda: instance.file.storage.delete(name))
+
+
+def get_follow_user_ids(follow):
+    user_ids = dict(
+        Account.objects.filter(
+            id__in=[follow.follower_id, follow.following_id]
+        ).values_list("id", "user_id")
+    )
+    return user_ids.get(follow.follower_id), user_ids.get(follow.following_id)
+
+
+@receiver(post_save, sender=FollowAccount)
+def backfill_feed_after_follow(sender, instance, created, **kwargs):
+    if created:
+        follower_user_id, author_user_id = get_follow_user_ids(instance)
+        update_fan_out_mode(author_user_id, instance.following_id, followed=True)
+        backfill_feed(follower_user_id, author_user_id)
+
+
+@receiver(post_delete, sender=FollowAccount)
+def remove_author_from_feed_after_unfollow(sender, instance, **kwargs):
+    follower_user_id, author_user_id = get_follow_user_ids(instance)
+    if follower_user_id and author_user_id:
+        remove_author_from_feed(follower_user_id, author_user_id)
+        update_fan_out_mode(author_user_id, instance.following_id, followed=False)
@@ -1,3 +1,742 @@
-from django.test import TestCase
+import json
+import tempfile
+import uuid
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from io import BytesIO
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from PIL import Image as PILImage
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.serializers import ListSerializer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from posts.comments import build_comment_tree
+from posts.duplicates import get_hash_fields, near_duplicates
+from posts.explore import build_explore_pool
+from posts.models import (
+    ArchivePost,
+    Comment,
+    Hashtag,
+    Post,
+    Image,
+    FeedEntry,
+    FeedPullAuthor,
+    SavePost,
+    UploadSession,
+)
+from posts.serializers import CommentSerializer, PostSerializer
+from users.models import CustomUser, Account, BlockAccount, FollowAccount
+
+
+def create_account(username):
+    user = CustomUser.objects.create_user(username=username, password="password")
+    Account.objects.create(
+        user=user,
+        name=username,
+        bio="bio",
+        age=2,
+        gender="MALE",
+        animal="DOG",
+        breed="Corgi",
+    )
+    return user
+
+
+def create_posts(user, count):
+    hashtag, _ = Hashtag.objects.get_or_create(name=f"{user.username}_pets")
+    posts = []
+    for index in range(count):
+        post = Post.objects.create(user=user, caption=f"post {index}")
+        post.tags.add(user)
+        post.hashtags.add(hashtag)
+        post.likes.add(user)
+        Image.objects.create(post=post, image=f"post_images/{user.username}{index}.png")
+        posts.append(post)
+    return posts
+
+
+class PostSerializerQueryCountTest(TestCase):
+    def setUp(self):
+        self.reader = create_account("reader")
+        self.author = create_account("author")
+        FollowAccount.objects.create(
+            follower=self.reader.account, following=self.author.account
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def add_to_feed(self, posts):
+        FeedEntry.objects.bulk_create(
+            FeedEntry(user=self.reader, post=post, created_at=post.created_at)
+            for post in posts
+        )
+
+    def count_feed_queries(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/posts/feed/")
+        self.assertEqual(response.status_code, 200)
+        return len(response.data["results"]), len(queries)
+
+    def test_serializing_posts_takes_fixed_number_of_queries(self):
+        create_posts(self.author, 10)
+        # posts (with user joined), tags, hashtags, images and image derivatives
+        with self.assertNumQueries(5):
+            PostSerializer(Post.objects.all(), many=True).data
+
+    def test_feed_page_query_count_does_not_grow_with_page_size(self):
+        self.add_to_feed(create_posts(self.author, 1))
+        results, single_post_queries = self.count_feed_queries()
+        self.assertEqual(results, 1)
+
+        self.add_to_feed(create_posts(self.author, 9))
+        results, full_page_queries = self.count_feed_queries()
+        self.assertEqual(results, 10)
+        self.assertEqual(full_page_queries, single_post_queries)
+
+
+@override_settings(
+    FEED_FANOUT_WORKERS=0,
+    FEED_MAX_LENGTH=3,
+    FEED_BACKFILL_LENGTH=2,
+    FEED_FANOUT_MAX_FOLLOWERS=2,
+)
+class FeedTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = create_account("reader")
+        self.author = create_account("author")
+        self.star = create_account("star")
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.get(pk=self.reader.pk))
+
+    def follow(self, follower, author):
+        with self.captureOnCommitCallbacks(execute=True):
+            return FollowAccount.objects.create(
+                follower=follower.account, following=author.account
+            )
+
+    def unfollow(self, follow):
+        with self.captureOnCommitCallbacks(execute=True):
+            follow.delete()
+
+    def create_post(self, author, caption):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Post.objects.create(user=author, caption=caption)
+
+    def get_feed_post_ids(self):
+        return list(
+            FeedEntry.objects.filter(user=self.reader).values_list("post_id", flat=True)
+        )
+
+    def get_captions(self, response):
+        return [post["caption"] for post in response.data["results"]]
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        self.follow(self.reader, self.author)
+        post = self.create_post(self.author, "woof")
+        self.assertEqual(self.get_feed_post_ids(), [post.id])
+        self.assertFalse(FeedEntry.objects.filter(user=self.author).exists())
+
+    def test_follow_backfills_and_unfollow_removes_recent_posts(self):
+        posts = [self.create_post(self.author, str(index)) for index in range(3)]
+        follow = self.follow(self.reader, self.author)
+        self.assertEqual(self.get_feed_post_ids(), [posts[2].id, posts[1].id])
+
+        self.unfollow(follow)
+        self.assertEqual(self.get_feed_post_ids(), [])
+
+    def test_feed_is_trimmed_as_entries_are_written(self):
+        self.follow(self.reader, self.author)
+        posts = [self.create_post(self.author, str(index)) for index in range(5)]
+        self.assertEqual(
+            self.get_feed_post_ids(), [post.id for post in reversed(posts[2:])]
+        )
+
+    def test_popular_author_posts_are_merged_at_read_time(self):
+        self.follow(self.reader, self.author)
+        self.follow(self.reader, self.star)
+        self.follow(self.author, self.star)
+        self.assertTrue(FeedPullAuthor.objects.filter(user=self.star).exists())
+        for caption in ("a0", "s0", "a1", "s1"):
+            self.create_post(self.star if caption[0] == "s" else self.author, caption)
+        self.assertFalse(FeedEntry.objects.filter(post__user=self.star).exists())
+
+        response = self.client.get("/api/posts/feed/", {"page_size": 3})
+        self.assertEqual(self.get_captions(response), ["s1", "a1", "s0"])
+        response = self.client.get(response.data["next"])
+        self.assertEqual(self.get_captions(response), ["a0"])
+        self.assertIsNone(response.data["next"])
+        response = self.client.get(response.data["previous"])
+        self.assertEqual(self.get_captions(response), ["s1", "a1", "s0"])
+
+    def test_author_falling_below_threshold_is_backfilled(self):
+        self.follow(self.reader, self.star)
+        follow = self.follow(self.author, self.star)
+        post = self.create_post(self.star, "woof")
+        self.assertEqual(self.get_feed_post_ids(), [])
+
+        self.unfollow(follow)
+        self.assertFalse(FeedPullAuthor.objects.filter(user=self.star).exists())
+        self.assertEqual(self.get_feed_post_ids(), [post.id])
+
+
+class NestedPostQueryCountTest(TestCase):
+    def setUp(self):
+        self.user = create_account("reader")
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.get(pk=self.user.pk))
+
+    def count_queries(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_archive_page_query_count_does_not_grow_with_page_size(self):
+        posts = create_posts(self.user, 5)
+        ArchivePost.objects.create(user=self.user, post=posts[0])
+        single_archive_queries = self.count_queries("/api/posts/archive/", {})
+
+        ArchivePost.objects.bulk_create(
+            ArchivePost(user=self.user, post=post) for post in posts[1:]
+        )
+        self.assertEqual(
+            self.count_queries("/api/posts/archive/", {}), single_archive_queries
+        )
+        response = self.client.get("/api/posts/archive/")
+        self.assertTrue(
+            all(archive["post"]["liked_by_me"] for archive in response.data["results"])
+        )
+
+    def test_comment_page_query_count_does_not_grow_with_page_size(self):
+        post = create_posts(self.user, 1)[0]
+
+        def add_comment():
+            comment = Comment.objects.create(post=post, user=self.user, text="woof")
+            Comment.objects.create(
+                post=post, user=self.user, text="woof woof", replies=comment
+            )
+
+        add_comment()
+        params = {"id": post.id}
+        single_comment_queries = self.count_queries("/api/posts/comments/", params)
+        for _ in range(4):
+            add_comment()
+        self.assertEqual(
+            self.count_queries("/api/posts/comments/", params), single_comment_queries
+        )
+        response = self.client.get("/api/posts/comments/", params)
+        self.assertEqual(len(response.data["results"]), 5)
+        self.assertEqual(
+            [len(comment["replies"]) for comment in response.data["results"]], [1] * 5
+        )
+
+    def test_nested_post_without_looked_up_likes_falls_back_per_item(self):
+        post = create_posts(self.user, 1)[0]
+        post.likes.add(self.user)
+        for _ in range(2):
+            Comment.objects.create(post=post, user=self.user, text="woof")
+        request = APIRequestFactory().get("/")
+        request.user = self.user
+        context = {"request": request}
+        serializers = {
+            "batched": CommentSerializer(
+                Comment.objects.all(), many=True, context=context
+            ),
+            "per item": ListSerializer(
+                child=CommentSerializer(), instance=Comment.objects.all()
+            ),
+        }
+        serializers["per item"]._context = dict(context)
+        like_lookups = {}
+        for name, serializer in serializers.items():
+            with CaptureQueriesContext(connection) as queries:
+                data = serializer.data
+            self.assertEqual(
+                [comment["post"]["liked_by_me"] for comment in data], [True] * 2
+            )
+            like_lookups[name] = sum(
+                "posts_post_likes" in query["sql"] for query in queries
+            )
+        self.assertEqual(like_lookups, {"batched": 1, "per item": 2})
+
+
+class PostCountersTest(TestCase):
+    def setUp(self):
+        self.user = create_account("liker")
+        self.author = create_account("poster")
+        self.post = Post.objects.create(user=self.author, caption="caption")
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.get(pk=self.user.pk))
+
+    def test_like_comment_and_save_update_counters(self):
+        self.client.post("/api/posts/like/", {"id": self.post.id}, format="json")
+        self.client.post("/api/posts/save/", {"id": self.post.id}, format="json")
+        self.client.post("/api/posts/save/", {"id": self.post.id}, format="json")
+        response = self.client.post(
+            "/api/posts/comments/",
+            {"post": self.post.id, "text": "nice"},
+            format="json",
+        )
+        self.client.delete(
+            "/api/posts/comments/", {"id": response.data["id"]}, format="json"
+        )
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertEqual(self.post.save_count, 1)
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_save_counter_follows_written_rows(self):
+        url = "/api/posts/save/"
+        # saved (and counted) by a concurrent request
+        save_post = SavePost.objects.get(user=self.user)
+        save_post.posts.add(self.post)
+        Post.objects.filter(pk=self.post.pk).update(save_count=1)
+        self.client.post(url, {"id": self.post.id}, format="json")
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.save_count, 1)
+
+        for _ in range(2):
+            response = self.client.put(url, {"id": self.post.id}, format="json")
+            self.assertEqual(response.status_code, 200)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.save_count, 0)
+        self.assertFalse(save_post.posts.exists())
+
+        self.client.post(url, {"id": self.post.id}, format="json")
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.save_count, 1)
+
+    def test_serializer_exposes_liked_by_me_instead_of_likes(self):
+        self.post.likes.add(self.user)
+        response = self.client.get("/api/posts/like/")
+        post_data = response.data["results"][0]
+        self.assertTrue(post_data["liked_by_me"])
+        self.assertNotIn("likes", post_data)
+
+    def test_like_toggle_and_explicit_action(self):
+        url = "/api/posts/like/"
+        self.client.post(url, {"id": self.post.id}, format="json")
+        self.client.post(url, {"id": self.post.id, "action": "like"}, format="json")
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+
+        response = self.client.post(url, {"id": self.post.id}, format="json")
+        self.assertEqual(response.data["message"], "Unliked Post")
+        self.client.post(url, {"id": self.post.id, "action": "unlike"}, format="json")
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+        self.assertFalse(self.post.likes.exists())
+
+        response = self.client.post(url, {"id": 0}, format="json")
+        self.assertEqual(response.status_code, 404)
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        self.user = create_account("saver")
+        author = create_account("poster")
+        self.posts = [
+            Post.objects.create(user=author, caption=str(index)) for index in range(5)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.get(pk=self.user.pk))
+        # saved in a different order than they were posted
+        for index in (2, 0, 4, 1, 3):
+            self.client.post(
+                "/api/posts/save/", {"id": self.posts[index].id}, format="json"
+            )
+
+    def get_captions(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [post["caption"] for post in response.data["results"]]
+
+    def get_saved(self, cursor):
+        return self.client.get("/api/posts/save/", {"cursor": cursor})
+
+    def test_next_and_previous_links_walk_saved_posts_newest_save_first(self):
+        response = self.client.get("/api/posts/save/", {"page_size": 2})
+        self.assertEqual(self.get_captions(response), ["3", "1"])
+        self.assertIsNone(response.data["previous"])
+        response = self.client.get(response.data["next"])
+        self.assertEqual(self.get_captions(response), ["4", "0"])
+        response = self.client.get(response.data["next"])
+        self.assertEqual(self.get_captions(response), ["2"])
+        self.assertIsNone(response.data["next"])
+
+        response = self.client.get(response.data["previous"])
+        self.assertEqual(self.get_captions(response), ["4", "0"])
+        response = self.client.get(response.data["previous"])
+        self.assertEqual(self.get_captions(response), ["3", "1"])
+        self.assertIsNone(response.data["previous"])
+
+    def test_cursor_carries_the_position_of_the_last_item(self):
+        response = self.client.get("/api/posts/save/", {"page_size": 2})
+        cursor = parse_qs(urlparse(response.data["next"]).query)["cursor"][0]
+        payload = json.loads(urlsafe_b64decode(cursor))
+        last_save = SavePost.posts.through.objects.get(post=self.posts[1])
+        self.assertEqual(payload, {"p": [last_save.id], "r": False})
+
+        cursor = urlsafe_b64encode(json.dumps(payload).encode()).decode()
+        self.assertEqual(self.get_captions(self.get_saved(cursor)), ["4", "0", "2"])
+
+    def test_invalid_or_tampered_cursor_is_rejected(self):
+        for payload in (b"{", b"[]", b'{"p": []}', b'{"p": ["latest"]}'):
+            cursor = urlsafe_b64encode(payload).decode()
+            self.assertEqual(self.get_saved(cursor).status_code, 400, payload)
+        self.assertEqual(self.get_saved("not base64!").status_code, 400)
+
+        for url in ("/api/posts/", "/api/posts/save/", "/api/posts/archive/"):
+            response = self.client.get(url, {"cursor": "garbage"})
+            self.assertEqual(response.status_code, 400, url)
+            self.assertEqual(response.data, ["Invalid cursor"], url)
+
+
+class CommentTreeTest(TestCase):
+    def setUp(self):
+        self.user = create_account("commenter")
+        self.post = Post.objects.create(user=self.user, caption="caption")
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.get(pk=self.user.pk))
+
+    def comment(self, text, parent=None):
+        return Comment.objects.create(
+            post=self.post, user=self.user, text=text, replies=parent
+        )
+
+    def test_tree_nests_reply_previews_and_sends_post_once(self):
+        root = self.comment("root")
+        replies = [self.comment(f"reply {index}", root) for index in range(5)]
+        self.comment("nested", replies[0])
+        deleted = self.comment("deleted", replies[1])
+        Comment.objects.filter(pk=deleted.pk).update(is_deleted=True)
+
+        # one query per level of replies
+        with self.assertNumQueries(13):
+            response = self.client.get(f"/api/posts/comments/tree/?id={self.post.id}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["post"]["id"], self.post.id)
+
+        [root_data] = response.data["results"]
+        self.assertNotIn("post", root_data)
+        self.assertEqual(root_data["reply_count"], 5)
+        self.assertEqual(
+            [reply["text"] for reply in root_data["replies"]],
+            ["reply 0", "reply 1", "reply 2"],
+        )
+        self.assertEqual(root_data["replies"][0]["replies"][0]["text"], "nested")
+        self.assertEqual(
+            [reply["reply_count"] for reply in root_data["replies"]], [1, 0, 0]
+        )
+
+        response = self.client.get(f"/api/posts/comments/tree/?comment={root.id}")
+        self.assertEqual(
+            [reply["text"] for reply in response.data["results"]],
+            [reply.text for reply in replies],
+        )
+
+    def test_deepest_level_only_gets_reply_counts(self):
+        root = self.comment("root")
+        replies = [self.comment(f"reply {index}", root) for index in range(3)]
+        self.comment("nested", replies[0])
+
+        build_comment_tree([root], preview_size=2, max_depth=1)
+        self.assertEqual(root.reply_count, 3)
+        self.assertEqual(root.reply_preview, replies[:2])
+        self.assertEqual(root.reply_preview[0].reply_count, 1)
+        self.assertEqual(root.reply_preview[0].reply_preview, [])
+
+
+class ExploreTest(TestCase):
+    def setUp(self):
+        self.reader = create_account("explorer")
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.get(pk=self.reader.pk))
+
+    def test_explore_serves_ranked_pool_without_private_or_blocked_accounts(self):
+        author = create_account("popular")
+        quiet, popular = create_posts(author, 2)
+        Post.objects.filter(pk=popular.pk).update(like_count=10, save_count=2)
+        private = create_account("private")
+        Account.objects.filter(user=private).update(private=True)
+        create_posts(private, 1)
+        blocked = create_account("blocked")
+        create_posts(blocked, 1)
+        block = BlockAccount.objects.create(user=self.reader.account)
+        block.users.add(blocked.account)
+
+        self.assertEqual(build_explore_pool(), 3)
+        response = self.client.get("/api/posts/explore/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [post["id"] for post in response.data["results"]], [popular.id, quiet.id]
+        )
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), IMAGE_PROCESSING_WORKERS=0)
+class ImageDerivativeTest(TestCase):
+    def test_upload_generates_derivatives_and_srcset(self):
+        user = create_account("photographer")
+        post = Post.objects.create(user=user, caption="caption")
+        upload = BytesIO()
+        PILImage.new("RGB", (2000, 1000), "orange").save(upload, format="JPEG")
+        with self.captureOnCommitCallbacks(execute=True):
+            image = Image.objects.create(
+                post=post, image=SimpleUploadedFile("pet.jpg", upload.getvalue())
+            )
+
+        self.assertEqual(
+            list(image.derivatives.values_list("variant", "width", "height")),
+            [("thumbnail", 150, 75), ("grid", 640, 320), ("full", 1080, 540)],
+        )
+        data = PostSerializer(Post.objects.filter(pk=post.pk), many=True).data[0]
+        data = data["images"][0]
+        self.assertEqual(
+            data["srcset"],
+            ", ".join(
+                f"{derivative.file.url} {derivative.width}w"
+                for derivative in image.derivatives.all()
+            ),
+        )
+        # laid out and painted before any image file is fetched
+        self.assertEqual((data["width"], data["height"]), (2000, 1000))
+        self.assertEqual(data["aspect_ratio"], 2.0)
+        self.assertTrue(data["placeholder"].startswith("data:image/webp;base64,"))
+        self.assertLess(len(data["placeholder"]), 1024)
+
+
+@override_settings(
+    MEDIA_ROOT=tempfile.mkdtemp(),
+    IMAGE_PROCESSING_WORKERS=0,
+    UPLOAD_MAX_FILES=2,
+    UPLOAD_MAX_FILE_SIZE=1024,
+)
+class BoundedUploadTest(TestCase):
+    def setUp(self):
+        self.user = create_account("uploader")
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.get(pk=self.user.pk))
+
+    def upload(self, *images):
+        return self.client.post(
+            "/api/posts/",
+            {
+                "caption": "",
+                "location": "",
+                "tags": "",
+                "hashtags": "",
+                "images": images,
+            },
+            format="multipart",
+        )
+
+    def image(self, size=(4, 4), name="pet.png"):
+        content = BytesIO()
+        PILImage.effect_noise(size, 50).save(content, format="PNG")
+        return SimpleUploadedFile(name, content.getvalue())
+
+    def test_valid_upload_is_hashed_and_saved(self):
+        response = self.upload(self.image())
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Image.objects.count(), 1)
+
+    def test_rejects_non_images_oversize_files_and_too_many_files(self):
+        response = self.upload(SimpleUploadedFile("pet.png", b"<script></script>"))
+        self.assertEqual(response.status_code, 400)
+        response = self.upload(self.image(size=(200, 200)))
+        self.assertEqual(response.status_code, 413)
+        response = self.upload(self.image(), self.image(), self.image())
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Post.objects.exists())
+
+
+@override_settings(
+    MEDIA_ROOT=tempfile.mkdtemp(),
+    UPLOAD_SESSION_ROOT=tempfile.mkdtemp(),
+    IMAGE_PROCESSING_WORKERS=0,
+)
+class UploadSessionTest(TestCase):
+    def setUp(self):
+        self.user = create_account("uploader")
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.get(pk=self.user.pk))
+        content = BytesIO()
+        PILImage.effect_noise((16, 16), 50).save(content, format="PNG")
+        self.data = content.getvalue()
+
+    def send(self, upload_id, start, end):
+        return self.client.patch(
+            f"/api/posts/uploads/{upload_id}/",
+            self.data[start:end],
+            content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=f"bytes {start}-{end - 1}/{len(self.data)}",
+        )
+
+    def create_post(self, uploads):
+        return self.client.post(
+            "/api/posts/",
+            {
+                "caption": "",
+                "location": "",
+                "tags": "",
+                "hashtags": "",
+                "uploads": uploads,
+            },
+            format="multipart",
+        )
+
+    def test_chunked_upload_is_resumed_and_attached_to_a_post(self):
+        response = self.client.post(
+            "/api/posts/uploads/", {"filename": "pet.png", "size": len(self.data)}
+        )
+        self.assertEqual(response.status_code, 201)
+        upload_id = response.data["id"]
+        middle = len(self.data) // 2
+
+        self.assertEqual(self.send(upload_id, 0, middle).data["offset"], middle)
+        # a chunk that does not continue at the offset is refused
+        response = self.send(upload_id, middle + 1, len(self.data))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["offset"], middle)
+        # the client asks where to resume from
+        offset = self.client.get(f"/api/posts/uploads/{upload_id}/").data["offset"]
+        response = self.send(upload_id, offset, len(self.data))
+        self.assertEqual(response.data["status"], "COMPLETE")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.create_post(upload_id)
+        self.assertEqual(response.status_code, 201)
+        image = Image.objects.get(post_id=response.data["id"])
+        with image.image.open("rb") as file:
+            self.assertEqual(file.read(), self.data)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_unknown_upload_creates_no_post(self):
+        response = self.create_post(str(uuid.uuid4()))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Post.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), IMAGE_PROCESSING_WORKERS=0)
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class MediaServingTest(TestCase):
+    def setUp(self):
+        self.author = create_account("author")
+        content = BytesIO()
+        PILImage.effect_noise((8, 8), 50).save(content, format="PNG")
+        self.data = content.getvalue()
+        post = Post.objects.create(user=self.author, caption="")
+        image = Image.objects.create(
+            post=post, image=SimpleUploadedFile("pet.png", self.data)
+        )
+        self.name = image.image.name
+        self.url = f"/media/{self.name}"
+
+    def client_for(self, username):
+        client = APIClient()
+        client.force_authenticate(CustomUser.objects.get(username=username))
+        return client
+
+    def test_private_and_blocked_images_are_only_served_to_allowed_users(self):
+        response = APIClient().get(self.url, HTTP_RANGE="bytes=0-3")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), self.data[:4])
+        self.assertEqual(response["Content-Range"], f"bytes 0-3/{len(self.data)}")
+        self.assertTrue(response["Cache-Control"].startswith("public"))
+
+        Account.objects.filter(user=self.author).update(private=True)
+        follower = create_account("follower")
+        create_account("stranger")
+        FollowAccount.objects.create(
+            follower=follower.account, following=self.author.account
+        )
+        self.assertEqual(APIClient().get(self.url).status_code, 404)
+        self.assertEqual(self.client_for("stranger").get(self.url).status_code, 404)
+        response = self.client_for("follower").get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Cache-Control"].startswith("private"))
+
+        block = BlockAccount.objects.create(user=self.author.account)
+        block.users.add(follower.account)
+        self.assertEqual(self.client_for("follower").get(self.url).status_code, 404)
+        self.assertEqual(self.client_for("author").get(self.url).status_code, 200)
+
+    def test_other_spellings_of_a_private_image_are_refused(self):
+        Account.objects.filter(user=self.author).update(private=True)
+        for url in (
+            f"/media/./{self.name}",
+            f"/media/profile_photos/../{self.name}",
+            f"/media/{self.name.replace('/', '//', 1)}",
+        ):
+            response = APIClient().get(url)
+            self.assertEqual(response.status_code, 404, url)
+        self.assertEqual(APIClient().get(self.url).status_code, 404)
+
+    def test_access_follows_the_rows_referencing_the_file(self):
+        Account.objects.filter(user=self.author).update(private=True)
+        # the same content as a profile photo is the same file under post_images/
+        account = create_account("twin").account
+        account.avatar = SimpleUploadedFile("me.png", self.data)
+        account.save()
+        self.assertEqual(account.avatar.name, self.name)
+        response = APIClient().get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Cache-Control"].startswith("public"))
+
+        # files no row references are not served
+        name = default_storage.save("post_images/stray.png", BytesIO(self.data))
+        self.assertEqual(APIClient().get(f"/media/{name}").status_code, 404)
+
+    @override_settings(MEDIA_SERVING="nginx")
+    def test_proxy_sends_the_file(self):
+        response = APIClient().get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response["X-Accel-Redirect"], f"/protected-media{self.url[len('/media'):]}"
+        )
+        self.assertEqual(response.content, b"")
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(), IMAGE_PROCESSING_WORKERS=0)
+class DuplicateImageTest(TestCase):
+    def upload(self, picture, image_format="PNG", **options):
+        content = BytesIO()
+        picture.save(content, format=image_format, **options)
+        with self.captureOnCommitCallbacks(execute=True):
+            image = Image.objects.create(
+                image=SimpleUploadedFile(f"pet.{image_format}", content.getvalue())
+            )
+        image.refresh_from_db()
+        return image
+
+    def test_reencoded_and_cropped_copies_are_found(self):
+        picture = PILImage.radial_gradient("L").convert("RGB").resize((400, 300))
+        original = self.upload(picture)
+        copy = self.upload(
+            picture.crop((4, 3, 396, 297)), image_format="JPEG", quality=50
+        )
+        other = self.upload(PILImage.linear_gradient("L").convert("RGB"))
+
+        duplicates = near_duplicates(original.phash, 6).exclude(pk=original.pk)
+        self.assertEqual([image.pk for image in duplicates], [copy.pk])
+        self.assertNotIn(other, near_duplicates(original.phash, 6))
+
+    def test_lookup_finds_hashes_differing_in_every_band(self):
+        base = 0x0123456789ABCDEF
+        # 5 and 8 bits apart, spread over all the bands
+        near = Image.objects.create(**get_hash_fields(base ^ 0x0001000300010001))
+        far = Image.objects.create(**get_hash_fields(base ^ 0x0003000300070001))
+        self.assertEqual(
+            [(image.pk, image.distance) for image in near_duplicates(base, 6)],
+            [(near.pk, 5)],
+        )
+        self.assertEqual(near_duplicates(base, 8).count(), 2)
+        with self.assertNumQueries(1):
+            list(near_duplicates(base | 1 << 63, 6))
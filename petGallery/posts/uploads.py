@@ -0,0 +1,171 @@
+import hashlib
+import os
+import re
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from posts.models import Image, UploadSession
+from utils.upload_handlers import HEADER_LENGTH, is_image_header
+
+CONTENT_RANGE_PATTERN = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """
+    `discard` is set when the session cannot be continued and should be removed.
+    """
+
+    def __init__(self, message, status_code, discard=False):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.discard = discard
+
+
+def get_session_path(session):
+    return os.path.join(settings.UPLOAD_SESSION_ROOT, str(session.id))
+
+
+def create_session(user, filename, size):
+    return UploadSession.objects.create(
+        user=user,
+        filename=os.path.basename(filename),
+        size=size,
+        expires_at=timezone.now()
+        + timedelta(hours=settings.UPLOAD_SESSION_EXPIRY_HOURS),
+    )
+
+
+def parse_content_range(header):
+    """
+    Parse `bytes start-end/total` into (start, length, total).
+    """
+    match = CONTENT_RANGE_PATTERN.match(header or "")
+    if match is None:
+        raise UploadError("Content-Range must be 'bytes start-end/total'", 400)
+    start, end, total = map(int, match.groups())
+    if end < start:
+        raise UploadError("Invalid Content-Range", 400)
+    return start, end - start + 1, total
+
+
+def append_chunk(session, stream, start, length):
+    """
+    Write up to `length` bytes of `stream` at `start` of the session's file and
+    advance its offset by what was actually received, so a client that dropped
+    mid-chunk resumes from there. The session must be locked by the caller.
+    """
+    if session.status != "UPLOADING":
+        raise UploadError("Upload is already complete", 409)
+    if start != session.offset:
+        raise UploadError(f"Expected a chunk starting at {session.offset}", 409)
+    if length > settings.UPLOAD_CHUNK_MAX_SIZE:
+        raise UploadError(
+            f"Chunks can be at most {settings.UPLOAD_CHUNK_MAX_SIZE} bytes", 413
+        )
+    if start + length > session.size:
+        raise UploadError("Chunk goes past the end of the file", 400)
+
+    path = get_session_path(session)
+    os.makedirs(settings.UPLOAD_SESSION_ROOT, exist_ok=True)
+    received = 0
+    with open(path, "r+b" if os.path.exists(path) else "wb") as file:
+        # anything past the offset was written by a request that did not commit
+        file.seek(start)
+        file.truncate()
+        while received < length:
+            data = stream.read(min(COPY_BUFFER_SIZE, length - received))
+            if not data:
+                break
+            if start + received < HEADER_LENGTH:
+                file.write(data)
+                file.flush()
+                check_header(path, session)
+            else:
+                file.write(data)
+            received += len(data)
+
+    session.offset = start + received
+    update_fields = ["offset", "updated_at"]
+    if session.offset == session.size:
+        check_header(path, session, complete=True)
+        session.status = "COMPLETE"
+        session.sha256 = hash_path(path)
+        update_fields += ["status", "sha256"]
+    session.save(update_fields=update_fields)
+    return session
+
+
+def check_header(path, session, complete=False):
+    with open(path, "rb") as file:
+        header = file.read(HEADER_LENGTH)
+    if (complete or len(header) == HEADER_LENGTH) and not is_image_header(header):
+        raise UploadError(
+            f"{session.filename} is not a JPEG, PNG, GIF or WebP image",
+            400,
+            discard=True,
+        )
+
+
+def hash_path(path):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(COPY_BUFFER_SIZE), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def attach_uploads(post, user, upload_ids):
+    """
+    Create the post's images from completed upload sessions of `user`. Must run in
+    the transaction creating the post, the sessions are removed once it commits.
+    """
+    try:
+        upload_ids = [uuid.UUID(str(upload_id)) for upload_id in upload_ids]
+    except ValueError:
+        raise UploadError("Unknown or incomplete upload", 400)
+    sessions = UploadSession.objects.select_for_update().filter(
+        id__in=upload_ids, user=user, status="COMPLETE"
+    )
+    by_id = {session.id: session for session in sessions}
+    if len(by_id) != len(set(upload_ids)):
+        raise UploadError("Unknown or incomplete upload", 400)
+
+    for upload_id in upload_ids:
+        session = by_id[upload_id]
+        with open(get_session_path(session), "rb") as file:
+            upload = File(file, name=session.filename)
+            upload.sha256 = session.sha256
+            Image.objects.create(post=post, image=upload)
+    UploadSession.objects.filter(id__in=by_id).delete()
+    paths = [get_session_path(session) for session in by_id.values()]
+    transaction.on_commit(lambda: remove_files(paths))
+
+
+def discard_session(session):
+    UploadSession.objects.filter(pk=session.pk).delete()
+    remove_files([get_session_path(session)])
+
+
+def remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def expire_sessions():
+    """
+    Delete expired sessions and their partial files, returns how many were removed.
+    """
+    expired = list(UploadSession.objects.filter(expires_at__lt=timezone.now()))
+    for session in expired:
+        discard_session(session)
+    return len(expired)
@@ -7,6 +7,13 @@ from posts.views.views2 import (
     TaggedPostsView,
     LikePostsView,
     CommentsView,
+    CommentTreeView,
+)
+from posts.views.views3 import (
+    UploadSessionView,
+    UploadSessionDetailView,
+    PresignedImageUploadView,
+    PresignedImageCompleteView,
 )
 
 
@@ -19,4 +26,9 @@ urlpatterns = [
     path("tagged/", TaggedPostsView.as_view()),
     path("like/", LikePostsView.as_view()),
     path("comments/", CommentsView.as_view()),
+    path("comments/tree/", CommentTreeView.as_view()),
+    path("uploads/", UploadSessionView.as_view()),
+    path("uploads/<uuid:upload_id>/", UploadSessionDetailView.as_view()),
+    path("uploads/presigned/", PresignedImageUploadView.as_view()),
+    path("uploads/presigned/complete/", PresignedImageCompleteView.as_view()),
 ]
@@ -1,3 +1,4 @@
+from django.db import transaction
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
@@ -10,12 +11,15 @@ from posts.serializers import (
     ArchivePostSerializer,
     SavePostSerializer,
 )
+from posts.saves import add_save, remove_save
+from posts.uploads import UploadError, attach_uploads
 from utils.permissions import IsOwner
+from utils.upload_handlers import BoundedUploadMixin
 
 # things to be done
 
 
-class PostView(generics.GenericAPIView):
+class PostView(BoundedUploadMixin, generics.GenericAPIView):
     queryset = Post.objects.all()
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticated, IsOwner]
@@ -24,17 +28,12 @@ class PostView(generics.GenericAPIView):
         """
         This route is for getting the posts that the pet(user) created
         """
-        try:
-            posts = Post.objects.filter(
-                user=request.user, is_archived=False, is_deleted=False
-            )
-            serializer = self.get_serializer(posts, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except:
-            return Response(
-                {"message": "Something went wrong please try again"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
+        posts = Post.objects.filter(
+            user=request.user, is_archived=False, is_deleted=False
+        )
+        page = self.paginate_queryset(posts)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     def delete(self, request, *args, **kwargs):
         """
@@ -55,7 +54,7 @@ class PostView(generics.GenericAPIView):
                     post.is_archived = False
                 # set is_deleted flag to True, save post and return Response
                 post.is_deleted = True
-                post.save()
+                post.save(update_fields=["is_deleted", "is_archived", "updated_at"])
                 return Response(
                     {"message": "Post deleted successfully"},
                     status=status.HTTP_204_NO_CONTENT,
@@ -91,20 +90,17 @@ class PostView(generics.GenericAPIView):
                     username__in=request.data["tags"]
                 )
                 post.tags.set(new_tagged_users)
-                # handle hashtags
-                if request.data["hashtags"] == []:
-                    post.hashtags.clear()
-                else:
-                    post.hashtags.clear()
-                    post_hashtags = [
-                        Hashtag.objects.get_or_create(name=hashtag)[0].id
-                        for hashtag in request.data["hashtags"]
-                    ]
-                    post.hashtags.add(*post_hashtags)
-                post.save()
+                # handle hashtags, set() only touches the ones that changed so kept
+                # hashtags are not counted again towards trending
+                post_hashtags = [
+                    Hashtag.objects.get_or_create(name=hashtag)[0].id
+                    for hashtag in request.data["hashtags"]
+                ]
+                post.hashtags.set(post_hashtags)
+                post.save(update_fields=["caption", "location", "updated_at"])
 
                 # serializer data and return Response
-                serializer = PostSerializer(post)
+                serializer = PostSerializer(post, context={"request": request})
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
         except:
             return Response(
@@ -121,48 +117,67 @@ class PostView(generics.GenericAPIView):
         tags - "username,username,username" - a string of username of the tagged users seperated by commas
         hashtags - "name,name,name" - a string of hashtag names (new or old) seperated by commas
         images - a list of images
+        uploads - "id,id" - ids of completed upload sessions (see /api/posts/uploads/), instead of or as well as images
         """
+        upload_error_response = self.get_upload_error_response(request)
+        if upload_error_response is not None:
+            return upload_error_response
         try:
-            # create a post object
-            post = Post.objects.create(
-                caption=request.data["caption"],
-                location=request.data["location"],
-                user=request.user,
-            )
+            # the post and all its images are created together or not at all
+            with transaction.atomic():
+                # create a post object
+                post = Post.objects.create(
+                    caption=request.data["caption"],
+                    location=request.data["location"],
+                    user=request.user,
+                )
 
-            # get and add the users tagged to the post
-            if request.data["tags"] != "":
-                tagged_users = [
-                    CustomUser.objects.get(username=tagged_user)
-                    for tagged_user in request.data["tags"].split(",")
-                ]
-                post.tags.add(*tagged_users)
+                # get and add the users tagged to the post
+                if request.data["tags"] != "":
+                    tagged_users = [
+                        CustomUser.objects.get(username=tagged_user)
+                        for tagged_user in request.data["tags"].split(",")
+                    ]
+                    post.tags.add(*tagged_users)
 
-            # get or create hashtags and add to the post
-            if request.data["hashtags"] != "":
-                post_hashtags = [
-                    Hashtag.objects.get_or_create(name=hashtag)[0].id
-                    for hashtag in request.data["hashtags"].split(",")
-                ]
-                post.hashtags.add(*post_hashtags)
+                # get or create hashtags and add to the post
+                if request.data["hashtags"] != "":
+                    post_hashtags = [
+                        Hashtag.objects.get_or_create(name=hashtag)[0].id
+                        for hashtag in request.data["hashtags"].split(",")
+                    ]
+                    post.hashtags.add(*post_hashtags)
 
-            # get images from request.FILES and create image objects using ImageSerializer
-            images = request.FILES.getlist("images")
-            for image in images:
-                image_serializer = ImageSerializer(
-                    data={"post": post.pk, "image": image}
-                )
-                if image_serializer.is_valid():
-                    image_serializer.save()
-                else:
-                    return Response(
-                        image_serializer.errors, status=status.HTTP_400_BAD_REQUEST
+                # add images uploaded beforehand through upload sessions
+                upload_ids = request.data.get("uploads", "")
+                if isinstance(upload_ids, str):
+                    upload_ids = [
+                        upload_id for upload_id in upload_ids.split(",") if upload_id
+                    ]
+                if upload_ids:
+                    attach_uploads(post, request.user, upload_ids)
+
+                # get images from request.FILES and create image objects using ImageSerializer
+                images = request.FILES.getlist("images")
+                for image in images:
+                    image_serializer = ImageSerializer(
+                        data={"post": post.pk, "image": image}
                     )
+                    if image_serializer.is_valid():
+                        image_serializer.save()
+                    else:
+                        transaction.set_rollback(True)
+                        return Response(
+                            image_serializer.errors,
+                            status=status.HTTP_400_BAD_REQUEST,
+                        )
 
             # serializer data and return Response
-            serializer = PostSerializer(post)
+            serializer = PostSerializer(post, context={"request": request})
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+        except UploadError as e:
+            return Response({"message": e.message}, status=e.status_code)
         except:
             return Response(
                 {"message": "Something went wrong pelase try again"},
@@ -180,8 +195,11 @@ class ArchivePostView(generics.GenericAPIView):
         This route is for getting posts archived by the pet(user)
         """
         archived_posts = ArchivePost.objects.filter(user=request.user)
-        serializer = ArchivePostSerializer(archived_posts, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        page = self.paginate_queryset(archived_posts)
+        serializer = ArchivePostSerializer(
+            page, many=True, context={"request": request}
+        )
+        return self.get_paginated_response(serializer.data)
 
     def post(self, request, *args, **kwargs):
         """
@@ -197,8 +215,10 @@ class ArchivePostView(generics.GenericAPIView):
                 # create archive obj and set post is_archived flag to True, and save.
                 archive_obj = ArchivePost.objects.create(user=request.user, post=post)
                 post.is_archived = True
-                post.save()
-                serializer = ArchivePostSerializer(archive_obj)
+                post.save(update_fields=["is_archived", "updated_at"])
+                serializer = ArchivePostSerializer(
+                    archive_obj, context={"request": request}
+                )
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
             else:
                 return Response(
@@ -227,7 +247,7 @@ class ArchivePostView(generics.GenericAPIView):
                 post = Post.objects.get(id=archived_post.post.id)
                 # set is_archived flag of the main post obj to False and save
                 post.is_archived = False
-                post.save()
+                post.save(update_fields=["is_archived", "updated_at"])
                 # delete the archived post relationship obj
                 archived_post.delete()
                 return Response(
@@ -250,6 +270,8 @@ class SavePostView(generics.GenericAPIView):
     queryset = SavePost.objects.all()
     serializer_class = SavePostSerializer
     permission_classes = [IsAuthenticated, IsOwner]
+    # saved posts are listed by when they were saved, i.e. by their through row
+    keyset_ordering = ("-id",)
 
     def post(self, request, *args, **kwargs):
         """
@@ -263,8 +285,10 @@ class SavePostView(generics.GenericAPIView):
             user_save_post_obj, created = SavePost.objects.get_or_create(
                 user=request.user
             )
-            user_save_post_obj.posts.add(request.data["id"])
-            serializer = SavePostSerializer(user_save_post_obj)
+            add_save(user_save_post_obj, request.data["id"])
+            serializer = SavePostSerializer(
+                user_save_post_obj, context={"request": request}
+            )
             return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
 
         except KeyError:
@@ -274,7 +298,7 @@ class SavePostView(generics.GenericAPIView):
             )
 
         except ValidationError as e:
-            return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({"message": e.detail}, status=status.HTTP_400_BAD_REQUEST)
 
         except Exception as e:
             return Response(
@@ -286,20 +310,14 @@ class SavePostView(generics.GenericAPIView):
         """
         This route is for getting all the posts saved by the pet(user)
         """
-        try:
-            saved_posts_objs, created = SavePost.objects.get_or_create(
-                user=request.user
-            )
-            serializer = SavePostSerializer(saved_posts_objs)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except ValidationError as e:
-            return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
-
-        except Exception as e:
-            return Response(
-                {"message": "Something went wrong. Please try again."},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
+        saves = SavePost.posts.through.objects.filter(
+            savepost__user=request.user
+        ).select_related("post")
+        page = self.paginate_queryset(saves)
+        serializer = PostSerializer(
+            [save.post for save in page], many=True, context={"request": request}
+        )
+        return self.get_paginated_response(serializer.data)
 
     def put(self, request, *args, **kwargs):
         """
@@ -312,8 +330,10 @@ class SavePostView(generics.GenericAPIView):
             saved_posts_objs, created = SavePost.objects.get_or_create(
                 user=request.user
             )
-            saved_posts_objs.posts.remove(request.data["id"])
-            serializer = SavePostSerializer(saved_posts_objs)
+            remove_save(saved_posts_objs, request.data["id"])
+            serializer = SavePostSerializer(
+                saved_posts_objs, context={"request": request}
+            )
             return Response(serializer.data, status=status.HTTP_200_OK)
         except KeyError:
             return Response(
@@ -321,7 +341,7 @@ class SavePostView(generics.GenericAPIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
         except ValidationError as e:
-            return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({"message": e.detail}, status=status.HTTP_400_BAD_REQUEST)
 
         except Exception as e:
             return Response(
@@ -1,37 +1,35 @@
+from django.db.models import F
+from django.utils import timezone
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import ValidationError
 from posts.models import Post, Comment
-from users.models import Account
-from posts.serializers import PostSerializer, CommentSerializer
+from posts.serializers import PostSerializer, CommentSerializer, CommentTreeSerializer
+from posts.comments import build_comment_tree, nest_comment_data
+from posts.explore import explore_queryset
+from posts.feed import FeedPaginator
+from posts.likes import toggle_like
 from utils.permissions import IsOwner
-
-
-# things to be don
-# how to get post and comments in one response object
+from utils.prefetch import optimize_queryset
 
 
 class FeedPostsView(generics.ListAPIView):
     queryset = Post.objects.all()
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticated, IsOwner]
+    pagination_class = FeedPaginator
 
     def get(self, request, *args, **kwargs):
         """
         This route is for getting posts for the pet(user) feed, this are posts from accounts the pet(user) follows.
         """
         try:
-            # get the requesting users account obj and get the usernames of the account the user follows
-            user_account = Account.objects.get(user=request.user)
-            following_usernames = [
-                following.following.user.username
-                for following in user_account.following.all()
-            ]
-            # get posts based on following_usernames, serialize and return Response
-            posts = Post.objects.filter(user__username__in=following_usernames)
-            serializer = PostSerializer(posts, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            # read the materialized feed of the requesting user, see FeedPaginator
+            posts = Post.objects.filter(is_deleted=False, is_archived=False)
+            page = self.paginate_queryset(posts)
+            serializer = PostSerializer(page, many=True, context={"request": request})
+            return self.get_paginated_response(serializer.data)
         except ValidationError as e:
             return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -46,17 +44,17 @@ class ExplorePostsView(generics.ListAPIView):
     queryset = Post.objects.all()
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticated, IsOwner]
+    keyset_ordering = ("-explore_score", "-id")
 
     def get(self, request, *args, **kwargs):
         """
-        This route is for getting posts for the explore feed
+        This route is for getting posts for the explore feed, ranked from the precomputed explore pool
         """
         try:
-            users_accounts = Account.objects.all()
-            accounts_usernames = [account.user.username for account in users_accounts]
-            posts = Post.objects.filter(user__username__in=accounts_usernames)
-            serializer = PostSerializer(posts, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            posts = explore_queryset(request.user)
+            page = self.paginate_queryset(posts)
+            serializer = PostSerializer(page, many=True, context={"request": request})
+            return self.get_paginated_response(serializer.data)
         except ValidationError as e:
             return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -78,8 +76,9 @@ class TaggedPostsView(generics.RetrieveUpdateAPIView):
         """
         try:
             posts = Post.objects.filter(tags__username=request.user)
-            serializer = PostSerializer(posts, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            page = self.paginate_queryset(posts)
+            serializer = PostSerializer(page, many=True, context={"request": request})
+            return self.get_paginated_response(serializer.data)
         except ValidationError as e:
             return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -102,7 +101,7 @@ class TaggedPostsView(generics.RetrieveUpdateAPIView):
             if request.user in post.tags.all():
                 # remove user from tag list, save post obj, and return Response
                 post.tags.remove(request.user)
-                post.save()
+                post.save(update_fields=["updated_at"])
                 return Response(
                     {"message": "Tag removed successfully"}, status=status.HTTP_200_OK
                 )
@@ -135,8 +134,9 @@ class LikePostsView(generics.ListCreateAPIView):
         """
         try:
             posts = Post.objects.filter(likes__username=request.user)
-            serializer = PostSerializer(posts, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            page = self.paginate_queryset(posts)
+            serializer = PostSerializer(page, many=True, context={"request": request})
+            return self.get_paginated_response(serializer.data)
         except ValidationError as e:
             return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -148,20 +148,24 @@ class LikePostsView(generics.ListCreateAPIView):
 
     def post(self, request, *args, **kwargs):
         """
-        This route is for liking and unliking a post
+        This route is for liking and unliking a post, send "action" to like or unlike instead of toggling
         {
-            "id": post_id
+            "id": post_id,
+            "action": "like" | "unlike" (optional)
         }
         """
         try:
-            post = Post.objects.get(id=request.data["id"])
-            if request.user not in post.likes.all():
-                post.likes.add(request.user)
-                post.save()
+            if not Post.objects.filter(id=request.data["id"]).exists():
+                return Response(
+                    {"message": "Post does not exist"},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+            liked = toggle_like(
+                Post, request.data["id"], request.user.id, request.data.get("action")
+            )
+            if liked:
                 return Response({"message": "Liked Post"}, status=status.HTTP_200_OK)
             else:
-                post.likes.remove(request.user)
-                post.save()
                 return Response({"message": "Unliked Post"}, status=status.HTTP_200_OK)
 
         except KeyError:
@@ -184,35 +188,38 @@ class CommentsView(generics.GenericAPIView):
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticated, IsOwner]
 
-    def get_comments_with_replies(self, post):
-        # Fetch all comments related to the post
-        comments = Comment.objects.filter(post=post, is_deleted=False)
-        # Create a dictionary to hold comments and their replies
-        comments_with_replies = {}
-        # Iterate over each comment
-        for comment in comments:
-            # Fetch replies for the current comment
-            replies = Comment.objects.filter(replies=comment)
-            # Serialize the comment and its replies
-            comment_data = CommentSerializer(comment).data
-            replies_data = CommentSerializer(replies, many=True).data
-            # Add the replies data to the comment data
-            comment_data["replies"] = replies_data
-            # Add the comment and its replies to the dictionary
-            comments_with_replies[comment.id] = comment_data
+    def get_comments_with_replies(self, comments):
+        # Fetch the replies of the given comments in one query and serialize them
+        # together with the comments, so the page shares one set of prefetches
+        replies = list(Comment.objects.filter(replies__in=comments, is_deleted=False))
+        serialized = CommentSerializer(
+            [*comments, *replies], many=True, context={"request": self.request}
+        ).data
+        comments_with_replies = serialized[: len(comments)]
+        replies_by_comment = {}
+        for reply, reply_data in zip(replies, serialized[len(comments) :]):
+            replies_by_comment.setdefault(reply.replies_id, []).append(reply_data)
+        for comment, comment_data in zip(comments, comments_with_replies):
+            comment_data["replies"] = replies_by_comment.get(comment.id, [])
         return comments_with_replies
 
     def get(self, request, *args, **kwargs):
         """
-        This route is for getting all the comments fo a post and its replies
+        This route is for getting the comments of a post and their replies, a page of top-level comments at a time
+        ?id=post_id or
         {
             "id": post_id
         }
         """
         try:
-            post = Post.objects.get(id=request.data["id"])
-            comments_with_replies = self.get_comments_with_replies(post)
-            return Response(comments_with_replies, status=status.HTTP_200_OK)
+            post_id = request.query_params.get("id") or request.data["id"]
+            post = Post.objects.get(id=post_id)
+            comments = Comment.objects.filter(
+                post=post, replies__isnull=True, is_deleted=False
+            )
+            page = self.paginate_queryset(comments)
+            comments_with_replies = self.get_comments_with_replies(page)
+            return self.get_paginated_response(comments_with_replies)
 
         except ValidationError as e:
             return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -242,7 +249,10 @@ class CommentsView(generics.GenericAPIView):
                 comment = Comment.objects.create(
                     post=post, user=request.user, text=request.data["text"]
                 )
-                serializer = CommentSerializer(comment)
+                Post.objects.filter(pk=post.pk).update(
+                    comment_count=F("comment_count") + 1
+                )
+                serializer = CommentSerializer(comment, context={"request": request})
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
             else:
                 parent_comment = Comment.objects.get(id=request.data["comment"])
@@ -252,7 +262,10 @@ class CommentsView(generics.GenericAPIView):
                     text=request.data["text"],
                     replies=parent_comment,
                 )
-                serializer = CommentSerializer(comment)
+                Post.objects.filter(pk=parent_comment.post_id).update(
+                    comment_count=F("comment_count") + 1
+                )
+                serializer = CommentSerializer(comment, context={"request": request})
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         except KeyError:
@@ -283,8 +296,8 @@ class CommentsView(generics.GenericAPIView):
                 comment.text = request.data["text"]
                 # change the edited flag to True to show it was edited, save comment obj, and return Response
                 comment.edited = True
-                comment.save()
-                serializer = CommentSerializer(comment)
+                comment.save(update_fields=["text", "edited", "updated_at"])
+                serializer = CommentSerializer(comment, context={"request": request})
                 return Response(serializer.data, status=status.HTTP_200_OK)
             else:
                 return Response(
@@ -307,20 +320,24 @@ class CommentsView(generics.GenericAPIView):
 
     def patch(self, request, *args, **kwargs):
         """
-        This route is for a pet(user) to like and unlike a comment or reply
+        This route is for a pet(user) to like and unlike a comment or reply, send "action" to like or unlike instead of toggling
         {
-            "id": comment_id
+            "id": comment_id,
+            "action": "like" | "unlike" (optional)
         }
         """
         try:
-            comment = Comment.objects.get(id=request.data["id"])
-            if request.user not in comment.likes.all():
-                comment.likes.add(request.user)
-                comment.save()
+            if not Comment.objects.filter(id=request.data["id"]).exists():
+                return Response(
+                    {"message": "Comment does not exist"},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+            liked = toggle_like(
+                Comment, request.data["id"], request.user.id, request.data.get("action")
+            )
+            if liked:
                 return Response({"message": "Liked Comment"}, status=status.HTTP_200_OK)
             else:
-                comment.likes.remove(request.user)
-                comment.save()
                 return Response(
                     {"message": "Unliked Comment"}, status=status.HTTP_200_OK
                 )
@@ -350,9 +367,13 @@ class CommentsView(generics.GenericAPIView):
             # get the comment obj and check if the pet(user) is the owner of the comment or the owner of the post
             comment = Comment.objects.get(id=request.data["id"])
             if (request.user == comment.user) or (request.user == comment.post.user):
-                # set the is_deleted flag of the comment to True, save, and return Response
-                comment.is_deleted = True
-                comment.save()
+                # set the is_deleted flag of the comment to True and update the post comment count once
+                if Comment.objects.filter(pk=comment.pk, is_deleted=False).update(
+                    is_deleted=True, updated_at=timezone.now()
+                ):
+                    Post.objects.filter(pk=comment.post_id).update(
+                        comment_count=F("comment_count") - 1
+                    )
                 return Response(
                     {"message": "Comment deleted Successfully"},
                     status=status.HTTP_200_OK,
@@ -375,3 +396,77 @@ class CommentsView(generics.GenericAPIView):
                 {"message": "Something went wrong. Please try again."},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+
+class CommentTreeView(generics.GenericAPIView):
+    queryset = Comment.objects.all()
+    serializer_class = CommentTreeSerializer
+    permission_classes = [IsAuthenticated]
+
+    @property
+    def keyset_ordering(self):
+        # top-level comments are listed newest first, replies in the order they were written
+        if "comment" in self.request.query_params:
+            return ("created_at", "id")
+        return ("-created_at", "-id")
+
+    def get(self, request, *args, **kwargs):
+        """
+        This route is for getting the comments of a post as a tree, a page of top-level comments at a time
+        with a preview of their replies. The post is sent once alongside the comments
+        ?id=post_id
+        and for the next replies of a comment
+        ?comment=comment_id
+        """
+        try:
+            if "comment" in request.query_params:
+                parent = Comment.objects.filter(
+                    id=request.query_params["comment"], is_deleted=False
+                ).first()
+                if parent is None:
+                    return Response(
+                        {"message": "Comment does not exist"},
+                        status=status.HTTP_404_NOT_FOUND,
+                    )
+                post_id = parent.post_id
+                comments = Comment.objects.filter(replies=parent, is_deleted=False)
+            else:
+                post_id = request.query_params["id"]
+                comments = Comment.objects.filter(
+                    post_id=post_id, replies__isnull=True, is_deleted=False
+                )
+
+            post = optimize_queryset(
+                Post.objects.filter(id=post_id, is_deleted=False), PostSerializer
+            ).first()
+            if post is None:
+                return Response(
+                    {"message": "Post does not exist"},
+                    status=status.HTTP_404_NOT_FOUND,
+                )
+
+            page = self.paginate_queryset(comments)
+            visible = build_comment_tree(page)
+            serialized = {
+                data["id"]: data
+                for data in self.get_serializer(visible, many=True).data
+            }
+            response = self.get_paginated_response(nest_comment_data(page, serialized))
+            response.data["post"] = PostSerializer(
+                post, context={"request": request}
+            ).data
+            return response
+
+        except KeyError:
+            return Response(
+                {"message": "Missing 'id' or 'comment' query parameter"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except (ValueError, ValidationError) as e:
+            return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        except Exception as e:
+            return Response(
+                {"message": "Something went wrong. Please try again."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
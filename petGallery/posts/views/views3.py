@@ -0,0 +1,251 @@
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from django.db.models import Q
+from rest_framework import generics, status
+from rest_framework.response import Response
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from common.direct_uploads import DirectUploadError, complete_upload, presign_upload
+from posts.models import Image, Post, UploadSession
+from posts.serializers import ImageSerializer, UploadSessionSerializer
+from posts.uploads import (
+    UploadError,
+    append_chunk,
+    create_session,
+    discard_session,
+    parse_content_range,
+)
+from posts.visibility import visible_posts
+from users.models import Account
+from utils.media_serving import check_media_name, serve_media
+
+
+class UploadSessionView(generics.GenericAPIView):
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        """
+        This route starts a resumable upload of one post image, the image is then sent in chunks to /api/posts/uploads/<id>/.
+        data = {
+            "filename": "name of the image file",
+            "size": size of the whole file in bytes
+        }
+        """
+        try:
+            size = int(request.data["size"])
+            if not 0 < size <= settings.UPLOAD_MAX_FILE_SIZE:
+                return Response(
+                    {
+                        "message": f"Files must be between 1 and {settings.UPLOAD_MAX_FILE_SIZE} bytes"
+                    },
+                    status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                )
+            session = create_session(request.user, request.data["filename"], size)
+            serializer = UploadSessionSerializer(session)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        except (KeyError, ValueError, TypeError):
+            return Response(
+                {"message": "filename and size are required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except Exception as e:
+            return Response(
+                {"message": "Something went wrong. Please try again."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class UploadSessionDetailView(generics.GenericAPIView):
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, upload_id, *args, **kwargs):
+        """
+        This route returns the state of an upload, `offset` is where the next chunk has to start when resuming.
+        """
+        try:
+            session = UploadSession.objects.get(id=upload_id, user=request.user)
+            serializer = UploadSessionSerializer(session)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+        except UploadSession.DoesNotExist:
+            return Response(
+                {"message": "Upload not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            return Response(
+                {"message": "Something went wrong. Please try again."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+    def patch(self, request, upload_id, *args, **kwargs):
+        """
+        This route appends a chunk to an upload, the raw bytes are the request body.
+        headers:
+        Content-Range - "bytes start-end/size" - start must be the current offset of the upload
+        Once the last chunk is received the upload is complete and its id can be passed as `uploads` when creating a post.
+        """
+        try:
+            start, length, total = parse_content_range(
+                request.META.get("HTTP_CONTENT_RANGE")
+            )
+            if length != int(request.META.get("CONTENT_LENGTH") or 0):
+                raise UploadError("Content-Length does not match Content-Range", 400)
+            with transaction.atomic():
+                # one chunk at a time per upload
+                session = (
+                    UploadSession.objects.select_for_update()
+                    .filter(id=upload_id, user=request.user)
+                    .first()
+                )
+                if session is None:
+                    return Response(
+                        {"message": "Upload not found"},
+                        status=status.HTTP_404_NOT_FOUND,
+                    )
+                if total != session.size:
+                    raise UploadError("Content-Range size does not match upload", 400)
+                # the body is read straight from the request, not through the parsers
+                append_chunk(session, request._request, start, length)
+            serializer = UploadSessionSerializer(session)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+        except UploadError as e:
+            session = UploadSession.objects.filter(
+                id=upload_id, user=request.user
+            ).first()
+            if session is not None and e.discard:
+                discard_session(session)
+                session = None
+            return Response(
+                {
+                    "message": e.message,
+                    "offset": session.offset if session is not None else None,
+                },
+                status=e.status_code,
+            )
+        except Exception as e:
+            return Response(
+                {"message": "Something went wrong. Please try again."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class PresignedImageUploadView(generics.GenericAPIView):
+    serializer_class = ImageSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        """
+        This route returns a URL to upload one post image to directly (PUT with the returned headers), without sending it through the API.
+        data = {
+            "size": size of the file in bytes,
+            "sha256": "hex SHA-256 digest of the file",
+            "content_type": "image/jpeg" | "image/png" | "image/gif" | "image/webp"
+        }
+        Once uploaded, the returned token is sent to /api/posts/uploads/presigned/complete/.
+        """
+        try:
+            upload = presign_upload(
+                request.user,
+                Image._meta.get_field("image"),
+                request.data["size"],
+                request.data["sha256"],
+                request.data["content_type"],
+            )
+            return Response(upload, status=status.HTTP_201_CREATED)
+        except DirectUploadError as e:
+            return Response({"message": e.message}, status=e.status_code)
+        except (KeyError, ValueError, TypeError):
+            return Response(
+                {"message": "size, sha256 and content_type are required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except Exception as e:
+            return Response(
+                {"message": "Something went wrong. Please try again."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class PresignedImageCompleteView(generics.GenericAPIView):
+    serializer_class = ImageSerializer
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        """
+        This route adds an image uploaded to a presigned URL to one of the pet(user)'s posts.
+        data = {
+            "post": post id,
+            "token": "token returned with the upload URL"
+        }
+        """
+        try:
+            post = Post.objects.filter(
+                pk=request.data["post"], user=request.user
+            ).first()
+            if post is None:
+                return Response(
+                    {"message": "Post not found"}, status=status.HTTP_404_NOT_FOUND
+                )
+            with transaction.atomic():
+                name = complete_upload(
+                    request.user,
+                    Image._meta.get_field("image"),
+                    request.data["token"],
+                )
+                image = Image.objects.create(post=post, image=name)
+            serializer = ImageSerializer(image, context={"request": request})
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        except DirectUploadError as e:
+            return Response({"message": e.message}, status=e.status_code)
+        except (KeyError, ValueError, TypeError):
+            return Response(
+                {"message": "post and token are required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except Exception as e:
+            return Response(
+                {"message": "Something went wrong. Please try again."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class MediaView(generics.GenericAPIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request, name, *args, **kwargs):
+        """
+        This route serves uploaded media. Post images (and their resized copies) are only sent to pet(users) allowed to see one of the posts using them, profile photos are public.
+        Access follows the rows referencing the file, not its path: deduplicated files are shared across fields, see common.blobs.
+        """
+        try:
+            # authorize the name that is stored and served, not a spelling of it
+            check_media_name(name)
+            avatar_field = Account._meta.get_field("avatar")
+            public = (
+                name == avatar_field.default
+                or Account.objects.filter(avatar=name).exists()
+            )
+            if not public:
+                posts = Post.objects.filter(
+                    Q(images__image=name) | Q(images__derivatives__file=name)
+                )
+                if not visible_posts(request.user).filter(pk__in=posts).exists():
+                    return Response(
+                        {"message": "File not found"}, status=status.HTTP_404_NOT_FOUND
+                    )
+                public = (
+                    not request.user.is_authenticated
+                    or visible_posts(AnonymousUser()).filter(pk__in=posts).exists()
+                )
+            return serve_media(request, name, public)
+        except (FileNotFoundError, SuspiciousFileOperation):
+            return Response(
+                {"message": "File not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            return Response(
+                {"message": "Something went wrong. Please try again."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
@@ -0,0 +1,33 @@
+from django.db.models import Q
+
+from posts.models import Post
+from users.models import BlockAccount
+
+
+def visible_posts(user):
+    """
+    Posts `user` may see: their own, and the published posts of accounts that are
+    public or followed by them, unless either account blocked the other.
+    """
+    published = Q(is_deleted=False, is_archived=False)
+    if not user.is_authenticated:
+        return Post.objects.filter(published, user__account__private=False)
+
+    blocked_user_ids = BlockAccount.objects.filter(
+        user__user=user, users__isnull=False
+    ).values("users__user_id")
+    blocked_by_user_ids = BlockAccount.objects.filter(users__user=user).values(
+        "user__user_id"
+    )
+    return Post.objects.filter(
+        Q(user=user)
+        | (
+            published
+            & (
+                Q(user__account__private=False)
+                | Q(user__account__followers__follower__user=user)
+            )
+            & ~Q(user_id__in=blocked_user_ids)
+            & ~Q(user_id__in=blocked_by_user_ids)
+        )
+    )
@@ -0,0 +1,101 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import Count, F, FloatField, Q, Sum
+from django.db.models.functions import Cast
+
+from posts.models import Post
+from search.models import PostSearchTerm
+
+TERM_PATTERN = re.compile(r"\w+")
+# field weights of the fallback index, mirroring the A/B weights of the vector
+FIELD_WEIGHTS = {"caption": 2, "location": 1}
+
+
+def uses_search_vector(using="default"):
+    return connections[using].vendor == "postgresql"
+
+
+def get_search_vector():
+    config = settings.SEARCH_TEXT_CONFIG
+    return SearchVector("caption", weight="A", config=config) + SearchVector(
+        "location", weight="B", config=config
+    )
+
+
+def tokenize(text):
+    return [
+        term
+        for term in TERM_PATTERN.findall((text or "").lower())
+        if 1 < len(term) <= PostSearchTerm._meta.get_field("term").max_length
+    ]
+
+
+def update_post_search_index(post_ids):
+    """
+    Recompute the search vector (or fallback index terms) of the given posts.
+    """
+    posts = Post.objects.filter(pk__in=post_ids)
+    if uses_search_vector(posts.db):
+        posts.update(search_vector=get_search_vector())
+        return
+
+    PostSearchTerm.objects.filter(post_id__in=post_ids).delete()
+    terms = []
+    for post_id, caption, location in posts.values_list("id", "caption", "location"):
+        weights = {}
+        for field, text in (("caption", caption), ("location", location)):
+            for term in tokenize(text):
+                weights[term] = weights.get(term, 0) + FIELD_WEIGHTS[field]
+        terms += [
+            PostSearchTerm(post_id=post_id, term=term, weight=weight)
+            for term, weight in weights.items()
+        ]
+    PostSearchTerm.objects.bulk_create(terms, batch_size=1000)
+
+
+def rebuild_post_search_index(batch_size=1000):
+    """
+    Reindex every post, returns the number of posts indexed.
+    """
+    post_ids = Post.objects.order_by("id").values_list("id", flat=True)
+    count = 0
+    batch = []
+    for post_id in post_ids.iterator():
+        batch.append(post_id)
+        if len(batch) == batch_size:
+            update_post_search_index(batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        update_post_search_index(batch)
+        count += len(batch)
+    return count
+
+
+def search_posts(text):
+    """
+    Public, live posts matching every word of `text`, annotated with a float `rank`.
+    """
+    posts = Post.objects.filter(
+        is_deleted=False, is_archived=False, user__account__private=False
+    )
+    if uses_search_vector(posts.db):
+        query = SearchQuery(
+            text, search_type="websearch", config=settings.SEARCH_TEXT_CONFIG
+        )
+        # ts_rank returns a float4, cast it so keyset cursors compare exactly
+        return posts.filter(search_vector=query).annotate(
+            rank=Cast(SearchRank(F("search_vector"), query), FloatField())
+        )
+
+    terms = set(tokenize(text))
+    if not terms:
+        return posts.none()
+    matched = Q(search_terms__term__in=terms)
+    return posts.annotate(
+        matched_terms=Count("search_terms", filter=matched),
+        rank=Cast(Sum("search_terms__weight", filter=matched), FloatField()),
+    ).filter(matched_terms=len(terms))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from search.trending import prune_hashtag_activity
+
+
+class Command(BaseCommand):
+    help = "Delete hashtag activity older than the longest trending window."
+
+    def handle(self, *args, **options):
+        deleted = prune_hashtag_activity()
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {deleted} hashtag activity buckets")
+        )
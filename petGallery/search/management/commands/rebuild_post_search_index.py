@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from search.fulltext import rebuild_post_search_index
+
+
+class Command(BaseCommand):
+    help = "Recompute the caption and location search index of every post."
+
+    def handle(self, *args, **options):
+        count = rebuild_post_search_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} posts"))
@@ -0,0 +1,51 @@
+# Generated by Django 5.0.3 on 2026-10-18 16:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("posts", "0019_hashtag_hashtag_name_prefix_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HashtagActivity",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bucket", models.DateTimeField(verbose_name="Hour")),
+                ("count", models.PositiveIntegerField(default=0, verbose_name="Uses")),
+                (
+                    "hashtag",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="activity",
+                        to="posts.hashtag",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["bucket"], name="hashtag_activity_bucket_idx")
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="hashtagactivity",
+            constraint=models.UniqueConstraint(
+                fields=("hashtag", "bucket"), name="unique_hashtag_activity"
+            ),
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.db import DatabaseError, migrations, transaction
+
+TRIGRAM_INDEXES = {
+    "hashtag_name_trgm_idx": ("posts_hashtag", "name"),
+    "username_trgm_idx": ("users_customuser", "username"),
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """
+    Enable pg_trgm and index hashtags and usernames for fuzzy search. Creating the
+    extension needs extra privileges on some servers, when it is not available the
+    search falls back to prefix matches only (see search.queries.trigram_available).
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            with transaction.atomic(using=schema_editor.connection.alias):
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except DatabaseError:
+            return
+        for name, (table, column) in TRIGRAM_INDEXES.items():
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {name} ON {table} "
+                f"USING gin ({column} gin_trgm_ops)"
+            )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for name in TRIGRAM_INDEXES:
+            cursor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0001_initial"),
+        ("users", "0031_customuser_username_prefix_idx"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
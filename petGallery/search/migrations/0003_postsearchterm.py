@@ -0,0 +1,48 @@
+# Generated by Django 5.0.3 on 2026-10-18 16:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0020_post_search_vector"),
+        ("search", "0002_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PostSearchTerm",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("term", models.CharField(max_length=100, verbose_name="Term")),
+                (
+                    "weight",
+                    models.PositiveIntegerField(default=1, verbose_name="Weight"),
+                ),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_terms",
+                        to="posts.post",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="postsearchterm",
+            constraint=models.UniqueConstraint(
+                fields=("term", "post"), name="unique_post_term"
+            ),
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def create_search_vector_index(apps, schema_editor):
+    """
+    Index Post.search_vector and fill it for existing posts. Other databases use the
+    PostSearchTerm table, filled with `manage.py rebuild_post_search_index`.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS post_search_vector_idx "
+            "ON posts_post USING gin (search_vector)"
+        )
+        cursor.execute(
+            "UPDATE posts_post SET search_vector = "
+            "setweight(to_tsvector(%s::regconfig, COALESCE(caption, '')), 'A') || "
+            "setweight(to_tsvector(%s::regconfig, COALESCE(location, '')), 'B')",
+            [settings.SEARCH_TEXT_CONFIG, settings.SEARCH_TEXT_CONFIG],
+        )
+
+
+def drop_search_vector_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DROP INDEX IF EXISTS post_search_vector_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0003_postsearchterm"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_vector_index, drop_search_vector_index),
+    ]
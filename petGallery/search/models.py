@@ -1,3 +1,42 @@
 from django.db import models
+from django.utils.translation import gettext_lazy as _
+from posts.models import Hashtag, Post
 
-# Create your models here.
+
+class HashtagActivity(models.Model):
+    """
+    Number of times a hashtag was added to posts during one hour. Trending hashtags
+    are ranked by summing the buckets inside a time window.
+    """
+
+    hashtag = models.ForeignKey(
+        Hashtag, on_delete=models.CASCADE, related_name="activity"
+    )
+    bucket = models.DateTimeField(_("Hour"))
+    count = models.PositiveIntegerField(_("Uses"), default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["hashtag", "bucket"], name="unique_hashtag_activity"
+            )
+        ]
+        indexes = [models.Index(fields=["bucket"], name="hashtag_activity_bucket_idx")]
+
+
+class PostSearchTerm(models.Model):
+    """
+    Inverted index of post captions and locations for databases without full-text
+    search (e.g. SQLite test runs). On PostgreSQL `Post.search_vector` is used instead.
+    """
+
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="search_terms"
+    )
+    term = models.CharField(_("Term"), max_length=100)
+    weight = models.PositiveIntegerField(_("Weight"), default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["term", "post"], name="unique_post_term")
+        ]
@@ -0,0 +1,77 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connections
+from django.db.models.functions import Collate, Upper
+
+from posts.models import Hashtag
+from users.models import CustomUser
+
+
+@lru_cache(maxsize=None)
+def trigram_available(using="default"):
+    """
+    Whether the pg_trgm extension is installed, see search/migrations/0002.
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def prefix_search(queryset, field, term, limit):
+    """
+    Case-insensitive `field` prefix matches in alphabetical order. The expression
+    matches the `Collate(Upper(field), "C")` indexes, which serve both the range
+    scan and the ordering, so only `limit` index entries are read.
+    """
+    queryset = queryset.annotate(search_key=Collate(Upper(field), "C"))
+    return list(
+        queryset.filter(search_key__startswith=term.upper()).order_by("search_key")[
+            :limit
+        ]
+    )
+
+
+def fuzzy_search(queryset, field, term, limit, exclude_ids=()):
+    """
+    Trigram matches for misspelled terms, most similar first. Empty when pg_trgm is
+    not installed.
+    """
+    if not trigram_available(queryset.db):
+        return []
+    return list(
+        queryset.filter(**{f"{field}__trigram_similar": term})
+        .exclude(id__in=exclude_ids)
+        .annotate(similarity=TrigramSimilarity(field, term))
+        .order_by("-similarity", "id")[:limit]
+    )
+
+
+def typeahead(queryset, field, term, limit=None):
+    """
+    Prefix matches, topped up with fuzzy matches when there are fewer than `limit`.
+    """
+    if limit is None:
+        limit = settings.SEARCH_RESULTS_LIMIT
+    results = prefix_search(queryset, field, term, limit)
+    if len(results) < limit and len(term) >= settings.SEARCH_FUZZY_MIN_LENGTH:
+        results += fuzzy_search(
+            queryset,
+            field,
+            term,
+            limit - len(results),
+            exclude_ids=[result.id for result in results],
+        )
+    return results
+
+
+def search_hashtags(term, limit=None):
+    return typeahead(Hashtag.objects.all(), "name", term, limit)
+
+
+def search_users(term, limit=None):
+    return typeahead(CustomUser.objects.filter(is_active=True), "username", term, limit)
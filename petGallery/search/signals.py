@@ -0,0 +1,26 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save
+from django.dispatch import receiver
+from posts.models import Post
+from search.fulltext import update_post_search_index
+from search.trending import record_hashtag_uses
+
+
+@receiver(m2m_changed, sender=Post.hashtags.through)
+def record_hashtag_uses_after_tagging(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if action != "post_add" or not pk_set:
+        return
+    # pk_set holds the hashtags added to a post, or the posts added to a hashtag
+    hashtag_ids = [instance.pk] * len(pk_set) if reverse else list(pk_set)
+    # counted after commit so hot hashtag rows are not locked for the whole request
+    transaction.on_commit(lambda: record_hashtag_uses(hashtag_ids))
+
+
+@receiver(post_save, sender=Post)
+def update_search_index_after_post_saved(
+    sender, instance, created, update_fields, **kwargs
+):
+    if created or update_fields is None or {"caption", "location"} & set(update_fields):
+        update_post_search_index([instance.pk])
@@ -1,3 +1,103 @@
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from posts.models import Hashtag, Post
+from search.models import HashtagActivity
+from users.models import Account, CustomUser
+
+
+class SearchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username="Searcher", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.get(pk=self.user.pk))
+
+    def test_prefix_search_is_case_insensitive_and_ordered(self):
+        for name in ["corgi", "Cats", "catnap", "dogs"]:
+            Hashtag.objects.create(name=name)
+        response = self.client.get("/api/search/?q=%23CAT")
+        self.assertEqual(
+            [hashtag["name"] for hashtag in response.data["hashtags"]],
+            ["catnap", "Cats"],
+        )
+        response = self.client.get("/api/search/?q=sea&type=users")
+        self.assertEqual(response.data["users"][0]["username"], "Searcher")
+        self.assertNotIn("hashtags", response.data)
+
+    def test_trending_counts_hashtags_added_to_posts(self):
+        cats, dogs = Hashtag.objects.create(name="cats"), Hashtag.objects.create(
+            name="dogs"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(3):
+                post = Post.objects.create(user=self.user, caption=str(index))
+                post.hashtags.add(cats)
+            post.hashtags.add(dogs)
+            # re-setting the same hashtags counts nothing new
+            post.hashtags.set([cats, dogs])
+
+        self.assertEqual(HashtagActivity.objects.get(hashtag=cats).count, 3)
+        response = self.client.get("/api/search/trending/?window=1h")
+        self.assertEqual(
+            [
+                (hashtag["name"], hashtag["uses"])
+                for hashtag in response.data["results"]
+            ],
+            [("cats", 3), ("dogs", 1)],
+        )
+        response = self.client.get("/api/search/trending/?window=2h")
+        self.assertEqual(response.status_code, 400)
+
+
+class PostSearchTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username="writer", password="pw")
+        Account.objects.create(
+            user=self.user,
+            name="writer",
+            bio="bio",
+            age=2,
+            gender="MALE",
+            animal="DOG",
+            breed="Corgi",
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.get(pk=self.user.pk))
+
+    def create_posts(self):
+        best = Post.objects.create(
+            user=self.user, caption="Corgi puppy at the beach", location="Corgi beach"
+        )
+        good = Post.objects.create(
+            user=self.user, caption="Sleepy corgi", location="Beach house"
+        )
+        Post.objects.create(user=self.user, caption="corgi at home", location="Lagos")
+        Post.objects.create(
+            user=self.user, caption="corgi beach", location="", is_archived=True
+        )
+        return best, good
+
+    def search_all_pages(self, text):
+        ids, url = [], f"/api/search/posts/?q={text}&page_size=1"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [post["id"] for post in response.data["results"]]
+            url = response.data["next"]
+        return ids
+
+    def test_search_ranks_and_pages_matching_posts(self):
+        best, good = self.create_posts()
+        self.assertEqual(self.search_all_pages("corgi beach"), [best.id, good.id])
 
-# Create your tests here.
+    def test_inverted_index_fallback(self):
+        with mock.patch("search.fulltext.uses_search_vector", return_value=False):
+            best, good = self.create_posts()
+            self.assertEqual(self.search_all_pages("corgi beach"), [best.id, good.id])
+            best.caption = "A cat"
+            best.save(update_fields=["caption", "location", "updated_at"])
+            self.assertEqual(self.search_all_pages("corgi beach"), [good.id, best.id])
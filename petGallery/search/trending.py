@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from search.models import HashtagActivity
+
+TRENDING_CACHE_KEY = "search:trending:{}"
+
+
+def current_bucket(now=None):
+    return (now or timezone.now()).replace(minute=0, second=0, microsecond=0)
+
+
+def record_hashtag_uses(hashtag_ids, now=None):
+    """
+    Add one use per id in `hashtag_ids` (ids may repeat) to the current hour bucket.
+    """
+    bucket = current_bucket(now)
+    uses = {}
+    for hashtag_id in hashtag_ids:
+        uses[hashtag_id] = uses.get(hashtag_id, 0) + 1
+
+    for hashtag_id, count in uses.items():
+        activity = HashtagActivity.objects.filter(hashtag_id=hashtag_id, bucket=bucket)
+        if activity.update(count=F("count") + count):
+            continue
+        try:
+            with transaction.atomic():
+                HashtagActivity.objects.create(
+                    hashtag_id=hashtag_id, bucket=bucket, count=count
+                )
+        except IntegrityError:
+            # created concurrently
+            activity.update(count=F("count") + count)
+
+
+def trending_hashtags(window, limit=None):
+    """
+    Most used hashtags over the last `window` (a key of `TRENDING_WINDOWS`), as
+    dicts of id, name and uses. Results are cached for `TRENDING_CACHE_TIMEOUT`.
+    """
+    if limit is None:
+        limit = settings.TRENDING_RESULTS_LIMIT
+    cache_key = TRENDING_CACHE_KEY.format(window)
+    trending = cache.get(cache_key)
+    if trending is None:
+        since = current_bucket() - timedelta(
+            hours=settings.TRENDING_WINDOWS[window] - 1
+        )
+        trending = list(
+            HashtagActivity.objects.filter(bucket__gte=since)
+            .values("hashtag_id", "hashtag__name")
+            .annotate(uses=Sum("count"))
+            .order_by("-uses", "hashtag_id")[: settings.TRENDING_RESULTS_LIMIT]
+        )
+        trending = [
+            {"id": row["hashtag_id"], "name": row["hashtag__name"], "uses": row["uses"]}
+            for row in trending
+        ]
+        cache.set(cache_key, trending, settings.TRENDING_CACHE_TIMEOUT)
+    return trending[:limit]
+
+
+def prune_hashtag_activity():
+    """
+    Delete buckets older than the longest trending window.
+    """
+    hours = max(settings.TRENDING_WINDOWS.values())
+    deleted, _ = HashtagActivity.objects.filter(
+        bucket__lt=current_bucket() - timedelta(hours=hours)
+    ).delete()
+    return deleted
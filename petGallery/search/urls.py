@@ -0,0 +1,10 @@
+from django.urls import path
+
+from search.views import SearchView, TrendingHashtagsView, PostSearchView
+
+
+urlpatterns = [
+    path("", SearchView.as_view()),
+    path("trending/", TrendingHashtagsView.as_view()),
+    path("posts/", PostSearchView.as_view()),
+]
@@ -1,3 +1,94 @@
-from django.shortcuts import render
+from django.conf import settings
+from rest_framework import generics, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from posts.models import Post
+from posts.serializers import HashtagSerializer, PostSerializer
+from users.serializers import UserInfoSerializer
+from search.fulltext import search_posts
+from search.queries import search_hashtags, search_users
+from search.trending import trending_hashtags
 
-# Create your views here.
+
+class SearchView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        """
+        This route is for typeahead search over hashtags and pets(users), prefix matches first then similar spellings
+        ?q=term&type=hashtags|users (both when type is not given)
+        """
+        term = request.query_params.get("q", "").strip().lstrip("#@")
+        search_type = request.query_params.get("type")
+        if not term:
+            return Response(
+                {"message": "Missing 'q' query parameter"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if search_type not in (None, "hashtags", "users"):
+            return Response(
+                {"message": "type must be 'hashtags' or 'users'"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        data = {}
+        if search_type in (None, "hashtags"):
+            data["hashtags"] = HashtagSerializer(search_hashtags(term), many=True).data
+        if search_type in (None, "users"):
+            data["users"] = UserInfoSerializer(search_users(term), many=True).data
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class TrendingHashtagsView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        """
+        This route is for getting the most used hashtags over a sliding window
+        ?window=1h|24h|7d (24h by default)
+        """
+        window = request.query_params.get("window", "24h")
+        if window not in settings.TRENDING_WINDOWS:
+            return Response(
+                {
+                    "message": "window must be one of "
+                    + ", ".join(settings.TRENDING_WINDOWS)
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(
+            {"window": window, "results": trending_hashtags(window)},
+            status=status.HTTP_200_OK,
+        )
+
+
+class PostSearchView(generics.ListAPIView):
+    queryset = Post.objects.all()
+    serializer_class = PostSerializer
+    permission_classes = [IsAuthenticated]
+    keyset_ordering = ("-rank", "-id")
+
+    def get(self, request, *args, **kwargs):
+        """
+        This route is for searching post captions and locations, best matches first
+        ?q=words to search for
+        """
+        try:
+            text = request.query_params.get("q", "").strip()
+            if not text:
+                return Response(
+                    {"message": "Missing 'q' query parameter"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            page = self.paginate_queryset(search_posts(text))
+            serializer = PostSerializer(page, many=True, context={"request": request})
+            return self.get_paginated_response(serializer.data)
+        except ValidationError as e:
+            return Response({"message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        except Exception as e:
+            return Response(
+                {"message": "Something went wrong. Please try again."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
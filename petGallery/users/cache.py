@@ -0,0 +1,121 @@
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from users.models import FollowAccount
+
+FOLLOW_COUNTS_KEY = "account:{}:follow_counts:{}"
+FOLLOW_COUNTS_VERSION_KEY = "account:{}:follow_counts_version"
+FOLLOW_COUNTS_HITS_KEY = "account:follow_counts:hits"
+FOLLOW_COUNTS_MISSES_KEY = "account:follow_counts:misses"
+
+
+def count_by(field, account_ids):
+    return dict(
+        FollowAccount.objects.filter(**{f"{field}__in": account_ids})
+        .values(field)
+        .annotate(total=Count("id"))
+        .values_list(field, "total")
+    )
+
+
+def get_versions(account_ids):
+    """
+    Return the current cache version of each account's follow counts, starting a
+    new one for accounts without.
+    """
+    keys = {
+        FOLLOW_COUNTS_VERSION_KEY.format(account_id): account_id
+        for account_id in account_ids
+    }
+    versions = cache.get_many(keys.keys())
+    for key in keys.keys() - versions.keys():
+        # add() keeps a version started by a concurrent reader
+        cache.add(key, uuid4().hex, settings.FOLLOW_COUNTS_CACHE_TIMEOUT)
+        versions[key] = cache.get(key)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def get_follow_counts(account_ids):
+    """
+    Return `{account_id: (followers, following)}` for the given accounts, reading
+    through the cache. Accounts missing from the cache are counted with one grouped
+    query per direction and written back.
+
+    Counts are cached under the version current when they were read, so counts
+    written back after a concurrent follow change (see invalidate_follow_counts)
+    land under a dropped version and are never read.
+    """
+    account_ids = set(account_ids)
+    if not account_ids:
+        return {}
+    keys = {
+        FOLLOW_COUNTS_KEY.format(account_id, version): account_id
+        for account_id, version in get_versions(account_ids).items()
+    }
+    cached = cache.get_many(keys.keys())
+    counts = {keys[key]: tuple(value) for key, value in cached.items()}
+
+    missing = account_ids - counts.keys()
+    if missing:
+        followers = count_by("following_id", missing)
+        following = count_by("follower_id", missing)
+        fetched = {
+            account_id: (followers.get(account_id, 0), following.get(account_id, 0))
+            for account_id in missing
+        }
+        cache.set_many(
+            {
+                key: fetched[account_id]
+                for key, account_id in keys.items()
+                if account_id in missing
+            },
+            settings.FOLLOW_COUNTS_CACHE_TIMEOUT,
+        )
+        counts.update(fetched)
+
+    record_lookups(hits=len(cached), misses=len(missing))
+    return counts
+
+
+def invalidate_follow_counts(*account_ids):
+    # readers start a new version, orphaning counts cached under the old one
+    cache.delete_many(
+        [FOLLOW_COUNTS_VERSION_KEY.format(account_id) for account_id in account_ids]
+    )
+
+
+def record_lookups(hits, misses):
+    for key, amount in (
+        (FOLLOW_COUNTS_HITS_KEY, hits),
+        (FOLLOW_COUNTS_MISSES_KEY, misses),
+    ):
+        if not amount:
+            continue
+        # add() is a no-op when the key exists, incr() then bumps it atomically
+        cache.add(key, 0, timeout=None)
+        try:
+            cache.incr(key, amount)
+        except ValueError:
+            # evicted between add() and incr()
+            cache.set(key, amount, timeout=None)
+
+
+def get_follow_counts_stats():
+    """
+    Return the number of cache hits and misses for follow counts and the hit ratio.
+    """
+    hits = cache.get(FOLLOW_COUNTS_HITS_KEY, 0)
+    misses = cache.get(FOLLOW_COUNTS_MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / lookups if lookups else None,
+    }
+
+
+def reset_follow_counts_stats():
+    cache.delete_many([FOLLOW_COUNTS_HITS_KEY, FOLLOW_COUNTS_MISSES_KEY])
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from users.cache import get_follow_counts_stats, reset_follow_counts_stats
+
+
+class Command(BaseCommand):
+    help = "Show the hit ratio of the cached follower/following counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset", action="store_true", help="Reset the counters afterwards."
+        )
+
+    def handle(self, *args, **options):
+        stats = get_follow_counts_stats()
+        ratio = stats["hit_ratio"]
+        ratio = "n/a" if ratio is None else f"{ratio:.1%}"
+        self.stdout.write(
+            f"hits: {stats['hits']}, misses: {stats['misses']}, hit ratio: {ratio}"
+        )
+        if options["reset"]:
+            reset_follow_counts_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset"))
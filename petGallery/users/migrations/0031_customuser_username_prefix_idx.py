@@ -0,0 +1,25 @@
+# Generated by Django 5.0.3 on 2026-10-18 16:09
+
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("users", "0030_rename_image_account_avatar_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="customuser",
+            index=models.Index(
+                django.db.models.functions.comparison.Collate(
+                    django.db.models.functions.text.Upper("username"), "C"
+                ),
+                name="username_prefix_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.3 on 2026-10-18 16:14
+
+import common.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0031_customuser_username_prefix_idx"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="account",
+            name="avatar",
+            field=common.fields.ContentAddressedImageField(
+                default="default.png",
+                upload_to="profile_photos",
+                verbose_name="Profile photo",
+            ),
+        ),
+    ]
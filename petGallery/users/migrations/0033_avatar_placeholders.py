@@ -0,0 +1,34 @@
+# Generated by Django 5.0.3 on 2026-10-18 16:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0032_alter_account_avatar"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="account",
+            name="avatar_height",
+            field=models.PositiveIntegerField(
+                blank=True, null=True, verbose_name="Profile photo height"
+            ),
+        ),
+        migrations.AddField(
+            model_name="account",
+            name="avatar_placeholder",
+            field=models.TextField(
+                blank=True, verbose_name="Profile photo placeholder"
+            ),
+        ),
+        migrations.AddField(
+            model_name="account",
+            name="avatar_width",
+            field=models.PositiveIntegerField(
+                blank=True, null=True, verbose_name="Profile photo width"
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.3 on 2026-10-18 17:05
+
+import common.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0033_avatar_placeholders"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="account",
+            name="avatar",
+            field=common.fields.ContentAddressedImageField(
+                db_index=True,
+                default="default.png",
+                upload_to="profile_photos",
+                verbose_name="Profile photo",
+            ),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Collate, Upper
 from django.utils.translation import gettext_lazy as _
 from datetime import datetime, date
 from django.contrib.auth.models import (
@@ -6,9 +7,9 @@ from django.contrib.auth.models import (
     BaseUserManager,
     PermissionsMixin,
 )
+from common.fields import ContentAddressedImageField
 from common.models import AbstractBaseModel
 
-
 GENDER_CHOICES = (("MALE", "Male"), ("FEMALE", "Female"), ("OTHER", "Other"))
 ANIMALS = (("DOG", "Dog"), ("CAT", "Cat"), ("PARROT", "Parrot"), ("OTHER", "Other"))
 SECURITY_QUESTIONS = (
@@ -68,6 +69,12 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
 
     USERNAME_FIELD = "username"
 
+    class Meta:
+        indexes = [
+            # serves case-insensitive prefix search in username order, see search.queries
+            models.Index(Collate(Upper("username"), "C"), name="username_prefix_idx")
+        ]
+
     def __str__(self):
         return self.username
 
@@ -82,9 +89,21 @@ class Account(AbstractBaseModel):
     breed = models.CharField(_("Breed"), max_length=50)
     private = models.BooleanField(_("Private account"), default=False)
     verified = models.BooleanField(_("Verified account"), default=False)
-    avatar = models.ImageField(
-        _("Profile photo"), upload_to="profile_photos", default="default.png"
+    # looked up by file name when serving media
+    avatar = ContentAddressedImageField(
+        _("Profile photo"),
+        upload_to="profile_photos",
+        default="default.png",
+        db_index=True,
+    )
+    # filled in by posts.media once the photo is processed
+    avatar_width = models.PositiveIntegerField(
+        _("Profile photo width"), null=True, blank=True
+    )
+    avatar_height = models.PositiveIntegerField(
+        _("Profile photo height"), null=True, blank=True
     )
+    avatar_placeholder = models.TextField(_("Profile photo placeholder"), blank=True)
 
     def __str__(self):
         return self.name
@@ -16,6 +16,8 @@ from rest_framework import status
 from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.dispatch import Signal
+from users.cache import get_follow_counts
+from utils.prefetch import PrefetchListSerializer
 
 # Define a signal
 my_signal = Signal()
@@ -118,6 +120,21 @@ class FollowersSerializer(serializers.ModelSerializer):
         fields = ["follower_id", "created_at", "updated_at"]
 
 
+class AccountInfoListSerializer(PrefetchListSerializer):
+    """
+    Looks up the follow counts of all listed accounts at once (see
+    get_follow_counts): batched cache reads of the versions and the counts, plus
+    two grouped COUNT queries and a cache write for accounts missing from it.
+    """
+
+    def to_representation(self, data):
+        instances = list(self.prefetch(data))
+        self.context.setdefault("follow_counts", {}).update(
+            get_follow_counts(account.id for account in instances)
+        )
+        return serializers.ListSerializer.to_representation(self, instances)
+
+
 class AccountInfoSerializer(serializers.ModelSerializer):
     user = UserInfoSerializer()
     following = serializers.SerializerMethodField()
@@ -134,24 +151,29 @@ class AccountInfoSerializer(serializers.ModelSerializer):
             "animal",
             "breed",
             "private",
+            "avatar",
+            "avatar_width",
+            "avatar_height",
+            "avatar_placeholder",
             "user",
             "followers",
             "following",
             "created_at",
             "updated_at",
         ]
+        list_serializer_class = AccountInfoListSerializer
+
+    def get_follow_counts(self, obj):
+        follow_counts = self.context.setdefault("follow_counts", {})
+        if obj.id not in follow_counts:
+            follow_counts.update(get_follow_counts([obj.id]))
+        return follow_counts[obj.id]
 
     def get_following(self, obj):
-        following_ids = FollowAccount.objects.filter(follower=obj).values_list(
-            "following_id", flat=True
-        )
-        return following_ids.count()
+        return self.get_follow_counts(obj)[1]
 
     def get_followers(self, obj):
-        followers_ids = FollowAccount.objects.filter(following=obj).values_list(
-            "follower_id", flat=True
-        )
-        return followers_ids.count()
+        return self.get_follow_counts(obj)[0]
 
 
 class AccountUpdateSerializer(serializers.ModelSerializer):
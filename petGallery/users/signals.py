@@ -1,6 +1,8 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from users.models import CustomUser
+from users.models import CustomUser, FollowAccount
+from users.cache import invalidate_follow_counts
 from posts.models import SavePost
 
 
@@ -8,3 +10,11 @@ from posts.models import SavePost
 def create_save_post_obj_after_user_registered(sender, instance, created, **kwargs):
     if created:
         SavePost.objects.create(user=instance)
+
+
+@receiver(post_save, sender=FollowAccount)
+@receiver(post_delete, sender=FollowAccount)
+def invalidate_follow_counts_after_follow_change(sender, instance, **kwargs):
+    # follow, unfollow, remove follower, block and accepted requests all end up here
+    follower_id, following_id = instance.follower_id, instance.following_id
+    transaction.on_commit(lambda: invalidate_follow_counts(follower_id, following_id))
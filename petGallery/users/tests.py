@@ -1,3 +1,67 @@
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from users.cache import count_by, get_follow_counts, get_follow_counts_stats
+from users.models import Account, CustomUser, FollowAccount
+
+
+def create_account(username):
+    user = CustomUser.objects.create_user(username=username, password="password")
+    return Account.objects.create(
+        user=user,
+        name=username,
+        bio="bio",
+        age=2,
+        gender="MALE",
+        animal="DOG",
+        breed="Corgi",
+    )
+
+
+class FollowCountsCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.account = create_account("pet")
+        self.others = [create_account(f"pet{index}") for index in range(5)]
+        for other in self.others:
+            FollowAccount.objects.create(follower=other, following=self.account)
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.get(pk=self.account.user_id))
+
+    def test_follow_list_reads_counts_from_cache(self):
+        # user, account, both account lists and one count query per direction
+        with self.assertNumQueries(8):
+            response = self.client.get("/api/users/account/follow/")
+        self.assertEqual(len(response.data["followers"]), 5)
+        self.assertEqual(response.data["followers"][0]["followers"], 0)
+        self.assertEqual(response.data["followers"][0]["following"], 1)
+
+        # the counts are cached now
+        with self.assertNumQueries(6):
+            self.client.get("/api/users/account/follow/")
+        self.assertEqual(get_follow_counts_stats()["hits"], 5)
+
+    def test_follow_changes_invalidate_counts(self):
+        self.assertEqual(get_follow_counts([self.account.id])[self.account.id], (5, 0))
+        with self.captureOnCommitCallbacks(execute=True):
+            FollowAccount.objects.filter(follower=self.others[0]).delete()
+            FollowAccount.objects.create(
+                follower=self.account, following=self.others[1]
+            )
+        self.assertEqual(get_follow_counts([self.account.id])[self.account.id], (4, 1))
+
+    def test_counts_read_before_a_change_are_not_cached_after_it(self):
+        def count_by_then_unfollow(field, account_ids):
+            counts = count_by(field, account_ids)
+            # the unfollow commits after the reader counted, before it writes back
+            with self.captureOnCommitCallbacks(execute=True):
+                FollowAccount.objects.filter(follower=self.others[0]).delete()
+            return counts
 
-# Create your tests here.
+        with mock.patch("users.cache.count_by", side_effect=count_by_then_unfollow):
+            counts = get_follow_counts([self.account.id])
+        self.assertEqual(counts[self.account.id], (5, 0))
+        self.assertEqual(get_follow_counts([self.account.id])[self.account.id], (4, 0))
@@ -12,6 +12,8 @@ from users.views.views2 import (
     BlockAccountView,
     FollowRequestView,
     FollowRequestSentView,
+    AvatarUploadView,
+    AvatarUploadCompleteView,
 )
 from django.urls import path
 
@@ -27,4 +29,6 @@ urlpatterns = [
     path("account/block/", BlockAccountView.as_view()),
     path("account/request/", FollowRequestView.as_view()),
     path("account/sent-request/", FollowRequestSentView.as_view()),
+    path("account/avatar/", AvatarUploadView.as_view()),
+    path("account/avatar/complete/", AvatarUploadCompleteView.as_view()),
 ]
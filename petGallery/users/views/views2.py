@@ -12,6 +12,7 @@ from users.serializers import (
     FollowRequestListSerializer,
 )
 from django.db import transaction
+from common.direct_uploads import DirectUploadError, complete_upload, presign_upload
 
 from rest_framework import generics, status
 from rest_framework.response import Response
@@ -332,3 +333,78 @@ class FollowRequestView(generics.GenericAPIView):
                 {"error": f"{request.data.get('username')} does not exist."},
                 status=status.HTTP_404_NOT_FOUND,
             )
+
+
+class AvatarUploadView(generics.GenericAPIView):
+    queryset = Account.objects.all()
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        """
+        This route returns a URL to upload a new profile photo to directly (PUT with the returned headers), without sending it through the API.
+        data = {
+            "size": size of the file in bytes,
+            "sha256": "hex SHA-256 digest of the file",
+            "content_type": "image/jpeg" | "image/png" | "image/gif" | "image/webp"
+        }
+        Once uploaded, the returned token is sent to /api/users/account/avatar/complete/.
+        """
+        try:
+            upload = presign_upload(
+                request.user,
+                Account._meta.get_field("avatar"),
+                request.data["size"],
+                request.data["sha256"],
+                request.data["content_type"],
+            )
+            return Response(upload, status=status.HTTP_201_CREATED)
+        except DirectUploadError as e:
+            return Response({"message": e.message}, status=e.status_code)
+        except (KeyError, ValueError, TypeError):
+            return Response(
+                {"message": "size, sha256 and content_type are required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except Exception as e:
+            logger.error(e)
+            return Response(
+                {"message": "Something went wrong. Please try again."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class AvatarUploadCompleteView(generics.GenericAPIView):
+    queryset = Account.objects.all()
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        """
+        This route makes an image uploaded to a presigned URL the pet(user)'s profile photo.
+        data = {
+            "token": "token returned with the upload URL"
+        }
+        """
+        try:
+            field = Account._meta.get_field("avatar")
+            with transaction.atomic():
+                account = Account.objects.select_for_update().get(user=request.user)
+                previous = account.avatar.name
+                account.avatar = complete_upload(
+                    request.user, field, request.data["token"]
+                )
+                account.save(update_fields=["avatar", "updated_at"])
+                if previous:
+                    field.release_on_commit(previous)
+            return Response({"avatar": account.avatar.url}, status=status.HTTP_200_OK)
+        except DirectUploadError as e:
+            return Response({"message": e.message}, status=e.status_code)
+        except KeyError:
+            return Response(
+                {"message": "token is required"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        except Exception as e:
+            logger.error(e)
+            return Response(
+                {"message": "Something went wrong. Please try again."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
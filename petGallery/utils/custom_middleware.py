@@ -44,7 +44,7 @@ class TokenAuthMiddleware(BaseMiddleware):
             raise e
         else:
             decoded_data = jwt_decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-            user = get_user(decoded_data=decoded_data)
+            user = await get_user(decoded_data=decoded_data)
 
             # Add the user to the scope
             scope["user"] = user
@@ -0,0 +1,128 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse,
+    HttpResponse,
+    HttpResponseNotModified,
+    StreamingHttpResponse,
+)
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header, size):
+    """
+    Return the (start, end) byte positions of a single `Range` header, None to send
+    the whole file (no header, or one this does not handle such as several
+    ranges), or False when the range cannot be satisfied.
+    """
+    match = RANGE_PATTERN.match(header or "")
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # the last `last` bytes
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def read_range(file, start, end):
+    try:
+        file.seek(start)
+        remaining = end - start + 1
+        while remaining:
+            data = file.read(min(CHUNK_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+    finally:
+        file.close()
+
+
+def serve_from_django(request, path):
+    """
+    Stream the file from the app server, with conditional and single range
+    requests. Only meant for development.
+    """
+    stat = os.stat(path)
+    if not was_modified_since(
+        request.META.get("HTTP_IF_MODIFIED_SINCE"), stat.st_mtime
+    ):
+        return HttpResponseNotModified()
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    byte_range = parse_range(request.META.get("HTTP_RANGE"), stat.st_size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{stat.st_size}"
+        return response
+    if byte_range is None:
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            read_range(open(path, "rb"), start, end),
+            status=206,
+            content_type=content_type,
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+        response["Content-Length"] = end - start + 1
+    response["Accept-Ranges"] = "bytes"
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    return response
+
+
+def check_media_name(name):
+    """
+    Raise SuspiciousFileOperation unless `name` is a storage name in canonical form:
+    relative, without empty, "." or ".." segments. Requests are authorized by the
+    name they ask for, so it must be the one the file is stored (and referenced) as.
+    """
+    segments = name.split("/")
+    if "\\" in name or any(segment in ("", ".", "..") for segment in segments):
+        raise SuspiciousFileOperation(f"Non-canonical media name {name!r}")
+
+
+def serve_media(request, name, public):
+    """
+    Respond with the media file `name` once the request was authorized. The bytes
+    are sent by the front proxy (`MEDIA_SERVING` "nginx" or "apache"), which also
+    handles conditional and range requests, or by Django itself ("django").
+    `public` files may be kept by shared caches.
+    """
+    check_media_name(name)
+    # raises SuspiciousFileOperation for names outside MEDIA_ROOT
+    path = safe_join(settings.MEDIA_ROOT, name)
+    if settings.MEDIA_SERVING == "nginx":
+        response = HttpResponse(content_type=mimetypes.guess_type(name)[0])
+        response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(
+            name
+        )
+    elif settings.MEDIA_SERVING == "apache":
+        response = HttpResponse(content_type=mimetypes.guess_type(name)[0])
+        response["X-Sendfile"] = path
+    else:
+        response = serve_from_django(request, path)
+
+    visibility = "public" if public else "private"
+    response["Cache-Control"] = f"{visibility}, max-age={settings.MEDIA_CACHE_MAX_AGE}"
+    if not public:
+        # the answer depends on who is asking
+        response["Vary"] = "Authorization, Cookie"
+    return response
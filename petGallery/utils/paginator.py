@@ -1,37 +1,173 @@
+import datetime
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from collections import OrderedDict
 
-from rest_framework.pagination import PageNumberPagination
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination, _positive_int
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
-class DefaultCustomPaginator(PageNumberPagination):
-    def get_paginated_response(self, data):
-        return Response(
-            OrderedDict(
-                [
-                    ("pageCount", self.page.paginator.num_pages),
-                    ("count", self.page.paginator.count),
-                    ("next", self.get_next_link()),
-                    ("previous", self.get_previous_link()),
-                    ("results", data),
-                ]
-            )
-        )
+class CursorEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # keep microseconds, DjangoJSONEncoder truncates them to milliseconds
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPaginator(BasePagination):
+    """
+    Keyset pagination over `ordering` (newest first by default).
 
+    Pages are read with a range filter on the ordering columns instead of an
+    OFFSET scan and no COUNT(*) is issued, so every page costs the same. Cursors
+    are opaque and carry the ordering values of the last (or first) item of the
+    current page. Views can override the ordering with a `keyset_ordering` attribute;
+    the last ordering field must be unique.
+    """
 
-class CustomPaginator(PageNumberPagination):
     page_size = 10
+    max_page_size = 100
     page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    ordering = ("-created_at", "-id")
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = getattr(view, "keyset_ordering", self.ordering)
+        self.page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        ordering = self.reverse_ordering() if reverse else self.ordering
+        try:
+            results = self.fetch(queryset, ordering, position, self.page_size + 1)
+        except (DjangoValidationError, TypeError, ValueError):
+            if position is None:
+                raise
+            # a cursor holding values of the wrong type
+            raise ValidationError(self.invalid_cursor_message)
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        return self.page
+
+    def fetch(self, queryset, ordering, position, limit):
+        """
+        Return the first `limit` items in `ordering` after `position` (if any).
+        """
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(ordering, position))
+        return list(queryset[:limit])
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def reverse_ordering(self):
+        return tuple(
+            field[1:] if field.startswith("-") else f"-{field}"
+            for field in self.ordering
+        )
+
+    def keyset_filter(self, ordering, position):
+        """
+        Filter the items after `position` in `ordering`, for `("-a", "-b")` this is
+        `a <= x AND (a < x OR (a = x AND b < y))`. The OR expansion stands in for
+        a `(a, b) < (x, y)` row comparison (which the ORM can't express), the
+        leading bound on `a` is what the planner uses as the index range condition.
+        """
+        keyset_filter = Q()
+        for index, field in enumerate(ordering):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            equal = {
+                previous.lstrip("-"): value
+                for previous, value in zip(ordering[:index], position)
+            }
+            keyset_filter |= Q(**equal, **{f"{name}__{lookup}": position[index]})
+        if len(ordering) > 1:
+            first = ordering[0]
+            bound = "lte" if first.startswith("-") else "gte"
+            keyset_filter &= Q(**{f"{first.lstrip('-')}__{bound}": position[0]})
+        return keyset_filter
+
+    def get_position(self, item):
+        position = []
+        for field in self.ordering:
+            name = field.lstrip("-")
+            position.append(
+                item[name] if isinstance(item, dict) else getattr(item, name)
+            )
+        return position
+
+    def encode_cursor(self, position, reverse=False):
+        payload = json.dumps({"p": position, "r": reverse}, cls=CursorEncoder)
+        cursor = urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, cursor
+        )
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            payload = json.loads(urlsafe_b64decode(cursor.encode("ascii")))
+            position = payload["p"]
+            if len(position) != len(self.ordering):
+                raise ValueError(cursor)
+            return position, bool(payload.get("r"))
+        except (TypeError, ValueError, KeyError):
+            raise ValidationError(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(
+                self.request.build_absolute_uri(), self.cursor_query_param
+            )
+        return self.encode_cursor(self.get_position(self.page[0]), reverse=True)
 
     def get_paginated_response(self, data):
         return Response(
             OrderedDict(
                 [
-                    ("pageCount", self.page.paginator.num_pages),
-                    ("count", self.page.paginator.count),
                     ("next", self.get_next_link()),
                     ("previous", self.get_previous_link()),
                     ("results", data),
                 ]
             )
         )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
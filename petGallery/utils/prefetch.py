@@ -0,0 +1,100 @@
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Manager, Prefetch, QuerySet, prefetch_related_objects
+from rest_framework import serializers
+
+
+@lru_cache(maxsize=None)
+def get_eager_loading_plan(serializer_class):
+    """
+    Work out the `select_related` paths and `prefetch_related` lookups needed to
+    serialize instances of `serializer_class` without per-row queries.
+    """
+    return collect_related_lookups(serializer_class())
+
+
+def collect_related_lookups(serializer, prefix=""):
+    model = serializer.Meta.model
+    select_related, prefetch_related = [], []
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == "*" or len(field.source_attrs) != 1:
+            continue
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            # serializer method fields and properties are not relations
+            continue
+        if not model_field.is_relation:
+            continue
+        path = prefix + field.source
+
+        if isinstance(field, serializers.ListSerializer):
+            child = field.child
+            if isinstance(child, serializers.ModelSerializer):
+                prefetch_related.append(
+                    (path, child.Meta.model, collect_related_lookups(child))
+                )
+        elif isinstance(field, serializers.ManyRelatedField):
+            prefetch_related.append((path, None, None))
+        elif isinstance(field, serializers.ModelSerializer):
+            if model_field.many_to_one or model_field.one_to_one:
+                nested_select, nested_prefetch = collect_related_lookups(
+                    field, prefix=f"{path}__"
+                )
+                select_related += [path, *nested_select]
+                prefetch_related += nested_prefetch
+
+    return tuple(select_related), tuple(prefetch_related)
+
+
+def build_lookups(plan):
+    select_related, prefetch_related = plan
+    lookups = []
+    for path, related_model, nested_plan in prefetch_related:
+        if nested_plan is None:
+            lookups.append(path)
+        else:
+            queryset = apply_plan(related_model._default_manager.all(), nested_plan)
+            lookups.append(Prefetch(path, queryset=queryset))
+    return lookups
+
+
+def apply_plan(queryset, plan):
+    select_related, _ = plan
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    return queryset.prefetch_related(*build_lookups(plan))
+
+
+def optimize_queryset(queryset, serializer_class):
+    """
+    Apply the eager loading needed by `serializer_class` to `queryset`.
+    """
+    return apply_plan(queryset, get_eager_loading_plan(serializer_class))
+
+
+class PrefetchListSerializer(serializers.ListSerializer):
+    """
+    List serializer that eager loads the relations its child serializer renders,
+    so a page costs a fixed number of queries however many items it holds.
+    """
+
+    def to_representation(self, data):
+        return super().to_representation(self.prefetch(data))
+
+    def prefetch(self, data):
+        plan = get_eager_loading_plan(type(self.child))
+        if isinstance(data, Manager):
+            data = data.all()
+
+        if isinstance(data, QuerySet):
+            # leave querysets that were already evaluated or prefetched alone
+            if data._result_cache is None:
+                data = apply_plan(data, plan)
+        else:
+            data = list(data)
+            select_related, _ = plan
+            prefetch_related_objects(data, *select_related, *build_lookups(plan))
+        return data
@@ -0,0 +1,134 @@
+import hashlib
+
+from django.conf import settings
+from django.core.files.uploadhandler import StopUpload, TemporaryFileUploadHandler
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+from rest_framework import status
+from rest_framework.response import Response
+
+# leading bytes of the formats posts.imaging can decode
+IMAGE_SIGNATURES = (
+    (0, b"\xff\xd8\xff"),  # JPEG
+    (0, b"\x89PNG\r\n\x1a\n"),
+    (0, b"GIF87a"),
+    (0, b"GIF89a"),
+    (8, b"WEBP"),  # RIFF....WEBP
+)
+HEADER_LENGTH = 12
+
+
+def is_image_header(header):
+    return any(
+        header[offset : offset + len(signature)] == signature
+        for offset, signature in IMAGE_SIGNATURES
+    )
+
+
+class BoundedImageUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams uploaded files to temporary files (never memory) while hashing them,
+    and stops reading the request as soon as it breaks a limit:
+
+    - the request is larger than `UPLOAD_MAX_REQUEST_SIZE` (checked against
+      Content-Length before any of the body is read, and while streaming)
+    - a file is larger than `UPLOAD_MAX_FILE_SIZE`
+    - there are more than `UPLOAD_MAX_FILES` files
+    - a file does not start with a JPEG, PNG, GIF or WebP header
+
+    The reason is stored on the request as `upload_error`, see BoundedUploadMixin.
+    Completed files carry their `sha256`, which common.blobs uses as is.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_files = settings.UPLOAD_MAX_FILES
+        self.max_file_size = settings.UPLOAD_MAX_FILE_SIZE
+        self.max_request_size = settings.UPLOAD_MAX_REQUEST_SIZE
+        self.file_count = 0
+        self.received = 0
+
+    def reject(self, message, status_code):
+        self.request.upload_error = (message, status_code)
+        raise StopUpload(connection_reset=True)
+
+    def handle_raw_input(
+        self, input_data, META, content_length, boundary, encoding=None
+    ):
+        if content_length > self.max_request_size:
+            self.request.upload_error = (
+                "Request is too large",
+                status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+            # skip parsing, nothing of the body is read
+            return QueryDict(encoding=encoding), MultiValueDict()
+        return super().handle_raw_input(
+            input_data, META, content_length, boundary, encoding
+        )
+
+    def new_file(self, *args, **kwargs):
+        self.file_count += 1
+        if self.file_count > self.max_files:
+            self.reject(
+                f"At most {self.max_files} files can be uploaded at once",
+                status.HTTP_400_BAD_REQUEST,
+            )
+        super().new_file(*args, **kwargs)
+        self.sha256 = hashlib.sha256()
+        self.file_size = 0
+        self.header = b""
+
+    def receive_data_chunk(self, raw_data, start):
+        self.file_size += len(raw_data)
+        self.received += len(raw_data)
+        if self.file_size > self.max_file_size:
+            self.reject(
+                f"{self.file_name} is larger than {self.max_file_size} bytes",
+                status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+        if self.received > self.max_request_size:
+            self.reject(
+                "Request is too large", status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+        if len(self.header) < HEADER_LENGTH:
+            self.header += raw_data[: HEADER_LENGTH - len(self.header)]
+            if len(self.header) == HEADER_LENGTH:
+                self.check_header()
+        self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def check_header(self):
+        if not is_image_header(self.header):
+            self.reject(
+                f"{self.file_name} is not a JPEG, PNG, GIF or WebP image",
+                status.HTTP_400_BAD_REQUEST,
+            )
+
+    def file_complete(self, file_size):
+        if len(self.header) < HEADER_LENGTH:
+            self.check_header()
+        file = super().file_complete(file_size)
+        file.sha256 = self.sha256.hexdigest()
+        return file
+
+
+class BoundedUploadMixin:
+    """
+    View mixin installing BoundedImageUploadHandler for `upload_methods`. Views
+    call `get_upload_error_response(request)` before touching the uploaded files.
+    """
+
+    upload_methods = ("POST",)
+
+    def initialize_request(self, request, *args, **kwargs):
+        if request.method in self.upload_methods:
+            request.upload_handlers = [BoundedImageUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
+    def get_upload_error_response(self, request):
+        request.data  # parse the body so the handler has run
+        upload_error = getattr(request._request, "upload_error", None)
+        if upload_error is None:
+            return None
+        message, status_code = upload_error
+        return Response({"message": message}, status=status_code)